@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_cv_analysis.settings')
 
 application = get_asgi_application()
+
+# resume analysis jobs left behind by a previous process
+from cv_analysis.analysis_jobs import start_workers  # noqa: E402
+
+start_workers()
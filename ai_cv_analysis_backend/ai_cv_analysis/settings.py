@@ -40,6 +40,124 @@ FRONTEND_URL = 'http://localhost:5173'
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GEOAPIFY_KEY = os.getenv("GEOAPIFY_KEY", None)
 
+# Background CV analysis jobs (cv_analysis/analysis_jobs.py).
+# 'thread' runs jobs on a pool inside each web process, 'external' leaves them
+# to `python manage.py run_analysis_worker`.
+ANALYSIS_JOB_MODE = os.getenv("ANALYSIS_JOB_MODE", "thread")
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_JOB_STALE_SECONDS = int(os.getenv("ANALYSIS_JOB_STALE_SECONDS", "120"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+# POST /api/cv/cvs/bulk-analyze/: CVs per request, and analyses run at once
+# when the batch is processed inside the request (?sync=true)
+ANALYSIS_BULK_MAX_CVS = int(os.getenv("ANALYSIS_BULK_MAX_CVS", "100"))
+ANALYSIS_BULK_CONCURRENCY = int(os.getenv("ANALYSIS_BULK_CONCURRENCY", "4"))
+
+# Cache of analysis results keyed by CV text hash + model + prompt version
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Stores run the eviction sweep once per this many stores or seconds, per process
+ANALYSIS_CACHE_EVICT_EVERY = int(os.getenv("ANALYSIS_CACHE_EVICT_EVERY", "50"))
+ANALYSIS_CACHE_EVICT_SECONDS = int(os.getenv("ANALYSIS_CACHE_EVICT_SECONDS", "300"))
+
+# CV text extraction (cv_analysis/text_extraction.py)
+CV_TEXT_STREAMING = os.getenv("CV_TEXT_STREAMING", "true").lower() in ("1", "true", "yes")
+CV_TEXT_MAX_PAGES = int(os.getenv("CV_TEXT_MAX_PAGES", "50"))
+CV_TEXT_MAX_CHARS = int(os.getenv("CV_TEXT_MAX_CHARS", "100000"))
+# Process pool for PDF parsing (cv_analysis/extraction_pool.py); 0 disables it
+CV_EXTRACTION_POOL_SIZE = int(os.getenv("CV_EXTRACTION_POOL_SIZE", "2"))
+CV_EXTRACTION_TIMEOUT = float(os.getenv("CV_EXTRACTION_TIMEOUT", "20"))
+CV_EXTRACTION_MAX_TASKS_PER_WORKER = int(os.getenv("CV_EXTRACTION_MAX_TASKS_PER_WORKER", "50"))
+
+# Shared LLM HTTP client (cv_analysis/llm_client.py)
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "4"))
+LLM_POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_RETRY_AFTER_MAX = float(os.getenv("LLM_RETRY_AFTER_MAX", "30"))
+# Outbound LLM concurrency limit (per process, and across processes via the
+# cache when LLM_GLOBAL_MAX_CONCURRENCY > 0) and circuit breaker
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_GLOBAL_MAX_CONCURRENCY = int(os.getenv("LLM_GLOBAL_MAX_CONCURRENCY", "0"))
+LLM_CONCURRENCY_TIMEOUT = float(os.getenv("LLM_CONCURRENCY_TIMEOUT", "5"))
+LLM_CONCURRENCY_CACHE = os.getenv("LLM_CONCURRENCY_CACHE", "default")
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Connections of the async client used by the ASGI endpoints (cv_analysis/async_views.py).
+# Requests beyond LLM_MAX_CONCURRENCY still wait for a limiter slot, so raise
+# both when serving many concurrent analyses from one uvicorn process.
+LLM_ASYNC_MAX_CONNECTIONS = int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", "200"))
+# Request a final `usage` chunk on streamed completions (for token metrics)
+LLM_STREAM_INCLUDE_USAGE = os.getenv("LLM_STREAM_INCLUDE_USAGE", "true")
+# JSON output mode requested for analyses: json_schema (structured outputs),
+# json_object (JSON mode) or off. Dropped automatically for models that reject it.
+LLM_RESPONSE_FORMAT = os.getenv("LLM_RESPONSE_FORMAT", "json_object")
+# Context window of OPENAI_MODEL in tokens. Longer CVs are split into parts of
+# at most ANALYSIS_CHUNK_TOKENS that are condensed concurrently (up to
+# ANALYSIS_CHUNK_CONCURRENCY calls) before the analysis call.
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "16385"))
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000"))
+ANALYSIS_CHUNK_CONCURRENCY = int(os.getenv("ANALYSIS_CHUNK_CONCURRENCY", "4"))
+
+# Interview question bank (cv_analysis/interview_service.py). Generated
+# questions are kept per (main skills, experience level); once a bucket holds
+# QUESTION_BANK_MIN_QUESTIONS, new interviews get a random set from it
+# without calling the LLM. Fill it from past interviews with
+# `manage.py fill_question_bank`.
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "true").lower() in ("1", "true", "yes")
+QUESTION_BANK_MIN_QUESTIONS = int(os.getenv("QUESTION_BANK_MIN_QUESTIONS", "30"))
+QUESTION_BANK_FINGERPRINT_SKILLS = int(os.getenv("QUESTION_BANK_FINGERPRINT_SKILLS", "5"))
+# Interview questions prepared in the background once an analysis is stored
+# (cv_analysis/interview_drafts.py); unclaimed drafts expire after the TTL.
+INTERVIEW_DRAFTS_ENABLED = os.getenv("INTERVIEW_DRAFTS_ENABLED", "true").lower() in ("1", "true", "yes")
+INTERVIEW_DRAFT_TTL_SECONDS = int(os.getenv("INTERVIEW_DRAFT_TTL_SECONDS", "3600"))
+INTERVIEW_DRAFT_WORKERS = int(os.getenv("INTERVIEW_DRAFT_WORKERS", "2"))
+
+# Resumable CV uploads (cv_analysis/chunked_upload.py): files up to
+# CV_UPLOAD_MAX_BYTES sent in chunks of at most CV_UPLOAD_MAX_CHUNK_BYTES
+# (CV_UPLOAD_CHUNK_BYTES is suggested to clients). Unfinished uploads are
+# deleted after CV_UPLOAD_TTL_SECONDS.
+CV_UPLOAD_MAX_BYTES = int(os.getenv("CV_UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+CV_UPLOAD_CHUNK_BYTES = int(os.getenv("CV_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+CV_UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("CV_UPLOAD_MAX_CHUNK_BYTES", str(8 * 1024 * 1024)))
+CV_UPLOAD_TTL_SECONDS = int(os.getenv("CV_UPLOAD_TTL_SECONDS", "86400"))
+
+# Django caches. Memory of each process by default; set CACHE_URL to a
+# redis:// URL (needs the `redis` package) to share one cache between worker
+# processes, which LLM_GLOBAL_MAX_CONCURRENCY and the read cache rely on.
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL}
+        if CACHE_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "cv-analysis"}
+    ),
+}
+# Per-user cache of the payloads of read endpoints (cv_analysis/read_cache.py).
+# Entries are only served for the ETag they were rendered for and are dropped
+# by model signals. On by default only with a shared CACHE_URL: with per-process
+# caches the signals of one worker cannot drop the entries of the others.
+READ_CACHE_ENABLED = os.getenv("READ_CACHE_ENABLED", "true" if CACHE_URL else "false").lower() in ("1", "true", "yes")
+READ_CACHE_ALIAS = os.getenv("READ_CACHE_ALIAS", "default")
+READ_CACHE_TTL_SECONDS = int(os.getenv("READ_CACHE_TTL_SECONDS", "300"))
+
+# Prometheus metrics at /metrics (cv_analysis/metrics.py). Scrapers send
+# "Authorization: Bearer <METRICS_TOKEN>"; without a token the endpoint is
+# only served with DEBUG on. With several worker processes also set
+# PROMETHEUS_MULTIPROC_DIR to an empty directory before starting them.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", None)
+
+# Per-request profiling (cv_analysis/profiling.py): SQL with timings, a
+# cProfile summary and the DB/LLM/serialization split of sampled requests
+# and of requests sending a signed X-Profile header (staff can get one from
+# /api/cv/ops/profiles/). Reports are JSON files in PROFILING_DIR; only the
+# newest PROFILING_MAX_ENTRIES are kept.
+PROFILING_SAMPLE_RATE = os.getenv("PROFILING_SAMPLE_RATE", "0")
+PROFILING_HEADER_MAX_AGE = os.getenv("PROFILING_HEADER_MAX_AGE", "3600")
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(BASE_DIR / "profiles"))
+PROFILING_MAX_ENTRIES = os.getenv("PROFILING_MAX_ENTRIES", "200")
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -75,6 +193,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'cv_analysis.metrics.MetricsMiddleware',
+    'cv_analysis.profiling.ProfilingMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -1,8 +1,15 @@
 from django.contrib import admin
-from.models import CV, CVAnalysisResult, Interview, InterviewQuestion
+from.models import CV, CVText, CVUpload, CVAnalysisResult, AnalysisCacheEntry, AnalysisJob, AnalysisBatch, BankQuestion, Interview, InterviewDraft, InterviewQuestion
 
 
 admin.site.register(CV)
+admin.site.register(CVText)
+admin.site.register(CVUpload)
 admin.site.register(CVAnalysisResult)
+admin.site.register(AnalysisCacheEntry)
+admin.site.register(AnalysisJob)
+admin.site.register(AnalysisBatch)
+admin.site.register(BankQuestion)
 admin.site.register(Interview)
+admin.site.register(InterviewDraft)
 admin.site.register(InterviewQuestion)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .conf import setting
+from .models import AnalysisCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+# Stores since the last eviction sweep of this process, and when it ran
+_evict_state = {'stores': 0, 'at': None}
+
+
+def is_enabled() -> bool:
+    return str(setting('ANALYSIS_CACHE_ENABLED', 'true')).lower() in ['1', 'true', 'yes']
+
+
+def max_entries() -> int:
+    return int(setting('ANALYSIS_CACHE_MAX_ENTRIES', '5000'))
+
+
+def ttl() -> timedelta:
+    return timedelta(seconds=int(setting('ANALYSIS_CACHE_TTL_SECONDS', str(30 * 24 * 3600))))
+
+
+def evict_every() -> int:
+    return int(setting('ANALYSIS_CACHE_EVICT_EVERY', '50'))
+
+
+def evict_interval() -> float:
+    return float(setting('ANALYSIS_CACHE_EVICT_SECONDS', '300'))
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def text_hash(cv_text: str) -> str:
+    return hashlib.sha256(cv_text.encode('utf-8')).hexdigest()
+
+
+def make_key(cv_text: str, model: str, prompt_version: str) -> str:
+    """Cache key: SHA-256 of the CV text combined with model and prompt version."""
+    raw = f"{text_hash(cv_text)}:{model}:{prompt_version}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_cached_analysis(cv_text: str, model: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+    """Return the cached analysis for this text/model/prompt, or None on a miss.
+
+    Expired entries are removed when they are looked up.
+    """
+    if not is_enabled() or not cv_text:
+        return None
+
+    key = make_key(cv_text, model, prompt_version)
+    entry = AnalysisCacheEntry.objects.filter(key=key).only('pk', 'result', 'created_at').first()
+    if entry is None:
+        _count('misses')
+        return None
+
+    if entry.created_at < timezone.now() - ttl():
+        AnalysisCacheEntry.objects.filter(pk=entry.pk).delete()
+        _count('misses')
+        _count('evictions')
+        return None
+
+    AnalysisCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=timezone.now(), hits=F('hits') + 1)
+    _count('hits')
+    return dict(entry.result)
+
+
+def store_analysis(cv_text: str, model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+    """Store an analysis result and, every ANALYSIS_CACHE_EVICT_EVERY stores
+    or ANALYSIS_CACHE_EVICT_SECONDS, evict entries beyond the configured
+    bounds. The cache can exceed its bounds by that much in between."""
+    if not is_enabled() or not cv_text:
+        return
+
+    now = timezone.now()
+    try:
+        AnalysisCacheEntry.objects.update_or_create(
+            key=make_key(cv_text, model, prompt_version),
+            defaults={
+                'text_hash': text_hash(cv_text),
+                'model': model,
+                'prompt_version': prompt_version,
+                'result': result,
+                'last_used_at': now,
+            },
+        )
+    except IntegrityError:
+        # stored concurrently by another worker with the same result
+        return
+    _count('stores')
+    if _evict_due():
+        evict(prompt_version)
+
+
+def _evict_due() -> bool:
+    """Whether this store should run the eviction sweep (the first store of
+    a process always does)."""
+    now = time.monotonic()
+    with _stats_lock:
+        _evict_state['stores'] += 1
+        last = _evict_state['at']
+        if last is not None and _evict_state['stores'] < evict_every() and now - last < evict_interval():
+            return False
+        _evict_state['stores'] = 0
+        _evict_state['at'] = now
+        return True
+
+
+def evict(prompt_version: Optional[str] = None) -> int:
+    """Drop expired entries, entries from other prompt versions and the least
+    recently used entries above ANALYSIS_CACHE_MAX_ENTRIES."""
+    removed = AnalysisCacheEntry.objects.filter(created_at__lt=timezone.now() - ttl()).delete()[0]
+    if prompt_version:
+        removed += AnalysisCacheEntry.objects.exclude(prompt_version=prompt_version).delete()[0]
+
+    overflow = AnalysisCacheEntry.objects.count() - max_entries()
+    if overflow > 0:
+        oldest = list(
+            AnalysisCacheEntry.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow]
+        )
+        removed += AnalysisCacheEntry.objects.filter(pk__in=oldest).delete()[0]
+
+    if removed:
+        _count('evictions', removed)
+        logger.info('Evicted %s analysis cache entries', removed)
+    return removed
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters of this process plus the current cache size."""
+    with _stats_lock:
+        data = dict(_stats)
+    lookups = data['hits'] + data['misses']
+    data['hit_ratio'] = round(data['hits'] / lookups, 4) if lookups else 0.0
+    data['entries'] = AnalysisCacheEntry.objects.count()
+    data['max_entries'] = max_entries()
+    return data
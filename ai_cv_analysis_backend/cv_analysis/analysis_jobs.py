@@ -0,0 +1,352 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .conf import setting
+from .models import CV, AnalysisBatch, AnalysisJob, CVAnalysisResult
+from .interview_drafts import schedule_draft
+from .json_schema import schema_errors
+from .openai_service import ANALYSIS_SCHEMA, analyze_cv as openai_analyze_cv
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [AnalysisJob.STATUS_PENDING, AnalysisJob.STATUS_RUNNING]
+
+# States of AnalysisBatch items that were not queued as a job
+BATCH_SKIPPED = 'skipped'
+BATCH_NOT_FOUND = 'not_found'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def job_mode() -> str:
+    """Return how queued jobs are executed.
+
+    - ``thread``: jobs run on an in-process thread pool of the web worker.
+    - ``external``: jobs are only written to the table and picked up by
+      ``manage.py run_analysis_worker`` processes.
+    """
+    return str(setting('ANALYSIS_JOB_MODE', 'thread')).lower()
+
+
+def stale_after() -> timedelta:
+    """Running jobs without a heartbeat for this long are considered abandoned."""
+    return timedelta(seconds=int(setting('ANALYSIS_JOB_STALE_SECONDS', '120')))
+
+
+def max_attempts() -> int:
+    return int(setting('ANALYSIS_JOB_MAX_ATTEMPTS', '3'))
+
+
+def bulk_max_cvs() -> int:
+    return int(setting('ANALYSIS_BULK_MAX_CVS', '100'))
+
+
+def bulk_concurrency() -> int:
+    return int(setting('ANALYSIS_BULK_CONCURRENCY', '4'))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def validate_analysis_data(analysis_data: Any) -> Optional[str]:
+    """Return an error message if `analysis_data` does not match ANALYSIS_SCHEMA, else None."""
+    if not isinstance(analysis_data, dict):
+        return 'Invalid analysis response from AI'
+    errors = schema_errors(analysis_data, ANALYSIS_SCHEMA)
+    if errors:
+        return f"Invalid analysis response from AI: {'; '.join(errors[:5])}"
+    return None
+
+
+def save_analysis_result(cv: CV, analysis_data: Dict[str, Any], replace: bool = False,
+                         prepare_interview: bool = True) -> Tuple[CVAnalysisResult, bool]:
+    """Persist `analysis_data` as the CVAnalysisResult of `cv`.
+
+    When `replace` is set an existing result is deleted first. Returns the
+    stored result and whether it was newly created; if another request
+    created the row concurrently that row is returned instead. A new result
+    gets interview questions prepared in the background unless
+    `prepare_interview` is False (see `interview_drafts`).
+    """
+    if replace:
+        CVAnalysisResult.objects.filter(cv=cv).delete()
+
+    try:
+        # a savepoint, so a caller's transaction survives the IntegrityError
+        with transaction.atomic():
+            analysis = CVAnalysisResult.objects.create(
+                cv=cv,
+                summary=analysis_data.get('summary'),
+                skills_extracted=analysis_data.get('skills', []),
+                experience_level=analysis_data.get('experience_level'),
+                ai_score=analysis_data.get('ai_score'),
+                suggestions=analysis_data.get('suggestions'),
+                model=analysis_data.get('model') or '',
+                prompt_version=analysis_data.get('prompt_version') or '',
+            )
+    except IntegrityError:
+        return CVAnalysisResult.objects.get(cv=cv), False
+    if prepare_interview:
+        schedule_draft(analysis)
+    return analysis, True
+
+
+def enqueue_analysis(cv: CV, force: bool = False, dispatch: bool = True,
+                     prepare_interview: bool = True) -> AnalysisJob:
+    """Queue an analysis for `cv`, reusing an already active job for it.
+
+    Pass `dispatch=False` to only create the job, for callers that run it
+    themselves. `prepare_interview` is passed on to `save_analysis_result`
+    when the job finishes.
+    """
+    job = AnalysisJob.objects.filter(cv=cv, status__in=ACTIVE_STATUSES).first()
+    if job is None:
+        job = AnalysisJob.objects.create(cv=cv, force=force, prepare_interview=prepare_interview)
+
+    if dispatch and job_mode() == 'thread':
+        transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def create_batch(user, cv_ids: Iterable[int], force: bool = False, dispatch: bool = True) -> AnalysisBatch:
+    """Queue analyses for the CVs of `user` listed in `cv_ids`.
+
+    CVs that already have an analysis are skipped unless `force` is set, and
+    ids that do not exist or belong to another user are recorded as not
+    found. Duplicate ids are ignored. No interview drafts are prepared for
+    the results of a batch.
+    """
+    cv_ids = list(dict.fromkeys(cv_ids))
+    cvs = CV.objects.filter(user=user).in_bulk(cv_ids)
+    analyzed = set(CVAnalysisResult.objects.filter(cv_id__in=list(cvs)).values_list('cv_id', flat=True))
+
+    items = []
+    with transaction.atomic():
+        for cv_id in cv_ids:
+            cv = cvs.get(cv_id)
+            if cv is None:
+                items.append({'cv_id': cv_id, 'status': BATCH_NOT_FOUND})
+            elif cv_id in analyzed and not force:
+                items.append({'cv_id': cv_id, 'status': BATCH_SKIPPED})
+            else:
+                job = enqueue_analysis(cv, force=force, dispatch=dispatch, prepare_interview=False)
+                items.append({'cv_id': cv_id, 'job_id': job.pk})
+        return AnalysisBatch.objects.create(user=user, force=force, items=items)
+
+
+def run_batch(batch: AnalysisBatch) -> None:
+    """Run the queued jobs of `batch` in this process, `bulk_concurrency()`
+    at a time. Jobs another worker claimed first are left to it."""
+    job_ids = [item['job_id'] for item in batch.items if item.get('job_id')]
+    if not job_ids:
+        return
+    workers = max(1, min(len(job_ids), bulk_concurrency()))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cv-bulk-analysis') as pool:
+        list(pool.map(process_job, job_ids))
+
+
+def claim_job(job_id: int, worker_id: Optional[str] = None) -> Optional[AnalysisJob]:
+    """Atomically move a pending job to running. Returns None if it was taken."""
+    now = timezone.now()
+    claimed = AnalysisJob.objects.filter(pk=job_id, status=AnalysisJob.STATUS_PENDING).update(
+        status=AnalysisJob.STATUS_RUNNING,
+        worker_id=worker_id or default_worker_id(),
+        claimed_at=now,
+        heartbeat_at=now,
+        attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return None
+    return AnalysisJob.objects.select_related('cv').get(pk=job_id)
+
+
+def claim_next_job(worker_id: Optional[str] = None) -> Optional[AnalysisJob]:
+    """Claim the oldest pending job, skipping ones other workers win first."""
+    pending_ids = AnalysisJob.objects.filter(
+        status=AnalysisJob.STATUS_PENDING
+    ).order_by('created_at').values_list('pk', flat=True)[:20]
+    for job_id in pending_ids:
+        job = claim_job(job_id, worker_id)
+        if job is not None:
+            return job
+    return None
+
+
+def reclaim_stale_jobs() -> int:
+    """Requeue running jobs whose worker stopped heart-beating.
+
+    Jobs that already used up their attempts are marked as failed instead.
+    Returns the number of jobs put back into the queue.
+    """
+    cutoff = timezone.now() - stale_after()
+    stale = AnalysisJob.objects.filter(status=AnalysisJob.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+
+    stale.filter(attempts__gte=max_attempts()).update(
+        status=AnalysisJob.STATUS_FAILED,
+        error='Worker stopped before the analysis finished',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts()).update(
+        status=AnalysisJob.STATUS_PENDING,
+        worker_id=None,
+    )
+    if requeued:
+        logger.warning('Re-queued %s stale analysis job(s)', requeued)
+    return requeued
+
+
+def _owned(job: AnalysisJob):
+    """The job's row, as long as it is still running on the worker that claimed it."""
+    return AnalysisJob.objects.filter(pk=job.pk, status=AnalysisJob.STATUS_RUNNING, worker_id=job.worker_id)
+
+
+def _finish(job: AnalysisJob, status: str, error: Optional[str] = None) -> bool:
+    """Record the outcome of `job`. Returns False if the job was reclaimed
+    (it timed out and another worker may be running it), in which case
+    nothing is written."""
+    finished = _owned(job).update(
+        status=status,
+        error=error,
+        finished_at=timezone.now(),
+    )
+    if not finished:
+        logger.warning('Analysis job %s was reclaimed before worker %s finished it', job.pk, job.worker_id)
+    return bool(finished)
+
+
+class _Heartbeat:
+    """Refreshes `heartbeat_at` of a running job from a background thread,
+    so `reclaim_stale_jobs` leaves jobs alone that take longer than
+    ANALYSIS_JOB_STALE_SECONDS."""
+
+    def __init__(self, job: AnalysisJob):
+        self.job = job
+        self.interval = max(1.0, stale_after().total_seconds() / 3)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f'cv-analysis-heartbeat-{job.pk}', daemon=True)
+
+    def __enter__(self) -> '_Heartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self) -> None:
+        used_db = False
+        try:
+            while not self._stop.wait(self.interval):
+                used_db = True
+                if not _owned(self.job).update(heartbeat_at=timezone.now()):
+                    return
+        except Exception:
+            logger.exception('Heartbeat of analysis job %s failed', self.job.pk)
+        finally:
+            if used_db:
+                connection.close()
+
+
+def run_job(job: AnalysisJob) -> None:
+    """Run a claimed job to completion and record the outcome.
+
+    The job's heartbeat is refreshed while it runs. If it was reclaimed
+    anyway, its outcome and result are dropped: the worker that holds the
+    job now records its own.
+    """
+    cv = job.cv
+    if not job.force and CVAnalysisResult.objects.filter(cv=cv).exists():
+        _finish(job, AnalysisJob.STATUS_SUCCEEDED)
+        return
+
+    try:
+        with _Heartbeat(job):
+            analysis_data = openai_analyze_cv(cv, force=job.force)
+    except Exception as exc:
+        logger.exception('OpenAI analysis failed for job %s: %s', job.pk, exc)
+        _finish(job, AnalysisJob.STATUS_FAILED, f'AI service error: {exc}')
+        return
+
+    error = validate_analysis_data(analysis_data)
+    if error:
+        logger.error('Job %s got unusable analysis_data: %r', job.pk, analysis_data)
+        _finish(job, AnalysisJob.STATUS_FAILED, error)
+        return
+
+    with transaction.atomic():
+        if _finish(job, AnalysisJob.STATUS_SUCCEEDED):
+            save_analysis_result(cv, analysis_data, replace=job.force, prepare_interview=job.prepare_interview)
+
+
+def process_job(job_id: int, worker_id: Optional[str] = None) -> None:
+    """Claim and run a single job. Safe to call from any thread."""
+    close_old_connections()
+    try:
+        job = claim_job(job_id, worker_id)
+        if job is not None:
+            run_job(job)
+    except Exception:
+        logger.exception('Unexpected error while processing analysis job %s', job_id)
+    finally:
+        close_old_connections()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(setting('ANALYSIS_WORKERS', '2'))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cv-analysis')
+            _executor.submit(_resume_pending_jobs)
+            threading.Thread(target=_reap_forever, name='cv-analysis-reaper', daemon=True).start()
+        return _executor
+
+
+def start_workers() -> None:
+    """Start the in-process pool in thread mode, so jobs left behind by a
+    previous process resume at startup rather than on the next submit.
+    Called from the WSGI/ASGI entry points."""
+    if job_mode() == 'thread':
+        _get_executor()
+
+
+def _reap_forever() -> None:
+    """Requeue and resubmit stale jobs every ANALYSIS_JOB_STALE_SECONDS, as
+    `run_analysis_worker` does in external mode."""
+    while True:
+        time.sleep(max(5.0, stale_after().total_seconds()))
+        try:
+            _resume_pending_jobs()
+        except Exception:
+            logger.exception('Could not requeue stale analysis jobs')
+
+
+def _resume_pending_jobs() -> None:
+    """Pick up stale jobs and jobs left pending, e.g. by a previous process."""
+    close_old_connections()
+    try:
+        reclaim_stale_jobs()
+        pending = list(
+            AnalysisJob.objects.filter(status=AnalysisJob.STATUS_PENDING).values_list('pk', flat=True)
+        )
+    finally:
+        close_old_connections()
+    for job_id in pending:
+        submit(job_id)
+
+
+def submit(job_id: int) -> None:
+    """Hand a job to the in-process pool."""
+    _get_executor().submit(process_job, job_id)
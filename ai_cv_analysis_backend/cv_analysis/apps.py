@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CvAnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cv_analysis'
+
+    def ready(self):
+        # connects the read cache's invalidation signals
+        from . import read_cache  # noqa: F401
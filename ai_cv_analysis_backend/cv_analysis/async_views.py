@@ -0,0 +1,148 @@
+"""ASGI-native versions of the analyze and interview-start endpoints.
+
+DRF views are synchronous, so these are plain Django async views that
+authenticate the JWT themselves. Under an ASGI server (e.g.
+`uvicorn ai_cv_analysis.asgi:application`) a request waiting on the LLM
+does not hold a thread, so one process can keep many analyses in flight.
+Responses match the synchronous `CVViewSet.analyze` (with `?sync=true`)
+and `InterviewViewSet.start` actions.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import llm_client
+from .analysis_jobs import save_analysis_result, validate_analysis_data
+from .interview_service import (
+    INTERVIEW_MAX_TOKENS,
+    INTERVIEW_TEMPERATURE,
+    add_to_bank,
+    build_interview_messages,
+    create_interview,
+    draw_from_bank,
+    parse_questions,
+)
+from .interview_drafts import claim_draft
+from .models import CV, CVAnalysisResult
+from .openai_service import analyze_cv_async
+from .serializers import CVAnalysisResultSerializer, InterviewSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _authenticate(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+
+def _unavailable(body, exc):
+    response = JsonResponse(body, status=503)
+    if isinstance(exc, llm_client.LLMUnavailable):
+        response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def analyze_cv_view(request, pk):
+    """Async `POST /api/cv/async/cvs/{id}/analyze/` (`?force=true` re-runs)."""
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _unauthorized()
+
+    cv = await CV.objects.filter(pk=pk, user=user).afirst()
+    if cv is None:
+        return JsonResponse({'error': 'CV not found'}, status=404)
+
+    force = request.GET.get('force') in ['1', 'true', 'True']
+    existing = await CVAnalysisResult.objects.filter(cv=cv).afirst()
+    if existing and not force:
+        return JsonResponse(CVAnalysisResultSerializer(existing).data, status=200)
+
+    try:
+        analysis_data = await analyze_cv_async(cv, force=force)
+    except Exception as exc:
+        logger.exception('OpenAI analysis failed: %s', exc)
+        return _unavailable({
+            'error': 'Failed to analyze CV',
+            'detail': f'AI service error: {exc}',
+            'cv_id': cv.id,
+        }, exc)
+
+    error = validate_analysis_data(analysis_data)
+    if error:
+        logger.error('OpenAI returned invalid analysis_data: %r', analysis_data)
+        return JsonResponse({'error': error}, status=502)
+
+    analysis, created = await sync_to_async(save_analysis_result)(cv, analysis_data, replace=bool(existing and force))
+    return JsonResponse(CVAnalysisResultSerializer(analysis).data, status=201 if created else 200)
+
+
+@csrf_exempt
+@require_POST
+async def start_interview_view(request):
+    """Async `POST /api/cv/async/interviews/start/` with `{"cv_id": <int>}`."""
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _unauthorized()
+
+    try:
+        cv_id = json.loads(request.body or b'{}').get('cv_id')
+    except (ValueError, AttributeError):
+        cv_id = None
+    if not cv_id:
+        return JsonResponse({'error': 'cv_id is required'}, status=400)
+
+    cv = await CV.objects.filter(pk=cv_id, user=user).afirst()
+    if cv is None:
+        return JsonResponse({'error': 'CV not found'}, status=404)
+
+    analysis = await CVAnalysisResult.objects.filter(cv=cv).afirst()
+    if analysis is None:
+        return JsonResponse({'error': 'CV has not been analyzed yet. Please analyze the CV first.'}, status=400)
+
+    # Served from a prepared draft, or from the question bank when the bucket
+    # for this profile is full enough
+    questions_data = await sync_to_async(claim_draft)(analysis)
+    if questions_data is None:
+        questions_data = await sync_to_async(draw_from_bank)(analysis)
+
+    if questions_data is None:
+        try:
+            data = await llm_client.async_chat_completion(
+                build_interview_messages(analysis),
+                temperature=INTERVIEW_TEMPERATURE,
+                max_tokens=INTERVIEW_MAX_TOKENS,
+            )
+        except Exception as exc:
+            logger.exception('Failed to generate interview questions: %s', exc)
+            return _unavailable({'error': 'Failed to generate interview questions'}, exc)
+
+        questions_data = parse_questions(llm_client.message_content(data))
+        if questions_data is None:
+            return JsonResponse({'error': 'Invalid AI response format'}, status=502)
+        await sync_to_async(add_to_bank)(analysis, questions_data)
+
+    # The interview row is only created once usable questions exist, so a
+    # failed generation leaves nothing behind.
+    def create():
+        interview = create_interview(cv, questions_data)
+        return InterviewSerializer(interview).data if interview is not None else None
+
+    payload = await sync_to_async(create)()
+    if payload is None:
+        return JsonResponse({'error': 'AI did not generate any questions'}, status=502)
+    return JsonResponse(payload, status=201)
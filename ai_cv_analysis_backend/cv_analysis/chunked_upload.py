@@ -0,0 +1,237 @@
+"""Resumable CV uploads: start, PUT chunks at offsets, finish.
+
+The file is reserved under `cv_files/` in the default storage when the
+upload starts, and every chunk is streamed from the request straight into
+it at its offset, so nothing is buffered in memory or temp files. The
+SHA-256 of the content is fed while writing; the hasher lives in this
+process, and a process that does not have it (a restart, or another worker
+took the previous chunk) rebuilds it from the bytes already on disk.
+Finishing points a new CV at the written file and passes the digest on to
+text extraction, so the file is neither copied nor hashed again.
+
+Chunks are written through the storage's local path, so this needs a
+filesystem storage. Uploads expire CV_UPLOAD_TTL_SECONDS after they start;
+expired ones refuse chunks and finishing with 410 and are purged when
+another upload starts.
+"""
+import hashlib
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .conf import setting
+from .models import CV, CVUpload
+from .pdf_text import HASH_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = CV._meta.get_field('file').upload_to
+FILE_NAME_MAX_LENGTH = CV._meta.get_field('file').max_length
+
+# upload id -> (bytes hashed, hasher)
+_hashers: Dict[str, Tuple[int, Any]] = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(RuntimeError):
+    """A request the upload cannot accept. `offset` is where it stands now."""
+
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def max_bytes() -> int:
+    return int(setting('CV_UPLOAD_MAX_BYTES', str(25 * 1024 * 1024)))
+
+
+def chunk_bytes() -> int:
+    """Chunk size suggested to clients."""
+    return int(setting('CV_UPLOAD_CHUNK_BYTES', str(1024 * 1024)))
+
+
+def max_chunk_bytes() -> int:
+    return int(setting('CV_UPLOAD_MAX_CHUNK_BYTES', str(8 * 1024 * 1024)))
+
+
+def upload_ttl() -> timedelta:
+    return timedelta(seconds=int(setting('CV_UPLOAD_TTL_SECONDS', '86400')))
+
+
+def _path(upload: CVUpload) -> str:
+    try:
+        return default_storage.path(upload.file_name)
+    except NotImplementedError:
+        raise UploadError('Resumable uploads need a filesystem storage', status_code=501)
+
+
+def _discard(upload: CVUpload, expired_only: bool = False) -> bool:
+    """Delete the upload and its file. The row is deleted first, so a
+    request that finished the upload meanwhile keeps its file; returns
+    False if the row was already gone (or, with `expired_only`, is live)."""
+    rows = CVUpload.objects.filter(pk=upload.pk)
+    if expired_only:
+        rows = rows.filter(expires_at__lte=timezone.now())
+    if not rows.delete()[0]:
+        return False
+    with _hashers_lock:
+        _hashers.pop(str(upload.pk), None)
+    try:
+        default_storage.delete(upload.file_name)
+    except Exception as exc:
+        logger.warning('Could not delete partial upload %s: %s', upload.file_name, exc)
+    return True
+
+
+def purge_expired() -> int:
+    """Delete uploads that were not finished in time, with their files."""
+    expired = list(CVUpload.objects.filter(expires_at__lte=timezone.now()))
+    return sum(_discard(upload, expired_only=True) for upload in expired)
+
+
+def _expired() -> UploadError:
+    return UploadError('Upload has expired', status_code=410)
+
+
+def check_live(upload: CVUpload) -> None:
+    """Raise a 410 UploadError if `upload` has expired."""
+    if upload.expires_at <= timezone.now():
+        raise _expired()
+
+
+def start_upload(user, filename: str, size: int, sha256: str = '') -> CVUpload:
+    """Reserve a file for an upload of `size` bytes and return the upload."""
+    if size <= 0:
+        raise UploadError('size must be positive')
+    if size > max_bytes():
+        raise UploadError(f'Files are limited to {max_bytes()} bytes', status_code=413)
+    purge_expired()
+
+    name = default_storage.get_valid_name(os.path.basename(filename or '')) or 'cv'
+    name = default_storage.save(f'{UPLOAD_DIR}{name}', ContentFile(b''), max_length=FILE_NAME_MAX_LENGTH)
+    upload = CVUpload(
+        user=user,
+        file_name=name,
+        size=size,
+        expected_sha256=(sha256 or '').lower(),
+        expires_at=timezone.now() + upload_ttl(),
+    )
+    try:
+        _path(upload)
+    except UploadError:
+        default_storage.delete(name)
+        raise
+    upload.save()
+    return upload
+
+
+def _hasher(upload: CVUpload):
+    """A sha256 over the first `upload.received` bytes, for this caller only."""
+    with _hashers_lock:
+        entry = _hashers.get(str(upload.pk))
+    if entry is not None and entry[0] == upload.received:
+        return entry[1].copy()
+
+    logger.info('Rebuilding the hash of upload %s from %s stored bytes', upload.pk, upload.received)
+    hasher = hashlib.sha256()
+    remaining = upload.received
+    try:
+        with open(_path(upload), 'rb') as fh:
+            while remaining > 0:
+                block = fh.read(min(HASH_CHUNK_SIZE, remaining))
+                if not block:
+                    raise UploadError('Stored upload is shorter than recorded', status_code=409, offset=0)
+                hasher.update(block)
+                remaining -= len(block)
+    except FileNotFoundError:
+        # purged since the caller loaded the upload
+        raise _expired()
+    return hasher
+
+
+def write_chunk(upload: CVUpload, start: int, length: int, stream: BinaryIO) -> int:
+    """Write `length` bytes read from `stream` at offset `start`.
+
+    `start` must be where the upload stands. If the stream ends early the
+    bytes that arrived are kept. Returns the new offset.
+    """
+    check_live(upload)
+    if start != upload.received:
+        raise UploadError(f'Expected offset {upload.received}', status_code=409, offset=upload.received)
+    if length <= 0 or length > max_chunk_bytes():
+        raise UploadError(f'Chunks must be 1 to {max_chunk_bytes()} bytes', status_code=413, offset=start)
+    if start + length > upload.size:
+        raise UploadError('Chunk ends beyond the announced size', offset=start)
+
+    hasher = _hasher(upload)
+    written = 0
+    try:
+        fh = open(_path(upload), 'r+b')
+    except FileNotFoundError:
+        raise _expired()
+    with fh:
+        fh.seek(start)
+        while written < length:
+            block = stream.read(min(HASH_CHUNK_SIZE, length - written))
+            if not block:
+                break
+            fh.write(block)
+            hasher.update(block)
+            written += len(block)
+
+    offset = start + written
+    # a concurrent request for the same offset may have won; it wrote the same bytes
+    if not CVUpload.objects.filter(pk=upload.pk, received=start).update(received=offset):
+        try:
+            upload.refresh_from_db(fields=['received'])
+        except CVUpload.DoesNotExist:
+            # purged (expired) or aborted while this chunk was written
+            raise _expired()
+        raise UploadError(f'Expected offset {upload.received}', status_code=409, offset=upload.received)
+    upload.received = offset
+    with _hashers_lock:
+        _hashers[str(upload.pk)] = (offset, hasher)
+    return offset
+
+
+def finish_upload(upload: CVUpload) -> Tuple[CV, Dict[str, Any]]:
+    """Create the CV from a complete upload.
+
+    Returns the CV and the digest of its file (content_hash, byte_size).
+    A mismatch with the client's announced SHA-256 discards the upload.
+    Expired uploads are refused with 410.
+    """
+    check_live(upload)
+    if upload.received != upload.size:
+        raise UploadError(f'Upload is incomplete ({upload.received}/{upload.size} bytes)',
+                          status_code=409, offset=upload.received)
+    content_hash = _hasher(upload).hexdigest()
+    if upload.expected_sha256 and upload.expected_sha256 != content_hash:
+        _discard(upload)
+        raise UploadError('Uploaded content does not match sha256', status_code=422)
+
+    # drop bytes an interrupted earlier attempt may have left past the end
+    os.truncate(_path(upload), upload.size)
+    upload_id = str(upload.pk)
+    with transaction.atomic():
+        # claiming the row keeps a concurrent purge from deleting the file
+        if not CVUpload.objects.filter(pk=upload.pk, expires_at__gt=timezone.now()).delete()[0]:
+            raise _expired()
+        cv = CV(user=upload.user)
+        cv.file.name = upload.file_name
+        cv.save()
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+    return cv, {'content_hash': content_hash, 'byte_size': upload.size}
+
+
+def abort_upload(upload: CVUpload) -> None:
+    _discard(upload)
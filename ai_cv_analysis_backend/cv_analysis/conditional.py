@@ -0,0 +1,136 @@
+"""Conditional GETs for the read endpoints.
+
+Each validator function returns what the response of a read action
+depends on, read with small aggregate or single-row queries over
+timestamps, ids and counts, never the objects themselves. `conditional` hashes that into an
+ETag and answers a matching If-None-Match (or If-Modified-Since) with 304
+before the view queries or serializes anything.
+
+CVs and interviews carry `updated_at`; code that changes them with
+`QuerySet.update()` has to set it as well. Analyses never change after
+creation, so their id and `analyzed_at` identify them.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import CV, CVAnalysisResult, Interview
+
+# (what the response depends on, last modification time or None)
+Validators = Tuple[Any, Optional[datetime]]
+
+
+def _etag(request, version: Any) -> str:
+    # The path and query string are part of it, so pages and filters of a
+    # list never share a tag
+    raw = f'{request.user.pk}:{request.get_full_path()}:{version!r}'
+    return quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+
+def conditional(validators: Callable[..., Optional[Validators]]):
+    """Decorate a read action of a viewset with ETag/Last-Modified handling.
+
+    `validators(request, **kwargs)` returns (version, last_modified) for
+    the resource, or None if it does not exist, in which case the view runs
+    unconditionally (and usually 404s). Lists should pass no
+    last_modified: deleting a row does not move any timestamp forward, so
+    only the ETag can tell.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            try:
+                found = validators(request, **kwargs)
+            except (TypeError, ValueError):
+                # malformed pk; the view answers with its 404
+                found = None
+            if found is None:
+                return view_method(self, request, *args, **kwargs)
+            version, last_modified = found
+            etag = _etag(request, version)
+            # what the body must match; read_cache keys its entries by it
+            request.conditional_etag = etag
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+            # let browsers keep the body but revalidate it on every use
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
+
+
+def _aggregate(queryset, timestamp: str) -> Tuple[int, Optional[int], Optional[datetime]]:
+    data = queryset.order_by().aggregate(n=Count('pk'), last_id=Max('pk'), last=Max(timestamp))
+    return data['n'], data['last_id'], data['last']
+
+
+def cv_list(request, **kwargs) -> Validators:
+    """The CV list with its analysis and interview annotations."""
+    return (
+        _aggregate(CV.objects.filter(user=request.user), 'updated_at'),
+        _aggregate(CVAnalysisResult.objects.filter(cv__user=request.user), 'analyzed_at'),
+        _aggregate(Interview.objects.filter(cv__user=request.user), 'updated_at'),
+    ), None
+
+
+def cv_detail(request, pk=None, **kwargs) -> Optional[Validators]:
+    """A CV with its nested analysis."""
+    row = CV.objects.filter(pk=pk, user=request.user).values(
+        'updated_at', 'analysis__id', 'analysis__analyzed_at',
+    ).first()
+    if row is None:
+        return None
+    last_modified = max(filter(None, [row['updated_at'], row['analysis__analyzed_at']]))
+    return tuple(row.values()), last_modified
+
+
+def cv_analysis(request, pk=None, **kwargs) -> Optional[Validators]:
+    """The analysis of a CV, by CV id."""
+    row = CVAnalysisResult.objects.filter(cv_id=pk, cv__user=request.user).values('pk', 'analyzed_at').first()
+    if row is None:
+        return None
+    return (row['pk'], row['analyzed_at']), row['analyzed_at']
+
+
+def analysis_list(request, **kwargs) -> Validators:
+    return _aggregate(CVAnalysisResult.objects.filter(cv__user=request.user), 'analyzed_at'), None
+
+
+def analysis_detail(request, pk=None, **kwargs) -> Optional[Validators]:
+    row = CVAnalysisResult.objects.filter(pk=pk, cv__user=request.user).values('pk', 'analyzed_at').first()
+    if row is None:
+        return None
+    return (row['pk'], row['analyzed_at']), row['analyzed_at']
+
+
+def interview_list(request, **kwargs) -> Optional[Validators]:
+    """A page of the interview list; the query string selects CV and page."""
+    interviews = Interview.objects.filter(cv__user=request.user)
+    cv_id = request.query_params.get('cv')
+    if cv_id is not None:
+        if not cv_id.isdigit():
+            return None
+        interviews = interviews.filter(cv_id=int(cv_id))
+    return _aggregate(interviews, 'updated_at'), None
+
+
+def interview_detail(request, pk=None, **kwargs) -> Optional[Validators]:
+    """An interview with its questions; answering a question moves `updated_at`."""
+    row = Interview.objects.filter(pk=pk, cv__user=request.user).values('pk', 'updated_at').first()
+    if row is None:
+        return None
+    return (row['pk'], row['updated_at']), row['updated_at']
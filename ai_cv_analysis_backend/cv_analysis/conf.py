@@ -0,0 +1,16 @@
+import os
+from typing import Any
+
+from django.conf import settings
+
+
+def setting(name: str, default: Any) -> Any:
+    """Read `name` from Django settings, falling back to the environment.
+
+    Only a missing or None setting falls back, so falsy values such as 0,
+    False or '' configured in settings are respected.
+    """
+    value = getattr(settings, name, None)
+    if value is None:
+        value = os.getenv(name, default)
+    return value
@@ -0,0 +1,118 @@
+import logging
+import threading
+import weakref
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from .conf import setting
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Pools whose workers were terminated because one task timed out
+_killed_pools = weakref.WeakSet()
+
+
+class ExtractionError(RuntimeError):
+    """Raised when a pooled extraction could not complete."""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Raised when a pooled extraction does not finish within its timeout."""
+
+
+def pool_size() -> int:
+    """Number of extraction processes; 0 disables the pool."""
+    return int(setting('CV_EXTRACTION_POOL_SIZE', '2'))
+
+
+def task_timeout() -> float:
+    return float(setting('CV_EXTRACTION_TIMEOUT', '20'))
+
+
+def max_tasks_per_worker() -> int:
+    """Documents a worker process handles before it is replaced."""
+    return int(setting('CV_EXTRACTION_MAX_TASKS_PER_WORKER', '50'))
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if pool_size() <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' workers start clean (no copied DB connections or server
+            # threads) and allow max_tasks_per_child, which recycles workers
+            # to cap memory leaked by long-running PyMuPDF processes.
+            import multiprocessing
+            _pool = ProcessPoolExecutor(
+                max_workers=pool_size(),
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=max(1, max_tasks_per_worker()),
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor, kill: bool = False) -> None:
+    """Forget a pool so the next task starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if kill:
+        _killed_pools.add(pool)
+        # a running task cannot be cancelled, so stop its process outright
+        for process in list(getattr(pool, '_processes', {}).values()):
+            process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(func: Callable[..., Any], *args: Any):
+    pool = _get_pool()
+    try:
+        return pool, pool.submit(func, *args)
+    except (BrokenProcessPool, RuntimeError):
+        # a previous task broke this pool; start a fresh one
+        _discard_pool(pool)
+        pool = _get_pool()
+        return pool, pool.submit(func, *args)
+
+
+def run(func: Callable[..., Any], *args: Any) -> Any:
+    """Run `func(*args)` in the extraction pool, or in-process if it is disabled.
+
+    `func` must be a top-level function of a Django-free module (see
+    `pdf_text`). Raises ExtractionTimeout after CV_EXTRACTION_TIMEOUT seconds
+    and ExtractionError if the worker process died; the document is not
+    retried in-process since it may be what crashed the worker. A task that
+    was lost because another task timed out and the pool was killed is
+    resubmitted once to the fresh pool.
+    """
+    if _get_pool() is None:
+        return func(*args)
+
+    for attempt in range(2):
+        pool, future = _submit(func, *args)
+        try:
+            return future.result(timeout=task_timeout())
+        except FutureTimeoutError:
+            logger.error('CV text extraction timed out after %ss', task_timeout())
+            _discard_pool(pool, kill=True)
+            raise ExtractionTimeout(f'Extraction did not finish within {task_timeout()}s')
+        except (BrokenProcessPool, CancelledError) as exc:
+            if pool in _killed_pools and attempt == 0:
+                logger.warning('CV text extraction lost to a timed out neighbour; retrying')
+                continue
+            logger.error('CV text extraction worker died: %s', exc)
+            _discard_pool(pool)
+            raise ExtractionError('Extraction worker died') from exc
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
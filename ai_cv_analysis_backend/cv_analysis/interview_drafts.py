@@ -0,0 +1,127 @@
+"""Interview questions prepared in the background right after an analysis.
+
+Users usually start an interview straight after reading their analysis, so
+`save_analysis_result` schedules `prepare_draft` once the analysis is
+committed. It stores a question set as an InterviewDraft, and
+`InterviewViewSet.start` claims it instead of waiting for the LLM. Drafts
+not claimed within INTERVIEW_DRAFT_TTL_SECONDS are discarded.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from . import llm_client
+from .conf import setting
+from .interview_service import (
+    INTERVIEW_MAX_TOKENS,
+    INTERVIEW_TEMPERATURE,
+    add_to_bank,
+    build_interview_messages,
+    clean_questions,
+    draw_from_bank,
+    parse_questions,
+)
+from .models import CVAnalysisResult, InterviewDraft
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def drafts_enabled() -> bool:
+    return str(setting('INTERVIEW_DRAFTS_ENABLED', 'true')).lower() in ['1', 'true', 'yes']
+
+
+def draft_ttl() -> timedelta:
+    return timedelta(seconds=int(setting('INTERVIEW_DRAFT_TTL_SECONDS', '3600')))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(setting('INTERVIEW_DRAFT_WORKERS', '2'))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='interview-draft')
+        return _executor
+
+
+def schedule_draft(analysis: CVAnalysisResult) -> None:
+    """Prepare a draft for `analysis` in the background once the current transaction commits."""
+    if not drafts_enabled():
+        return
+    analysis_id = analysis.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run, analysis_id))
+
+
+def _run(analysis_id: int) -> None:
+    try:
+        prepare_draft(analysis_id)
+    except Exception:
+        logger.exception('Failed to prepare interview draft for analysis %s', analysis_id)
+    finally:
+        close_old_connections()
+
+
+def _generate(analysis: CVAnalysisResult) -> Optional[List[Dict[str, Any]]]:
+    questions = draw_from_bank(analysis)
+    if questions is not None:
+        return questions
+    try:
+        data = llm_client.chat_completion(
+            build_interview_messages(analysis),
+            temperature=INTERVIEW_TEMPERATURE,
+            max_tokens=INTERVIEW_MAX_TOKENS,
+        )
+    except llm_client.LLMError as exc:
+        logger.warning('Could not prepare interview questions for analysis %s: %s', analysis.pk, exc)
+        return None
+    questions = clean_questions(parse_questions(llm_client.message_content(data)))
+    if not questions:
+        return None
+    add_to_bank(analysis, questions)
+    return questions
+
+
+def prepare_draft(analysis_id: int) -> Optional[InterviewDraft]:
+    """Generate and store a draft for the analysis, unless a live one exists.
+
+    Also deletes expired drafts. Returns the draft, or None if the analysis
+    is gone or no questions could be generated.
+    """
+    now = timezone.now()
+    InterviewDraft.objects.filter(expires_at__lte=now).delete()
+    if InterviewDraft.objects.filter(analysis_id=analysis_id).exists():
+        return None
+    analysis = CVAnalysisResult.objects.filter(pk=analysis_id).first()
+    if analysis is None:
+        return None
+
+    questions = _generate(analysis)
+    if questions is None:
+        return None
+    try:
+        return InterviewDraft.objects.create(analysis=analysis, questions=questions, expires_at=timezone.now() + draft_ttl())
+    except IntegrityError:
+        # analysis replaced or a draft stored concurrently
+        return None
+
+
+def claim_draft(analysis: CVAnalysisResult) -> Optional[List[Dict[str, Any]]]:
+    """Take the live draft of `analysis`, if any, and return its questions.
+
+    The draft row is deleted by the claim, so concurrent starts never share
+    a question set.
+    """
+    if not drafts_enabled():
+        return None
+    draft = InterviewDraft.objects.filter(analysis=analysis, expires_at__gt=timezone.now()).first()
+    if draft is None:
+        return None
+    claimed, _ = InterviewDraft.objects.filter(pk=draft.pk).delete()
+    return draft.questions if claimed else None
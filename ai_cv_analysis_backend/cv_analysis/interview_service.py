@@ -0,0 +1,306 @@
+import hashlib
+import json
+import logging
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, When
+from django.utils import timezone
+
+from . import read_cache
+from .conf import setting
+from .models import BankQuestion, Interview, InterviewQuestion
+
+logger = logging.getLogger(__name__)
+
+INTERVIEW_SYSTEM_PROMPT = 'You are a professional technical interviewer. Always respond with valid JSON only.'
+INTERVIEW_TEMPERATURE = 0.7
+INTERVIEW_MAX_TOKENS = 2000
+INTERVIEW_QUESTION_COUNT = 10
+CHOICE_KEYS = ('A', 'B', 'C', 'D')
+CHOICE_MAX_LENGTH = InterviewQuestion._meta.get_field('choice_1').max_length
+
+# Experience levels are bucketed coarsely so "Mid-Level" and "Intermediate" match
+_LEVEL_WORDS = (
+    ('junior', ('entry', 'junior', 'graduate', 'intern', 'trainee', 'beginner')),
+    ('senior', ('senior', 'lead', 'principal', 'staff', 'expert', 'architect', 'head', 'director')),
+    ('mid', ('mid', 'intermediate', 'associate', 'experienced')),
+)
+_NON_WORD = re.compile(r'[^a-z0-9+#.]+')
+# Choices that point at other choices ("Both A and B", "All of the above")
+# and so only make sense in their original order
+_POSITIONAL_CHOICE = re.compile(
+    r'\b[A-D]\s*(?:,|&|and|or)\s*[A-D]\b|\b(?:[Oo]nly|[Oo]ption|[Cc]hoice|[Aa]nswer)\s+[A-D]\b'
+    r'|(?i:\b(?:above|below|both|neither|all of|none of)\b)'
+)
+
+
+def build_interview_messages(analysis) -> List[Dict[str, str]]:
+    """Chat messages asking for interview questions matching a CVAnalysisResult."""
+    prompt = f"""
+You are a professional interviewer preparing a candidate for a real technical or professional job interview.
+
+The candidate’s background and skillset are summarized below. Use this information only to understand their **role, domain, and expertise level** — do NOT ask questions about their CV, summary, or skills list directly.
+
+Candidate Profile:
+Summary: {analysis.summary}
+Skills: {', '.join(analysis.skills_extracted)}
+Experience Level: {analysis.experience_level}
+Suggestions: {analysis.suggestions}
+
+Your task:
+Generate **10 realistic multiple-choice interview questions** that the candidate might face in an actual interview for a position that matches their background.
+
+Guidelines:
+- Questions must evaluate **real job-relevant knowledge** or **problem-solving ability**, not what’s written in the CV.
+- Use **scenario-based, conceptual, and practical** questions related to their field.
+- Adapt question difficulty to their experience level (junior/mid/senior).
+- Each question should sound like it could come from a **real interviewer**.
+- Avoid any reference to the CV, résumé, skills list, or candidate summary in the question text.
+- Keep questions short, professional, and natural.
+
+Formatting:
+Return ONLY valid JSON in this exact structure (no markdown, no commentary):
+
+[
+  {{
+    "question": "Question text here",
+    "choices": {{
+      "A": "Option A",
+      "B": "Option B",
+      "C": "Option C",
+      "D": "Option D"
+    }},
+    "correct": "A"
+  }},
+  ...
+]
+"""
+    return [
+        {'role': 'system', 'content': INTERVIEW_SYSTEM_PROMPT},
+        {'role': 'user', 'content': prompt},
+    ]
+
+
+def parse_questions(response_text: str) -> Optional[List[Dict[str, Any]]]:
+    """Decode the model's JSON list of questions. Returns None if it is not JSON."""
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        logger.error('Failed to parse JSON from OpenAI response: %s', response_text)
+        return None
+
+
+def clean_question(q: Any) -> Optional[Dict[str, Any]]:
+    """A generated question with stripped text, choices A-D cut to the column
+    length and an upper-case `correct` letter, or None if it is incomplete."""
+    if not isinstance(q, dict):
+        return None
+    text = str(q.get('question') or '').strip()
+    choices = q.get('choices')
+    if not text or not isinstance(choices, dict):
+        return None
+    cleaned = {key: str(choices.get(key) or '').strip()[:CHOICE_MAX_LENGTH] for key in CHOICE_KEYS}
+    correct = str(q.get('correct') or '').strip().upper()[:1]
+    if not all(cleaned.values()) or correct not in CHOICE_KEYS:
+        return None
+    return {'question': text, 'choices': cleaned, 'correct': correct}
+
+
+def clean_questions(questions_data: Any) -> List[Dict[str, Any]]:
+    """The usable questions of a parsed model response (see `clean_question`)."""
+    if not isinstance(questions_data, list):
+        return []
+    return [q for q in map(clean_question, questions_data) if q is not None]
+
+
+def create_interview(cv, questions_data: Any) -> Optional[Interview]:
+    """Create an Interview for `cv` holding the usable questions of `questions_data`.
+
+    Invalid questions are dropped and `total_questions` is the number
+    stored. The interview and all its questions are written in one
+    transaction with a single multi-row INSERT for the questions. Returns
+    None, storing nothing, if no question is usable.
+    """
+    questions = clean_questions(questions_data)
+    if not questions:
+        return None
+    with transaction.atomic():
+        interview = Interview.objects.create(cv=cv, total_questions=len(questions))
+        InterviewQuestion.objects.bulk_create([
+            InterviewQuestion(
+                interview=interview,
+                question_text=q['question'],
+                choice_1=q['choices']['A'],
+                choice_2=q['choices']['B'],
+                choice_3=q['choices']['C'],
+                choice_4=q['choices']['D'],
+                correct_answer=q['correct'],
+            )
+            for q in questions
+        ])
+    return interview
+
+
+def record_answers(interview: Interview, answers: Dict[int, str]) -> Dict[str, Any]:
+    """Store `answers` (question id -> choice key) and update the interview's score.
+
+    Only the answered questions are read; the interview counters are moved
+    by the change each answer makes, in a single UPDATE, so the cost does
+    not grow with the number of questions. Raises
+    InterviewQuestion.DoesNotExist if a question is not part of `interview`.
+    Returns the new counters of the interview.
+    """
+    with transaction.atomic():
+        questions = list(
+            InterviewQuestion.objects.select_for_update()
+            .filter(interview=interview, pk__in=list(answers))
+            .only('id', 'user_answer', 'correct_answer')
+        )
+        if len(questions) != len(answers):
+            raise InterviewQuestion.DoesNotExist('Question not found')
+
+        answered_delta = correct_delta = 0
+        changed = []
+        for question in questions:
+            answer = answers[question.pk]
+            if answer == question.user_answer:
+                continue
+            answered_delta += question.user_answer is None
+            correct_delta += (answer == question.correct_answer) - (question.user_answer == question.correct_answer)
+            question.user_answer = answer
+            changed.append(question)
+
+        if changed:
+            InterviewQuestion.objects.bulk_update(changed, ['user_answer'])
+            Interview.objects.filter(pk=interview.pk).update(
+                correct_answers=F('correct_answers') + correct_delta,
+                answered_questions=F('answered_questions') + answered_delta,
+                score=Case(
+                    When(total_questions__gt=0, then=ExpressionWrapper(
+                        (F('correct_answers') + correct_delta) * 100.0 / F('total_questions'),
+                        output_field=FloatField(),
+                    )),
+                    default=0.0,
+                ),
+                # the right-hand side sees the old row, hence the delta
+                completed=Case(
+                    When(answered_questions__gte=F('total_questions') - answered_delta, then=True),
+                    default=F('completed'),
+                ),
+                updated_at=timezone.now(),
+            )
+        counters = Interview.objects.filter(pk=interview.pk).values(
+            'correct_answers', 'answered_questions', 'score', 'completed', 'cv__user_id',
+        ).get()
+        owner = counters.pop('cv__user_id')
+        if changed:
+            # the updates above send no signals
+            read_cache.invalidate(owner, [(read_cache.INTERVIEW_DETAIL, interview.pk)])
+        return counters
+
+
+def bank_enabled() -> bool:
+    return str(setting('QUESTION_BANK_ENABLED', 'true')).lower() in ['1', 'true', 'yes']
+
+
+def bank_min_questions() -> int:
+    return int(setting('QUESTION_BANK_MIN_QUESTIONS', '30'))
+
+
+def bank_fingerprint_skills() -> int:
+    return int(setting('QUESTION_BANK_FINGERPRINT_SKILLS', '5'))
+
+
+def normalize_skill(skill: Any) -> str:
+    return _NON_WORD.sub(' ', str(skill).lower()).strip()
+
+
+def skill_fingerprint(skills: List[Any]) -> str:
+    """Hash of the candidate's main skills, independent of order and spelling.
+
+    The first QUESTION_BANK_FINGERPRINT_SKILLS distinct skills are used (the
+    analysis lists the key ones first), lower-cased with punctuation removed.
+    """
+    main = []
+    for skill in skills or []:
+        name = normalize_skill(skill)
+        if name and name not in main:
+            main.append(name)
+        if len(main) >= bank_fingerprint_skills():
+            break
+    return hashlib.sha256('|'.join(sorted(main)).encode('utf-8')).hexdigest()
+
+
+def normalize_experience_level(level: Optional[str]) -> str:
+    words = set(re.findall(r'[a-z]+', (level or '').lower()))
+    for bucket, names in _LEVEL_WORDS:
+        if words.intersection(names):
+            return bucket
+    return normalize_skill(level or '')[:20] or 'unknown'
+
+
+def bank_key(analysis) -> Tuple[str, str]:
+    """(fingerprint, experience level) of the question bucket for a CVAnalysisResult."""
+    return skill_fingerprint(analysis.skills_extracted), normalize_experience_level(analysis.experience_level)
+
+
+def add_to_bank(analysis, questions_data: List[Dict[str, Any]]) -> int:
+    """Keep well-formed generated questions in the bank bucket of `analysis`.
+
+    Questions already in the bucket are skipped. Returns how many were offered.
+    """
+    if not bank_enabled():
+        return 0
+    fingerprint, level = bank_key(analysis)
+    rows = []
+    for q in clean_questions(questions_data):
+        text = q['question']
+        rows.append(BankQuestion(
+            fingerprint=fingerprint,
+            experience_level=level,
+            text_hash=hashlib.sha256(' '.join(text.lower().split()).encode('utf-8')).hexdigest(),
+            question_text=text,
+            choice_1=q['choices']['A'],
+            choice_2=q['choices']['B'],
+            choice_3=q['choices']['C'],
+            choice_4=q['choices']['D'],
+            correct_answer=q['correct'],
+        ))
+    BankQuestion.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def draw_from_bank(analysis, count: int = INTERVIEW_QUESTION_COUNT) -> Optional[List[Dict[str, Any]]]:
+    """A random set of `count` banked questions for `analysis`, or None.
+
+    Returns None (so the caller generates new questions, topping the bucket
+    up) until the bucket holds QUESTION_BANK_MIN_QUESTIONS questions, which
+    keeps consecutive sets varied. The choices of every question are
+    shuffled too, unless one of them refers to the others by letter or
+    position.
+    """
+    if not bank_enabled():
+        return None
+    fingerprint, level = bank_key(analysis)
+    ids = list(BankQuestion.objects.filter(fingerprint=fingerprint, experience_level=level)
+               .values_list('id', flat=True))
+    if len(ids) < max(count, bank_min_questions()):
+        return None
+    picked = random.sample(ids, count)
+    BankQuestion.objects.filter(id__in=picked).update(times_served=F('times_served') + 1)
+
+    questions = []
+    for bq in sorted(BankQuestion.objects.filter(id__in=picked), key=lambda q: picked.index(q.id)):
+        choices = [bq.choice_1, bq.choice_2, bq.choice_3, bq.choice_4]
+        correct = choices[CHOICE_KEYS.index(bq.correct_answer)]
+        if not any(_POSITIONAL_CHOICE.search(choice) for choice in choices):
+            random.shuffle(choices)
+        questions.append({
+            'question': bq.question_text,
+            'choices': dict(zip(CHOICE_KEYS, choices)),
+            'correct': CHOICE_KEYS[choices.index(correct)],
+        })
+    return questions
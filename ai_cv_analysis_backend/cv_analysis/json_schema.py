@@ -0,0 +1,53 @@
+"""A small JSON Schema checker for LLM output.
+
+Covers the keywords our schemas use (type, required, properties, items,
+minimum, maximum, minLength, maxLength, enum) so the same schema can be
+sent as a structured-output `response_format` and used to check what comes
+back, without pulling in a full validator.
+"""
+from typing import Any, Dict, List
+
+_TYPES = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def schema_errors(value: Any, schema: Dict[str, Any], path: str = '$') -> List[str]:
+    """Return a list of human-readable problems with `value`; empty if it is valid."""
+    expected = schema.get('type')
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_TYPES[t](value) for t in types):
+            return [f"{path}: expected {' or '.join(types)}, got {type(value).__name__}"]
+
+    errors = []
+    if 'enum' in schema and value not in schema['enum']:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}: missing required key {key!r}")
+        for key, sub in schema.get('properties', {}).items():
+            if key in value:
+                errors.extend(schema_errors(value[key], sub, f'{path}.{key}'))
+    elif isinstance(value, list) and 'items' in schema:
+        for i, item in enumerate(value):
+            errors.extend(schema_errors(item, schema['items'], f'{path}[{i}]'))
+    elif isinstance(value, str):
+        if 'minLength' in schema and len(value) < schema['minLength']:
+            errors.append(f"{path}: shorter than {schema['minLength']} characters")
+        if 'maxLength' in schema and len(value) > schema['maxLength']:
+            errors.append(f"{path}: longer than {schema['maxLength']} characters")
+    elif _TYPES['number'](value):
+        if 'minimum' in schema and value < schema['minimum']:
+            errors.append(f"{path}: {value} is less than {schema['minimum']}")
+        if 'maximum' in schema and value > schema['maximum']:
+            errors.append(f"{path}: {value} is greater than {schema['maximum']}")
+    return errors
@@ -0,0 +1,552 @@
+import asyncio
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+from .conf import setting
+from .llm_guard import CircuitBreaker, ConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Failures worth another attempt: the connection dropped or broke mid-body.
+# Anything else (an invalid URL or scheme, bad headers) fails the same way again.
+RETRY_ERRORS = (requests.ConnectionError, requests.exceptions.ChunkedEncodingError)
+# TransportErrors of httpx that are caused by the request itself
+ASYNC_FATAL_ERRORS = (httpx.UnsupportedProtocol, httpx.LocalProtocolError)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# one AsyncClient per event loop; clients cannot be shared between loops
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+_limiter: Optional[ConcurrencyLimiter] = None
+_breaker: Optional[CircuitBreaker] = None
+_guard_lock = threading.Lock()
+_stats = {'calls': 0, 'retries': 0, 'failures': 0}
+_stats_lock = threading.Lock()
+# (url, model) pairs whose API answered 400 to `response_format`
+_no_response_format = set()
+
+RESPONSE_FORMATS = ('json_schema', 'json_object', 'off')
+
+
+class LLMError(RuntimeError):
+    """Raised when the LLM API could not be reached or kept failing."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the API when the circuit is open or too many
+    calls are already in flight. `retry_after` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message, status_code=503)
+        self.retry_after = retry_after
+
+
+def default_model() -> str:
+    return setting('OPENAI_MODEL', 'gpt-3.5-turbo')
+
+
+def get_config() -> Dict[str, Any]:
+    """Resolve API key, model, URL and timeout from settings or environment.
+
+    Raises RuntimeError if no API key is configured.
+    """
+    api_key = setting('OPENAI_API_KEY', None)
+    if not api_key:
+        raise RuntimeError('OPENAI_API_KEY not configured')
+    return {
+        'api_key': api_key,
+        'model': default_model(),
+        'url': setting('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions'),
+        'timeout': int(setting('OPENAI_TIMEOUT', '30')),
+    }
+
+
+def get_session() -> requests.Session:
+    """Process-wide session so connections (and TLS sessions) are kept alive."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=int(setting('LLM_POOL_CONNECTIONS', '4')),
+                pool_maxsize=int(setting('LLM_POOL_MAXSIZE', '20')),
+                max_retries=0,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(setting('LLM_ASYNC_MAX_CONNECTIONS', '200')),
+                max_keepalive_connections=int(setting('LLM_POOL_MAXSIZE', '20')),
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _retry_after(resp: Any) -> Optional[float]:
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    base = float(setting('LLM_BACKOFF_BASE', '0.5'))
+    cap = float(setting('LLM_BACKOFF_MAX', '8'))
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, float(setting('LLM_RETRY_AFTER_MAX', '30'))))
+    return delay
+
+
+def response_format_mode() -> str:
+    """LLM_RESPONSE_FORMAT: `json_schema`, `json_object` (the default) or `off`."""
+    return str(setting('LLM_RESPONSE_FORMAT', 'json_object')).lower()
+
+
+def response_format(name: str, schema: Dict[str, Any], model: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The `response_format` request parameter for a JSON answer matching `schema`.
+
+    LLM_RESPONSE_FORMAT picks structured outputs (`json_schema`), plain JSON
+    mode (`json_object`, the default) or `off`. Returns None when disabled or
+    when the API already refused the parameter for this model.
+    """
+    mode = response_format_mode()
+    config = get_config()
+    if mode not in RESPONSE_FORMATS or mode == 'off' or (config['url'], model or config['model']) in _no_response_format:
+        return None
+    if mode == 'json_schema':
+        return {'type': 'json_schema', 'json_schema': {'name': name, 'schema': schema}}
+    return {'type': 'json_object'}
+
+
+def _drop_rejected_response_format(config: Dict[str, Any], payload: Dict[str, Any], status_code: int, body: str) -> bool:
+    """Remove `response_format` from `payload` if that is what the API rejected.
+
+    Servers without JSON mode answer 400 naming the parameter; the model is
+    remembered so later calls leave it out. Returns True if the request
+    should be sent again.
+    """
+    if status_code != 400 or 'response_format' not in payload or 'response_format' not in body:
+        return False
+    payload.pop('response_format')
+    _no_response_format.add((config['url'], payload.get('model')))
+    logger.warning('LLM API rejected response_format for model %s; sending requests without it',
+                   payload.get('model'))
+    return True
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    global _limiter
+    with _guard_lock:
+        if _limiter is None:
+            _limiter = ConcurrencyLimiter(
+                local_limit=int(setting('LLM_MAX_CONCURRENCY', '8')),
+                global_limit=int(setting('LLM_GLOBAL_MAX_CONCURRENCY', '0')),
+                acquire_timeout=float(setting('LLM_CONCURRENCY_TIMEOUT', '5')),
+                cache_alias=setting('LLM_CONCURRENCY_CACHE', 'default'),
+                slot_ttl=int(setting('LLM_GLOBAL_SLOT_TTL', '300')),
+            )
+        return _limiter
+
+
+def get_breaker() -> CircuitBreaker:
+    global _breaker
+    with _guard_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=int(setting('LLM_BREAKER_FAILURE_THRESHOLD', '5')),
+                reset_timeout=float(setting('LLM_BREAKER_RESET_SECONDS', '30')),
+            )
+        return _breaker
+
+
+def _record_outcome(breaker: CircuitBreaker, exc: Optional[BaseException]) -> None:
+    if exc is None or isinstance(exc, GeneratorExit):
+        # GeneratorExit: the consumer of a stream stopped reading early
+        breaker.record_success()
+    elif isinstance(exc, LLMUnavailable):
+        return
+    elif isinstance(exc, LLMError) and exc.status_code is not None and exc.status_code not in RETRY_STATUSES:
+        # the upstream answered; a bad request says nothing about its health
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+
+class _Slot:
+    """The limiter slot of one guarded call.
+
+    Retry loops give the slot back while they sleep before the next
+    attempt, so a call in backoff does not hold capacity others could use.
+    """
+
+    def __init__(self, limiter: ConcurrencyLimiter):
+        self.limiter = limiter
+        self.token: Optional[str] = None
+
+    def take(self) -> None:
+        self.token = self.limiter.acquire()
+        if self.token is None:
+            raise LLMUnavailable('Too many concurrent AI requests', retry_after=1)
+
+    def give_back(self) -> None:
+        token, self.token = self.token, None
+        self.limiter.release(token)
+
+    async def atake(self) -> None:
+        # acquire may wait and talks to the cache: keep it off the event loop
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.limiter.acquire))
+        try:
+            self.token = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the thread may still win a slot after the caller went away
+            acquiring.add_done_callback(self._release_acquired)
+            raise
+        if self.token is None:
+            raise LLMUnavailable('Too many concurrent AI requests', retry_after=1)
+
+    async def agive_back(self) -> None:
+        if self.limiter.global_limit > 0:
+            await asyncio.to_thread(self.give_back)
+        else:
+            self.give_back()
+
+    def _release_acquired(self, future: 'asyncio.Future[Optional[str]]') -> None:
+        if not future.cancelled() and future.exception() is None:
+            self.limiter.release(future.result())
+
+
+@contextmanager
+def guarded_call() -> Iterator[_Slot]:
+    """Admit one outbound LLM call through the concurrency limiter and the
+    circuit breaker, recording its outcome.
+
+    Raises LLMUnavailable instead of calling when either guard refuses.
+    Only upstream failures (connection errors, timeouts, 429/5xx) count
+    against the breaker. Yields the call's limiter slot for the retry loop.
+    """
+    breaker = get_breaker()
+    slot = _Slot(get_limiter())
+    slot.take()
+    try:
+        if not breaker.allow():
+            raise LLMUnavailable('AI service is temporarily unavailable', retry_after=breaker.retry_after())
+        try:
+            yield slot
+        except BaseException as exc:
+            _record_outcome(breaker, exc)
+            raise
+        _record_outcome(breaker, None)
+    finally:
+        slot.give_back()
+
+
+@asynccontextmanager
+async def async_guarded_call() -> AsyncIterator[_Slot]:
+    """`guarded_call` for coroutines: waits for a limiter slot without
+    blocking the event loop."""
+    breaker = get_breaker()
+    slot = _Slot(get_limiter())
+    await slot.atake()
+    try:
+        if not breaker.allow():
+            raise LLMUnavailable('AI service is temporarily unavailable', retry_after=breaker.retry_after())
+        try:
+            yield slot
+        except BaseException as exc:
+            _record_outcome(breaker, exc)
+            raise
+        _record_outcome(breaker, None)
+    finally:
+        await slot.agive_back()
+
+
+def chat_completion(messages: List[Dict[str, str]], *, model: Optional[str] = None,
+                    timeout: Optional[int] = None, **params: Any) -> Dict[str, Any]:
+    """POST a chat completion request and return the decoded JSON response.
+
+    429 and 5xx responses and connection errors are retried up to
+    LLM_MAX_RETRIES times with jittered exponential backoff. The call goes
+    through `guarded_call`, so it fails fast with LLMUnavailable while the
+    circuit is open. Raises LLMError when the API keeps failing and
+    RuntimeError when it is not configured.
+    """
+    config = get_config()
+    payload = {'model': model or config['model'], 'messages': messages}
+    payload.update(params)
+    with guarded_call() as slot:
+        return _post_with_retries(config, payload, timeout, slot=slot)
+
+
+def stream_chat_completion(messages: List[Dict[str, str]], *, model: Optional[str] = None,
+                           timeout: Optional[int] = None, **params: Any) -> Iterator[str]:
+    """Request a completion with `stream: true` and yield its text deltas.
+
+    Connecting is retried like `chat_completion`; once tokens are flowing a
+    broken stream raises LLMError. The limiter slot is held until the
+    generator is exhausted or closed.
+    """
+    config = get_config()
+    payload = {'model': model or config['model'], 'messages': messages, 'stream': True}
+    if str(setting('LLM_STREAM_INCLUDE_USAGE', 'true')).lower() in ['1', 'true', 'yes']:
+        # ask for a final chunk with the `usage` block so tokens can be counted
+        payload['stream_options'] = {'include_usage': True}
+    payload.update(params)
+    with guarded_call() as slot:
+        resp = _post_with_retries(config, payload, timeout, stream=True, slot=slot)
+        try:
+            yield from _iter_stream_deltas(resp.iter_lines())
+        except requests.RequestException as exc:
+            _count('failures')
+            logger.exception('OpenAI stream interrupted: %s', exc)
+            raise LLMError('OpenAI stream interrupted') from exc
+        finally:
+            resp.close()
+
+
+def _iter_stream_deltas(lines: Iterator[bytes]) -> Iterator[str]:
+    """Content deltas of a chat completion server-sent-events body."""
+    for line in lines:
+        if not line.startswith(b'data:'):
+            continue
+        data = line[5:].strip()
+        if data == b'[DONE]':
+            return
+        try:
+            chunk = json.loads(data)
+            choices = chunk['choices']
+            delta = (choices[0].get('delta') or {}).get('content') if choices else None
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            _count('failures')
+            raise LLMError('Invalid stream chunk from OpenAI') from exc
+        if chunk.get('usage'):
+            metrics.observe_llm_usage(chunk)
+        if delta:
+            yield delta
+
+
+def _post_with_retries(config: Dict[str, Any], payload: Dict[str, Any], timeout: Optional[int],
+                       stream: bool = False, slot: Optional[_Slot] = None) -> Any:
+    headers = {
+        'Authorization': f"Bearer {config['api_key']}",
+        'Content-Type': 'application/json',
+    }
+    max_retries = int(setting('LLM_MAX_RETRIES', '3'))
+    session = get_session()
+    _count('calls')
+
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            resp = session.post(config['url'], headers=headers, json=payload,
+                                timeout=timeout or config['timeout'], stream=stream)
+        except RETRY_ERRORS as exc:
+            metrics.observe_llm_request('error', time.perf_counter() - started)
+            if attempt >= max_retries:
+                _count('failures')
+                logger.exception('OpenAI request failed: %s', exc)
+                raise LLMError('OpenAI request failed') from exc
+            delay = _backoff(attempt)
+            logger.warning('OpenAI connection error (%s); retrying in %.2fs', exc, delay)
+        except requests.RequestException as exc:
+            # timeouts are not retried either: the caller already waited the full timeout
+            outcome = 'timeout' if isinstance(exc, requests.Timeout) else 'error'
+            metrics.observe_llm_request(outcome, time.perf_counter() - started)
+            _count('failures')
+            logger.exception('OpenAI request failed: %s', exc)
+            raise LLMError('OpenAI request failed') from exc
+        else:
+            # for streams this is the time to the response headers
+            metrics.observe_llm_request(resp.status_code, time.perf_counter() - started)
+            if resp.status_code == 200:
+                if stream:
+                    return resp
+                try:
+                    data = resp.json()
+                    metrics.observe_llm_usage(data)
+                    return data
+                except ValueError:
+                    _count('failures')
+                    logger.exception('Failed to decode JSON response from OpenAI')
+                    raise LLMError('Invalid JSON from OpenAI', resp.status_code)
+
+            if _drop_rejected_response_format(config, payload, resp.status_code, resp.text):
+                resp.close()
+                continue
+            if resp.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                _count('failures')
+                logger.error('OpenAI API error %s: %s', resp.status_code, resp.text)
+                raise LLMError(f'OpenAI API error: {resp.status_code}', resp.status_code)
+            delay = _backoff(attempt, _retry_after(resp))
+            logger.warning('OpenAI API returned %s; retrying in %.2fs', resp.status_code, delay)
+            resp.close()
+
+        attempt += 1
+        _count('retries')
+        if slot is not None:
+            slot.give_back()
+        time.sleep(delay)
+        if slot is not None:
+            slot.take()
+
+
+async def async_chat_completion(messages: List[Dict[str, str]], *, model: Optional[str] = None,
+                                timeout: Optional[int] = None, **params: Any) -> Dict[str, Any]:
+    """Non-blocking `chat_completion` using the shared httpx AsyncClient.
+
+    Same retry, backoff and guard behaviour; raises the same errors.
+    """
+    config = get_config()
+    payload = {'model': model or config['model'], 'messages': messages}
+    payload.update(params)
+    async with async_guarded_call() as slot:
+        return await _apost_with_retries(config, payload, timeout, slot=slot)
+
+
+async def _apost_with_retries(config: Dict[str, Any], payload: Dict[str, Any], timeout: Optional[int],
+                              slot: Optional[_Slot] = None) -> Dict[str, Any]:
+    headers = {
+        'Authorization': f"Bearer {config['api_key']}",
+        'Content-Type': 'application/json',
+    }
+    max_retries = int(setting('LLM_MAX_RETRIES', '3'))
+    client = get_async_client()
+    _count('calls')
+
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            resp = await client.post(config['url'], headers=headers, json=payload, timeout=timeout or config['timeout'])
+        except (httpx.TimeoutException, *ASYNC_FATAL_ERRORS) as exc:
+            # timeouts are not retried: the caller already waited the full timeout
+            outcome = 'timeout' if isinstance(exc, httpx.TimeoutException) else 'error'
+            metrics.observe_llm_request(outcome, time.perf_counter() - started)
+            _count('failures')
+            logger.exception('OpenAI request failed: %s', exc)
+            raise LLMError('OpenAI request failed') from exc
+        except httpx.TransportError as exc:
+            metrics.observe_llm_request('error', time.perf_counter() - started)
+            if attempt >= max_retries:
+                _count('failures')
+                logger.exception('OpenAI request failed: %s', exc)
+                raise LLMError('OpenAI request failed') from exc
+            delay = _backoff(attempt)
+            logger.warning('OpenAI connection error (%s); retrying in %.2fs', exc, delay)
+        except (httpx.RequestError, httpx.InvalidURL) as exc:
+            metrics.observe_llm_request('error', time.perf_counter() - started)
+            _count('failures')
+            logger.exception('OpenAI request failed: %s', exc)
+            raise LLMError('OpenAI request failed') from exc
+        else:
+            metrics.observe_llm_request(resp.status_code, time.perf_counter() - started)
+            if resp.status_code == 200:
+                try:
+                    data = resp.json()
+                    metrics.observe_llm_usage(data)
+                    return data
+                except ValueError:
+                    _count('failures')
+                    logger.exception('Failed to decode JSON response from OpenAI')
+                    raise LLMError('Invalid JSON from OpenAI', resp.status_code)
+
+            if _drop_rejected_response_format(config, payload, resp.status_code, resp.text):
+                continue
+            if resp.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                _count('failures')
+                logger.error('OpenAI API error %s: %s', resp.status_code, resp.text)
+                raise LLMError(f'OpenAI API error: {resp.status_code}', resp.status_code)
+            delay = _backoff(attempt, _retry_after(resp))
+            logger.warning('OpenAI API returned %s; retrying in %.2fs', resp.status_code, delay)
+
+        attempt += 1
+        _count('retries')
+        if slot is not None:
+            await slot.agive_back()
+        await asyncio.sleep(delay)
+        if slot is not None:
+            await slot.atake()
+
+
+def message_content(data: Dict[str, Any]) -> str:
+    """Return the assistant text of a chat completion response."""
+    try:
+        return data['choices'][0]['message']['content']
+    except Exception:
+        try:
+            # fall back to older shape
+            return data['choices'][0]['text']
+        except Exception:
+            return str(data)
+
+
+def guard_stats() -> Dict[str, Any]:
+    """State of the circuit breaker and the concurrency limiter."""
+    return {'breaker': get_breaker().stats(), 'limiter': get_limiter().stats()}
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Call counters plus connection reuse of the shared HTTP pool."""
+    with _stats_lock:
+        data = dict(_stats)
+
+    connections = requests_sent = 0
+    if _session is not None:
+        seen = set()
+        for adapter in _session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_sent += pool.num_requests
+    data['connections_opened'] = connections
+    data['http_requests'] = requests_sent
+    data['connections_reused'] = max(0, requests_sent - connections)
+    return data
@@ -0,0 +1,186 @@
+"""Concurrency limiting and circuit breaking for outbound LLM calls.
+
+Both guards only decide whether a call may proceed; `llm_client` turns a
+refusal into an LLMUnavailable error that views report as 503.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Deletes a slot key only if it still holds the releasing owner's id
+_RELEASE_SLOT_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight calls per process and, optionally, across processes.
+
+    The per-process cap is a semaphore. The global cap uses `global_limit`
+    slot keys in a Django cache: a caller owns a slot while its key holds
+    the caller's random owner id (`cache.add` is atomic on Redis/Memcached).
+    Slots expire after `slot_ttl` seconds so a crashed process cannot leak
+    them forever; releasing only deletes the key if it still holds the
+    caller's id, so a caller whose slot expired cannot free a slot somebody
+    else has taken since.
+    """
+
+    def __init__(self, local_limit: int, global_limit: int = 0, acquire_timeout: float = 5.0,
+                 cache_alias: str = 'default', slot_ttl: int = 300, key_prefix: str = 'llm-slot'):
+        self.local_limit = local_limit
+        self.global_limit = global_limit
+        self.acquire_timeout = acquire_timeout
+        self.cache_alias = cache_alias
+        self.slot_ttl = slot_ttl
+        self.key_prefix = key_prefix
+        self._semaphore = threading.BoundedSemaphore(local_limit) if local_limit > 0 else None
+        self._in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[str]:
+        """Wait up to `acquire_timeout` for capacity.
+
+        Returns a token to pass to `release`, or None if no capacity freed up.
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        if self._semaphore is not None and not self._semaphore.acquire(timeout=self.acquire_timeout):
+            self._reject()
+            return None
+
+        token = 'local'
+        if self.global_limit > 0:
+            token = self._acquire_global_slot(deadline)
+            if token is None:
+                if self._semaphore is not None:
+                    self._semaphore.release()
+                self._reject()
+                return None
+
+        with self._lock:
+            self._in_flight += 1
+        return token
+
+    def release(self, token: Optional[str]) -> None:
+        if token is None:
+            return
+        if token != 'local':
+            self._release_global_slot(token)
+        if self._semaphore is not None:
+            self._semaphore.release()
+        with self._lock:
+            self._in_flight -= 1
+
+    def _acquire_global_slot(self, deadline: float) -> Optional[str]:
+        """Take a free slot; the token is `<slot key>:<owner id>`."""
+        cache = caches[self.cache_alias]
+        # an int is stored unpickled by the Redis backend, so the release
+        # script can compare it
+        owner = uuid.uuid4().int >> 64
+        while True:
+            start = random.randrange(self.global_limit)
+            for i in range(self.global_limit):
+                key = f"{self.key_prefix}:{(start + i) % self.global_limit}"
+                if cache.add(key, owner, timeout=self.slot_ttl):
+                    return f"{key}:{owner}"
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    def _release_global_slot(self, token: str) -> None:
+        key, _, owner = token.rpartition(':')
+        cache = caches[self.cache_alias]
+        get_client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+        try:
+            if get_client is not None:
+                # Django's RedisCache: compare and delete atomically
+                full_key = cache.make_and_validate_key(key)
+                get_client(full_key, write=True).eval(_RELEASE_SLOT_SCRIPT, 1, full_key, owner)
+            elif cache.get(key) == int(owner):
+                # no compare-and-delete in the generic cache API; the slot
+                # would have to expire between these two calls to be lost
+                cache.delete(key)
+        except Exception as exc:
+            # the slot expires after slot_ttl anyway
+            logger.warning('Could not release LLM concurrency slot %s: %s', key, exc)
+
+    def _reject(self) -> None:
+        with self._lock:
+            self._rejected += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'rejected': self._rejected,
+                'local_limit': self.local_limit,
+                'global_limit': self.global_limit,
+            }
+
+
+class CircuitBreaker:
+    """Classic closed -> open -> half-open breaker, per process.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast. Once `reset_timeout` seconds passed a single probe call is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info('LLM circuit closed again')
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.error('LLM circuit opened after %s consecutive failure(s)', self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def retry_after(self) -> int:
+        """Seconds until the next probe is allowed."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 1
+            return max(1, int(self.reset_timeout - (time.monotonic() - self._opened_at)) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'state': self._state, 'consecutive_failures': self._failures}
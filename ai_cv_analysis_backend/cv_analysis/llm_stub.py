@@ -0,0 +1,213 @@
+"""A local stand-in for the OpenAI chat completions API, for load tests.
+
+Answers with canned but well-formed analysis or interview-question JSON
+after a sampled delay, fails a configurable share of requests and supports
+`stream: true`. Django-free so it can run next to the backend without
+touching its database: `python manage.py run_llm_stub`, then point the
+backend at it with OPENAI_API_URL=http://127.0.0.1:8099/v1/chat/completions.
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal')
+
+ANALYSIS_RESPONSE = {
+    'skills': ['Python', 'Django', 'PostgreSQL', 'REST APIs', 'Docker'],
+    'summary': 'Backend developer with several years of experience building web services.',
+    'experience_level': 'Mid-Level',
+    'ai_score': 72,
+    'suggestions': (
+        '1. Structure: put the most recent role first. 2. Content: quantify achievements. '
+        '3. Clarity: shorten the profile section. 4. Industry: highlight cloud experience. '
+        '5. Keywords: mention CI/CD and testing frameworks.'
+    ),
+}
+
+
+def _questions(count: int = 10) -> List[Dict[str, Any]]:
+    return [
+        {
+            'question': f'Stub question {i + 1}: which option is correct?',
+            'choices': {'A': 'Option A', 'B': 'Option B', 'C': 'Option C', 'D': 'Option D'},
+            'correct': 'ABCD'[i % 4],
+        }
+        for i in range(count)
+    ]
+
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0, distribution: str = 'normal',
+                 error_rate: float = 0.0, error_statuses=(500,), chunk_chars: int = 12,
+                 chunk_delay_ms: float = 15.0, seed: Optional[int] = None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f'Unknown latency distribution {distribution!r}')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses) or (500,)
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay_ms = chunk_delay_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'streams': 0}
+
+    def sample_latency(self) -> float:
+        """Seconds to wait before answering (before the first token when streaming)."""
+        mean, jitter = self.latency_ms, self.jitter_ms
+        with self._lock:
+            if self.distribution == 'fixed' or jitter <= 0:
+                value = mean
+            elif self.distribution == 'uniform':
+                value = self._random.uniform(mean - jitter, mean + jitter)
+            elif self.distribution == 'normal':
+                value = self._random.gauss(mean, jitter)
+            else:
+                # lognormal with the given mean and standard deviation: a long right tail
+                sigma2 = math.log(1 + (jitter / mean) ** 2) if mean > 0 else 0.0
+                value = self._random.lognormvariate(math.log(max(mean, 1e-3)) - sigma2 / 2, math.sqrt(sigma2))
+        return max(0.0, value) / 1000.0
+
+    def pick_error(self) -> Optional[int]:
+        with self._lock:
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                return self._random.choice(self.error_statuses)
+        return None
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+
+def completion_text(payload: Dict[str, Any]) -> str:
+    """Canned assistant text matching the kind of request in `payload`."""
+    system = ''
+    for message in payload.get('messages') or []:
+        if message.get('role') == 'system':
+            system = str(message.get('content', ''))
+            break
+    if 'interviewer' in system.lower():
+        return json.dumps(_questions())
+    return json.dumps(ANALYSIS_RESPONSE)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'llm-stub/1.0'
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        # GET /stats for a quick look at what the stub served
+        self._send_json(200, self.config.stats)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON body', 'type': 'invalid_request_error'}})
+            return
+
+        self.config.count('requests')
+        time.sleep(self.config.sample_latency())
+
+        status = self.config.pick_error()
+        if status is not None:
+            self.config.count('errors')
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            self._send_json(status, {'error': {'message': 'Stubbed failure', 'type': 'server_error'}}, headers)
+            return
+
+        text = completion_text(payload)
+        prompt_tokens = sum(_tokens(str(m.get('content', ''))) for m in payload.get('messages') or [])
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': _tokens(text),
+            'total_tokens': prompt_tokens + _tokens(text),
+        }
+        if payload.get('stream'):
+            self.config.count('streams')
+            self._stream(payload, text, usage)
+            return
+
+        self._send_json(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': usage,
+        })
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, payload: Dict[str, Any], text: str, usage: Dict[str, int]) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        size, delay = self.config.chunk_chars, self.config.chunk_delay_ms / 1000.0
+        try:
+            for i in range(0, len(text), size):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'model': payload.get('model', 'stub'),
+                    'choices': [{'index': 0, 'delta': {'content': text[i:i + size]}, 'finish_reason': None}],
+                }
+                self._write_chunk(f'data: {json.dumps(chunk)}\n\n')
+                if delay:
+                    time.sleep(delay)
+            if (payload.get('stream_options') or {}).get('include_usage'):
+                final = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'model': payload.get('model', 'stub'),
+                    'choices': [],
+                    'usage': usage,
+                }
+                self._write_chunk(f'data: {json.dumps(final)}\n\n')
+            self._write_chunk('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, data: str) -> None:
+        raw = data.encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(raw), raw))
+        self.wfile.flush()
+
+
+def make_server(host: str, port: int, config: StubConfig, verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.verbose = verbose
+    return server
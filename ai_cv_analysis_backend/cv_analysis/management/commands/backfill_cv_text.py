@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from cv_analysis.models import CV
+from cv_analysis.pdf_text import extract_text_from_path
+from cv_analysis.text_extraction import (
+    EXTRACTOR_VERSION,
+    _local_path,
+    extract_cv_text,
+    max_chars,
+    max_pages,
+    save_cv_text,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract and store the text of CVs that have no CVText yet, or whose "
+        "text was produced by an older extractor version. Files are extracted "
+        "like at upload time (CV_TEXT_MAX_PAGES / CV_TEXT_MAX_CHARS caps); "
+        "files on local disk are parsed in a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of extraction processes.')
+        parser.add_argument('--batch-size', type=int, default=50, help='CVs read from storage per batch.')
+        parser.add_argument('--all', action='store_true', help='Re-extract every CV, even up-to-date ones.')
+
+    def handle(self, *args, **options):
+        cvs = CV.objects.order_by('pk')
+        if not options['all']:
+            cvs = cvs.filter(
+                Q(extracted_text__isnull=True) | ~Q(extracted_text__extractor_version=EXTRACTOR_VERSION)
+            )
+        cv_ids = list(cvs.values_list('pk', flat=True))
+        total = len(cv_ids)
+        self.stdout.write(f"{total} CV(s) to extract with {options['workers']} worker(s)")
+
+        started = time.monotonic()
+        done = failed = 0
+        batch_size = max(1, options['batch_size'])
+        page_cap, char_cap = max_pages(), max_chars()
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for i in range(0, total, batch_size):
+                batch = CV.objects.filter(pk__in=cv_ids[i:i + batch_size])
+                futures = {}
+                for cv in batch:
+                    path = _local_path(cv)
+                    if path is None:
+                        # remote storage: extract in this process, as uploads do
+                        extracted = extract_cv_text(cv)
+                        if self._save(cv, extracted):
+                            done += 1
+                        else:
+                            failed += 1
+                        continue
+                    futures[pool.submit(extract_text_from_path, path, cv.file.name, page_cap, char_cap)] = cv
+
+                for future in as_completed(futures):
+                    cv = futures[future]
+                    try:
+                        extracted = future.result()
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f"CV {cv.pk}: {exc}")
+                        continue
+                    if self._save(cv, extracted):
+                        done += 1
+                    else:
+                        failed += 1
+                self.stdout.write(f"{done + failed}/{total} processed")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Extracted {done} CV(s), {failed} failed in {elapsed:.1f}s"
+        ))
+
+    def _save(self, cv, extracted):
+        if not extracted:
+            self.stderr.write(f"CV {cv.pk}: file missing, empty or unreadable")
+            return False
+        save_cv_text(cv, extracted)
+        return True
@@ -0,0 +1,105 @@
+import multiprocessing
+import queue as queue_module
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Module level imports stay Django-model free: spawned children import this
+# module before Django is set up.
+MODES = ('buffered', 'streaming')
+FAILED_RUN = {'elapsed_ms': None, 'rss_growth_kb': None, 'chars': 0, 'pages': None}
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None where unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB on Linux and the BSDs
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _run(mode, cv_id, queue):
+    # Runs in a child process so the peak RSS growth belongs to this
+    # extraction; extract in this process rather than in the extraction pool.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from cv_analysis.models import CV
+    from cv_analysis.text_extraction import extract_cv_text_buffered, extract_text_streaming
+
+    settings.CV_EXTRACTION_POOL_SIZE = 0
+    extract = extract_cv_text_buffered if mode == 'buffered' else extract_text_streaming
+    cv = CV.objects.get(pk=cv_id)
+    baseline = peak_rss_kb()
+    info = extract(cv) or {}
+    peak = peak_rss_kb()
+    queue.put({
+        'elapsed_ms': info.get('elapsed_ms'),
+        'rss_growth_kb': None if peak is None else peak - baseline,
+        'chars': len(info.get('text') or ''),
+        'pages': info.get('page_count'),
+    })
+
+
+class Command(BaseCommand):
+    help = "Compare time and peak memory of the buffered and streaming CV text extractors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('cv_ids', nargs='+', type=int, help='CVs to extract.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per extractor and CV.')
+
+    def handle(self, *args, **options):
+        from cv_analysis.models import CV
+
+        cv_ids = list(CV.objects.filter(pk__in=options['cv_ids']).values_list('pk', flat=True))
+        if not cv_ids:
+            raise CommandError('No matching CVs found')
+        # children must not share the parent's DB connection
+        connections.close_all()
+
+        # fork starts quickly; spawn is the fallback where fork is unavailable
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        ctx = multiprocessing.get_context(method)
+        if resource is None:
+            self.stderr.write('Peak RSS is not available on this platform; only timings are reported')
+        self.stdout.write(f"{'cv':>6} {'mode':<10} {'pages':>5} {'chars':>8} {'ms (best)':>10} {'rss+ KiB (max)':>15}")
+        for cv_id in cv_ids:
+            for mode in MODES:
+                runs = []
+                for _ in range(max(1, options['repeat'])):
+                    queue = ctx.Queue()
+                    proc = ctx.Process(target=_run, args=(mode, cv_id, queue))
+                    proc.start()
+                    runs.append(self._result(proc, queue))
+                timings = [r['elapsed_ms'] for r in runs if r['elapsed_ms'] is not None]
+                best = f"{min(timings):.1f}" if timings else 'failed'
+                growth = [r['rss_growth_kb'] for r in runs if r['rss_growth_kb'] is not None]
+                rss = max(growth) if growth else 'n/a'
+                self.stdout.write(
+                    f"{cv_id:>6} {mode:<10} {runs[0]['pages'] or 0:>5} {runs[0]['chars']:>8} "
+                    f"{best:>10} {rss:>15}"
+                )
+
+    def _result(self, proc, queue):
+        # a child that dies before reporting (e.g. an import error under
+        # spawn) must not leave the parent waiting forever
+        while True:
+            try:
+                result = queue.get(timeout=1)
+                break
+            except queue_module.Empty:
+                if not proc.is_alive():
+                    self.stderr.write(f'Extraction process exited with code {proc.exitcode}')
+                    result = FAILED_RUN
+                    break
+        proc.join()
+        return result
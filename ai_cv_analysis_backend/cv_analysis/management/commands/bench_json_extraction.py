@@ -0,0 +1,87 @@
+import json
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from cv_analysis.openai_service import _extract_json
+
+ANALYSIS = {
+    'skills': ['Python', 'Django', 'PostgreSQL', 'Docker'],
+    'summary': "Backend developer who's built {REST} APIs for five years.",
+    'experience_level': 'Mid-Level',
+    'ai_score': 72,
+    'suggestions': '1. Quantify achievements. 2. Move "Skills" above "Education".',
+}
+
+
+def legacy_extract_json(text):
+    """The previous implementation: greedy regex, then a blind quote swap."""
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except Exception:
+        pass
+    m = re.search(r"\{.*\}", text, re.S)
+    if not m:
+        return None
+    candidate = m.group(0)
+    try:
+        return json.loads(candidate)
+    except Exception:
+        try:
+            return json.loads(candidate.replace("'", '"'))
+        except Exception:
+            return None
+
+
+def cases(size):
+    body = json.dumps(ANALYSIS)
+    long_body = json.dumps(dict(ANALYSIS, suggestions='Add metrics to each role. ' * (size // 25)))
+    prose = 'Here is the analysis you asked for. ' * (size // 36)
+    return [
+        ('plain json', body),
+        ('markdown fence', f"```json\n{body}\n```"),
+        ('prose around', f"Sure! Here it is:\n{body}\nLet me know if you need more."),
+        ('long output', f"Analysis:\n{long_body}\nThanks."),
+        ('python literal', repr(ANALYSIS)),
+        ('two objects', f"Draft: {{'bad': }}\nFinal: {body}"),
+        ('no closing brace', '{' + 'x' * size),
+        ('many open braces', '{' * size),
+        ('prose only', prose),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark _extract_json against the previous regex-based implementation "
+        "on typical and adversarial model outputs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=5000, help='Length of the long and adversarial inputs.')
+        parser.add_argument('--number', type=int, default=20, help='Calls per timing run (best of 3 runs).')
+
+    def handle(self, *args, **options):
+        number = max(1, options['number'])
+        self.stdout.write(
+            f"{'case':<18} {'chars':>7} {'legacy us':>11} {'new us':>9} {'speedup':>8}  result"
+        )
+        for name, text in cases(options['size']):
+            timings = {}
+            for label, fn in (('legacy', legacy_extract_json), ('new', _extract_json)):
+                runs = timeit.repeat(lambda: fn(text), number=number, repeat=3)
+                timings[label] = min(runs) / number * 1e6
+            old, new = legacy_extract_json(text), _extract_json(text)
+            if old == new:
+                result = 'same' if new is not None else 'both none'
+            elif new is not None and old is None:
+                result = 'new only'
+            else:
+                result = 'differs'
+            self.stdout.write(
+                f"{name:<18} {len(text):>7} {timings['legacy']:>11.1f} {timings['new']:>9.1f} "
+                f"{timings['legacy'] / max(timings['new'], 1e-9):>7.1f}x  {result}"
+            )
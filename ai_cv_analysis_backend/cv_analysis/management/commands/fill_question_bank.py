@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from cv_analysis.interview_service import add_to_bank
+from cv_analysis.models import BankQuestion, Interview, InterviewQuestion
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the questions of past interviews to the question bank, bucketed by "
+        "the skills and experience level of the analysis of each interview's CV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Interviews loaded per batch.')
+
+    def handle(self, *args, **options):
+        before = BankQuestion.objects.count()
+        interviews = (
+            Interview.objects.filter(cv__analysis__isnull=False)
+            .select_related('cv__analysis')
+            .prefetch_related(Prefetch('questions', queryset=InterviewQuestion.objects.order_by('pk')))
+            .order_by('pk')
+        )
+        seen = offered = 0
+        for interview in interviews.iterator(chunk_size=max(1, options['batch_size'])):
+            questions = [
+                {
+                    'question': q.question_text,
+                    'choices': {'A': q.choice_1, 'B': q.choice_2, 'C': q.choice_3, 'D': q.choice_4},
+                    'correct': q.correct_answer,
+                }
+                for q in interview.questions.all()
+            ]
+            offered += add_to_bank(interview.cv.analysis, questions)
+            seen += 1
+
+        added = BankQuestion.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {seen} interview(s); {offered} valid question(s), {added} new in the bank"
+        ))
@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+STEPS = ['register', 'login', 'upload', 'analyze', 'interview start', 'submit-answer']
+
+CV_TEMPLATE = (
+    "Jane Doe\nBackend Developer\n\nExperience\n- 5 years building Django and REST APIs\n"
+    "- Led migration to PostgreSQL and Docker based deployments\n\nSkills\nPython, Django, SQL, Docker\n"
+    "Reference: {nonce}\n"
+)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint, shared by all virtual users."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+        self.failures = Counter()
+        self._lock = threading.Lock()
+
+    def fail(self, reason):
+        with self._lock:
+            self.failures[reason] += 1
+
+    def call(self, step, send, ok=(200, 201)):
+        started = time.monotonic()
+        try:
+            resp = send()
+        except requests.RequestException as exc:
+            with self._lock:
+                self.errors[step] += 1
+                self.statuses[step][type(exc).__name__] += 1
+            raise StepFailed(f'{step}: {exc}')
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.statuses[step][resp.status_code] += 1
+            if resp.status_code in ok:
+                self.latencies[step].append(elapsed)
+            else:
+                self.errors[step] += 1
+        if resp.status_code not in ok:
+            raise StepFailed(f'{step}: HTTP {resp.status_code}')
+        return resp
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive upload -> analyze -> interview start -> submit-answer against a running "
+        "backend with concurrent virtual users, and report p50/p95/p99 latency and "
+        "throughput per endpoint. Run the backend against `manage.py run_llm_stub` to "
+        "avoid using real API quota."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=10, help='Virtual users running at the same time.')
+        parser.add_argument('--iterations', type=int, default=5, help='Flows each virtual user runs.')
+        parser.add_argument('--answers', type=int, default=10, help='Answers submitted per interview.')
+        parser.add_argument('--analyze-mode', choices=['sync', 'queued', 'stream'], default='sync',
+                            help='sync: analyze/?sync=true; queued: analyze/ then poll analysis-status/; '
+                                 'stream: analyze-stream/.')
+        parser.add_argument('--reuse-cv-text', action='store_true',
+                            help='Upload identical CVs so analyses are served from the analysis cache.')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which virtual users start.')
+        parser.add_argument('--timeout', type=float, default=120.0, help='Per-request timeout in seconds.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.base = options['base_url'].rstrip('/')
+        try:
+            requests.get(self.base + '/api/cv/cvs/', timeout=5)
+        except requests.RequestException as exc:
+            raise CommandError(f"Backend not reachable at {self.base}: {exc}")
+
+        self.recorder = Recorder()
+        users = max(1, options['concurrency'])
+        self.stdout.write(
+            f"{users} virtual user(s) x {options['iterations']} flow(s) against {self.base} "
+            f"(analyze mode: {options['analyze_mode']})"
+        )
+
+        started = time.monotonic()
+        threads = []
+        for i in range(users):
+            delay = options['ramp_up'] * i / users if options['ramp_up'] else 0.0
+            t = threading.Thread(target=self._virtual_user, args=(delay,), daemon=True)
+            t.start()
+            threads.append(t)
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted; reporting what finished so far')
+        self._report(time.monotonic() - started)
+
+    def _virtual_user(self, delay):
+        time.sleep(delay)
+        session = requests.Session()
+        try:
+            self._login(session)
+        except StepFailed as exc:
+            self.recorder.fail(str(exc))
+            return
+        for _ in range(self.options['iterations']):
+            try:
+                self._flow(session)
+            except StepFailed as exc:
+                self.recorder.fail(str(exc))
+
+    def _post(self, session, path, **kwargs):
+        return session.post(self.base + path, timeout=self.options['timeout'], **kwargs)
+
+    def _login(self, session):
+        name = f"loadtest-{uuid.uuid4().hex[:12]}"
+        email, password = f"{name}@example.com", uuid.uuid4().hex
+        rec = self.recorder
+        rec.call('register', lambda: self._post(session, '/api/users/', json={
+            'email': email, 'username': name, 'password': password,
+        }))
+        resp = rec.call('login', lambda: self._post(session, '/api/users/login/', json={
+            'email': email, 'password': password,
+        }))
+        session.headers['Authorization'] = f"Bearer {resp.json()['access']}"
+
+    def _flow(self, session):
+        rec = self.recorder
+        nonce = 'shared' if self.options['reuse_cv_text'] else uuid.uuid4().hex
+        content = CV_TEMPLATE.format(nonce=nonce).encode('utf-8')
+        resp = rec.call('upload', lambda: self._post(
+            session, '/api/cv/cvs/', files={'file': ('cv.txt', content, 'text/plain')}
+        ))
+        cv_id = resp.json()['id']
+
+        self._analyze(session, cv_id)
+
+        resp = rec.call('interview start', lambda: self._post(
+            session, '/api/cv/interviews/start/', json={'cv_id': cv_id}
+        ))
+        interview = resp.json()
+        for question in interview.get('questions', [])[:self.options['answers']]:
+            rec.call('submit-answer', lambda: self._post(
+                session, f"/api/cv/interviews/{interview['id']}/submit-answer/",
+                json={'question_id': question['id'], 'user_answer': random.choice('ABCD')},
+            ))
+
+    def _analyze(self, session, cv_id):
+        rec, mode = self.recorder, self.options['analyze_mode']
+        if mode == 'sync':
+            rec.call('analyze', lambda: self._post(session, f'/api/cv/cvs/{cv_id}/analyze/?sync=true'))
+        elif mode == 'stream':
+            def stream():
+                resp = self._post(session, f'/api/cv/cvs/{cv_id}/analyze-stream/', stream=True)
+                body = b''.join(resp.iter_content(chunk_size=None))
+                if b'event: result' not in body:
+                    resp.status_code = 502
+                return resp
+            rec.call('analyze', stream)
+        else:
+            def queued():
+                resp = self._post(session, f'/api/cv/cvs/{cv_id}/analyze/')
+                deadline = time.monotonic() + self.options['timeout']
+                while resp.status_code == 202 or (resp.status_code == 200 and resp.json().get('status') in ('pending', 'running')):
+                    if time.monotonic() > deadline:
+                        resp.status_code = 504
+                        break
+                    time.sleep(0.25)
+                    resp = session.get(self.base + f'/api/cv/cvs/{cv_id}/analysis-status/', timeout=self.options['timeout'])
+                if resp.status_code == 200 and resp.json().get('status') == 'failed':
+                    resp.status_code = 502
+                return resp
+            rec.call('analyze', queued)
+
+    def _report(self, elapsed):
+        rec = self.recorder
+        self.stdout.write(f"\nWall time {elapsed:.1f}s")
+        self.stdout.write(
+            f"{'endpoint':<16} {'ok':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8} {'req/s':>7}"
+        )
+        for step in STEPS:
+            values = sorted(rec.latencies.get(step, []))
+            errors = rec.errors.get(step, 0)
+            if not values and not errors:
+                continue
+            p = [_percentile(values, pct) * 1000 for pct in (50, 95, 99)]
+            peak = values[-1] * 1000 if values else 0.0
+            rate = len(values) / elapsed if elapsed else 0.0
+            self.stdout.write(
+                f"{step:<16} {len(values):>6} {errors:>6} {p[0]:>8.0f} {p[1]:>8.0f} "
+                f"{p[2]:>8.0f} {peak:>8.0f} {rate:>7.2f}"
+            )
+        odd = {step: dict(counts) for step, counts in rec.statuses.items()
+               if set(counts) - {200, 201}}
+        if odd:
+            self.stdout.write(f"Status codes: {odd}")
+        if rec.failures:
+            self.stdout.write('Failed flows:')
+            for reason, count in rec.failures.most_common(10):
+                self.stdout.write(f"  {count:>5}  {reason}")
@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, time as dt_time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from cv_analysis import llm_client
+from cv_analysis.analysis_jobs import save_analysis_result, validate_analysis_data
+from cv_analysis.models import CV
+from cv_analysis.openai_service import ANALYSIS_PROMPT_VERSION, analyze_cv
+
+CHECKPOINT_EVERY = 25
+
+
+class RatePacer:
+    """Spaces calls so that at most `rpm` start per minute (0: no limit)."""
+
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _parse_bound(value, end_of_day=False):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value!r} (use YYYY-MM-DD or an ISO datetime)")
+        parsed = datetime.combine(day, dt_time.max if end_of_day else dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run the AI analysis for stored CVs, e.g. after the analysis prompt or "
+        "model changed. Runs several analyses in parallel under a requests-per-minute "
+        "cap and records finished CVs in a checkpoint file, so an interrupted run "
+        "resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Analyses run at the same time.')
+        parser.add_argument('--rpm', type=int, default=60, help='Maximum analyses started per minute (0: no limit).')
+        parser.add_argument('--user', help='Only CVs of this user (id, username or email).')
+        parser.add_argument('--since', help='Only CVs uploaded on or after this date.')
+        parser.add_argument('--until', help='Only CVs uploaded on or before this date.')
+        parser.add_argument('--stale-only', action='store_true',
+                            help='Only CVs without an analysis from the current prompt version and model.')
+        parser.add_argument('--model', help='Model to analyze with (defaults to OPENAI_MODEL).')
+        parser.add_argument('--limit', type=int, help='Stop after this many CVs.')
+        parser.add_argument('--checkpoint', default='reanalyze_cvs.checkpoint.json',
+                            help='File recording finished CVs of this run.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the CVs that would be re-analyzed.')
+
+    def handle(self, *args, **options):
+        model = options['model'] or llm_client.get_config()['model']
+        cvs = self._select_cvs(options, model)
+
+        run_key = {
+            'user': options['user'],
+            'since': options['since'],
+            'until': options['until'],
+            'stale_only': options['stale_only'],
+            'model': model,
+            'prompt_version': ANALYSIS_PROMPT_VERSION,
+        }
+        done_ids = self._load_checkpoint(options['checkpoint'], run_key, options['restart'])
+
+        cv_ids = [pk for pk in cvs.values_list('pk', flat=True) if pk not in done_ids]
+        if options['limit']:
+            cv_ids = cv_ids[:options['limit']]
+        total = len(cv_ids)
+        self.stdout.write(
+            f"{total} CV(s) to re-analyze with {model} (prompt {ANALYSIS_PROMPT_VERSION}), "
+            f"{len(done_ids)} already done in this run"
+        )
+        if options['dry_run'] or not total:
+            return
+
+        self.run_key = run_key
+        self.checkpoint_path = options['checkpoint']
+        self.done_ids = done_ids
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.failed = 0
+        self.model = model
+        pacer = RatePacer(options['rpm'])
+        workers = max(1, options['workers'])
+
+        started = time.monotonic()
+        interrupted = False
+        pending = set()
+        remaining = iter(cv_ids)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reanalyze') as pool:
+            try:
+                # keep only a couple of tasks per worker queued so an
+                # interrupt does not leave thousands of submitted futures
+                for cv_id in remaining:
+                    pending.add(pool.submit(self._reanalyze, cv_id, pacer))
+                    if len(pending) >= workers * 2:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._report(finished, total)
+                finished, pending = wait(pending)
+                self._report(finished, total)
+            except KeyboardInterrupt:
+                interrupted = True
+                self.stdout.write('Interrupted; waiting for in-flight analyses...')
+                for future in pending:
+                    future.cancel()
+            finally:
+                pool.shutdown(wait=True)
+                self._save_checkpoint()
+
+        self._summary(time.monotonic() - started, interrupted)
+
+    def _select_cvs(self, options, model):
+        cvs = CV.objects.order_by('pk')
+        if options['user']:
+            value = options['user']
+            lookup = Q(username=value) | Q(email=value)
+            if value.isdigit():
+                lookup |= Q(pk=int(value))
+            user = get_user_model().objects.filter(lookup).first()
+            if user is None:
+                raise CommandError(f"User {value!r} not found")
+            cvs = cvs.filter(user=user)
+        if options['since']:
+            cvs = cvs.filter(uploaded_at__gte=_parse_bound(options['since']))
+        if options['until']:
+            cvs = cvs.filter(uploaded_at__lte=_parse_bound(options['until'], end_of_day=True))
+        if options['stale_only']:
+            cvs = cvs.exclude(analysis__prompt_version=ANALYSIS_PROMPT_VERSION, analysis__model=model)
+        return cvs
+
+    def _load_checkpoint(self, path, run_key, restart):
+        if restart or not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('run') != run_key:
+            raise CommandError(
+                f"{path} belongs to a run with different options; pass --restart or another --checkpoint"
+            )
+        return set(data.get('done', []))
+
+    def _save_checkpoint(self):
+        with self.lock:
+            data = {'run': self.run_key, 'done': sorted(self.done_ids)}
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _reanalyze(self, cv_id, pacer):
+        close_old_connections()
+        try:
+            cv = CV.objects.filter(pk=cv_id).first()
+            if cv is None:
+                return cv_id, None, None
+            pacer.wait()
+            started = time.monotonic()
+            analysis_data = analyze_cv(cv, model=self.model)
+            latency = time.monotonic() - started
+            error = validate_analysis_data(analysis_data)
+            if error:
+                return cv_id, latency, error
+            save_analysis_result(cv, analysis_data, replace=True, prepare_interview=False)
+            return cv_id, latency, None
+        except Exception as exc:
+            return cv_id, None, str(exc)
+        finally:
+            close_old_connections()
+
+    def _report(self, futures, total):
+        save = False
+        for future in futures:
+            cv_id, latency, error = future.result()
+            with self.lock:
+                if error:
+                    self.failed += 1
+                else:
+                    # deleted CVs count as done so a resume does not look for them again
+                    self.done_ids.add(cv_id)
+                    if latency is not None:
+                        self.latencies.append(latency)
+                processed = len(self.latencies) + self.failed
+            if error:
+                self.stderr.write(f"CV {cv_id}: {error}")
+            if processed % CHECKPOINT_EVERY == 0:
+                save = True
+                self.stdout.write(f"{processed}/{total} processed")
+        if save:
+            self._save_checkpoint()
+
+    def _summary(self, elapsed, interrupted):
+        latencies = sorted(self.latencies)
+        done = len(latencies)
+        rate = done / elapsed * 60 if elapsed else 0.0
+        self.stdout.write(
+            f"Re-analyzed {done} CV(s), {self.failed} failed in {elapsed:.1f}s ({rate:.1f} CVs/min)"
+        )
+        if latencies:
+            self.stdout.write(
+                "Latency s: p50 {:.2f}  p95 {:.2f}  p99 {:.2f}  max {:.2f}".format(
+                    _percentile(latencies, 50), _percentile(latencies, 95),
+                    _percentile(latencies, 99), latencies[-1],
+                )
+            )
+        if interrupted or self.failed:
+            self.stdout.write(f"Run again with the same options to resume (checkpoint: {self.checkpoint_path})")
+        else:
+            self.stdout.write(self.style.SUCCESS('Done'))
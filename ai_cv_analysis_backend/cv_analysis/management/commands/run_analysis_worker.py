@@ -0,0 +1,71 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from cv_analysis.analysis_jobs import (
+    claim_next_job,
+    default_worker_id,
+    reclaim_stale_jobs,
+    run_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued CV analysis jobs. Use together with ANALYSIS_JOB_MODE=external "
+        "so web workers only enqueue jobs and return 202."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker threads.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        self.poll_interval = options['poll_interval']
+        self.once = options['once']
+        self.stop = threading.Event()
+
+        requeued = reclaim_stale_jobs()
+        self.stdout.write(f"Re-queued {requeued} stale job(s); starting {workers} worker(s)")
+
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop.set()
+            self.stdout.write('Stopping after in-flight jobs finish...')
+            for t in threads:
+                t.join()
+
+    def _work(self):
+        worker_id = default_worker_id()
+        last_reclaim = time.monotonic()
+        while not self.stop.is_set():
+            close_old_connections()
+            try:
+                if time.monotonic() - last_reclaim > 30:
+                    reclaim_stale_jobs()
+                    last_reclaim = time.monotonic()
+
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if self.once:
+                        return
+                    self.stop.wait(self.poll_interval)
+                    continue
+
+                self.stdout.write(f"[{worker_id}] running job {job.pk} for CV {job.cv_id}")
+                run_job(job)
+            except Exception as exc:
+                self.stderr.write(f"[{worker_id}] job loop error: {exc}")
+                self.stop.wait(self.poll_interval)
+            finally:
+                close_old_connections()
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cv_analysis.llm_stub import LATENCY_DISTRIBUTIONS, StubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local OpenAI-compatible chat completions stub for load tests. "
+        "Start the backend with OPENAI_API_URL=http://HOST:PORT/v1/chat/completions "
+        "to use it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency-ms', type=float, default=800.0,
+                            help='Mean delay before answering (before the first token when streaming).')
+        parser.add_argument('--jitter-ms', type=float, default=200.0,
+                            help='Spread of the delay: half-width for uniform, standard deviation otherwise.')
+        parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='normal')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests that fail (0-1).')
+        parser.add_argument('--error-statuses', default='500',
+                            help='Comma-separated statuses failed requests get, e.g. 429,500,503.')
+        parser.add_argument('--chunk-chars', type=int, default=12, help='Characters per streamed chunk.')
+        parser.add_argument('--chunk-delay-ms', type=float, default=15.0, help='Delay between streamed chunks.')
+        parser.add_argument('--seed', type=int, help='Seed for reproducible latency and errors.')
+        parser.add_argument('--verbose', action='store_true', help='Log every request.')
+
+    def handle(self, *args, **options):
+        try:
+            statuses = [int(s) for s in options['error_statuses'].split(',') if s.strip()]
+        except ValueError:
+            raise CommandError('--error-statuses must be a comma-separated list of HTTP statuses')
+        if not 0 <= options['error_rate'] <= 1:
+            raise CommandError('--error-rate must be between 0 and 1')
+
+        config = StubConfig(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            distribution=options['distribution'],
+            error_rate=options['error_rate'],
+            error_statuses=statuses,
+            chunk_chars=options['chunk_chars'],
+            chunk_delay_ms=options['chunk_delay_ms'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], config, verbose=options['verbose'])
+        self.stdout.write(
+            f"LLM stub listening on http://{options['host']}:{options['port']}/v1/chat/completions "
+            f"({options['distribution']} {options['latency_ms']:.0f}±{options['jitter_ms']:.0f} ms, "
+            f"error rate {options['error_rate']:.0%})"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {config.stats}")
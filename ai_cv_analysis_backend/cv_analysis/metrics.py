@@ -0,0 +1,165 @@
+"""Prometheus metrics for requests, LLM calls, PDF extraction and DB usage.
+
+Recording is an in-memory counter/histogram update. With several worker
+processes (gunicorn, uvicorn --workers) set PROMETHEUS_MULTIPROC_DIR to an
+empty directory shared by the workers before they start; each process then
+writes its values to memory-mapped files there and `/metrics` adds them up.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from . import profiling
+from .conf import setting
+
+REQUEST_LATENCY = Histogram(
+    'cv_http_request_duration_seconds',
+    'Time spent handling a request, per view and DRF action.',
+    ['view', 'action', 'method', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'cv_http_request_db_queries',
+    'Database queries executed while handling a request.',
+    ['view', 'action'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000),
+)
+LLM_LATENCY = Histogram(
+    'cv_llm_request_duration_seconds',
+    'Latency of single HTTP requests to the LLM API (each retry counts).',
+    ['status'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+LLM_REQUESTS = Counter(
+    'cv_llm_requests_total',
+    'HTTP requests to the LLM API by response status (error/timeout when none).',
+    ['status'],
+)
+LLM_TOKENS = Counter(
+    'cv_llm_tokens_total',
+    'Tokens reported in the `usage` block of LLM responses.',
+    ['model', 'kind'],
+)
+PDF_EXTRACTION = Histogram(
+    'cv_text_extraction_duration_seconds',
+    'Time to extract the text of an uploaded CV.',
+    ['mode', 'outcome'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20),
+)
+
+
+def observe_llm_request(status, seconds: float) -> None:
+    status = str(status)
+    LLM_REQUESTS.labels(status).inc()
+    LLM_LATENCY.labels(status).observe(seconds)
+    profiling.add_time('llm', seconds)
+
+
+def observe_llm_usage(data) -> None:
+    """Count the prompt/completion tokens of a chat completion response."""
+    usage = data.get('usage') if isinstance(data, dict) else None
+    if not isinstance(usage, dict):
+        return
+    model = str(data.get('model') or 'unknown')
+    for kind in ('prompt', 'completion'):
+        tokens = usage.get(f'{kind}_tokens')
+        if isinstance(tokens, int) and tokens > 0:
+            LLM_TOKENS.labels(model, kind).inc(tokens)
+
+
+def observe_extraction(mode: str, ok: bool, seconds: float) -> None:
+    PDF_EXTRACTION.labels(mode, 'ok' if ok else 'failed').observe(seconds)
+
+
+def _view_labels(request):
+    view = getattr(request, '_metrics_view', None)
+    if view is None:
+        return 'unmatched', ''
+    return view
+
+
+class MetricsMiddleware:
+    """Records latency and DB query count of every request.
+
+    Queries are counted with a connection execute wrapper, which only sees
+    the request thread's connection: for async views (whose queries run in
+    worker threads) only latency is recorded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, None)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        cls = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None) or {}
+        name = cls.__name__ if cls is not None else getattr(view_func, '__name__', 'unknown')
+        request._metrics_view = (name, actions.get(request.method.lower(), ''))
+        return None
+
+    def _record(self, request, response, seconds, queries):
+        view, action = _view_labels(request)
+        REQUEST_LATENCY.labels(view, action, request.method, str(response.status_code)).observe(seconds)
+        if queries is not None:
+            REQUEST_DB_QUERIES.labels(view, action).observe(queries)
+
+
+def _registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """Prometheus text exposition of all metrics.
+
+    Requires `Authorization: Bearer <METRICS_TOKEN>` when METRICS_TOKEN is
+    set; without a token the endpoint only exists with DEBUG on.
+    """
+    token = setting('METRICS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
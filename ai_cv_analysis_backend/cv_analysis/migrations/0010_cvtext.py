@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0009_analysiscacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(blank=True, default='')),
+                ('page_count', models.IntegerField(default=0)),
+                ('byte_size', models.BigIntegerField(default=0)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('extractor_version', models.CharField(max_length=20)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+                ('cv', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='extracted_text', to='cv_analysis.cv')),
+            ],
+        ),
+    ]
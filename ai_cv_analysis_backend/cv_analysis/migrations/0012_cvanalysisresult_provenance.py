@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0011_analysisbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvanalysisresult',
+            name='model',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='cvanalysisresult',
+            name='prompt_version',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0012_cvanalysisresult_provenance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('experience_level', models.CharField(max_length=20)),
+                ('text_hash', models.CharField(max_length=64)),
+                ('question_text', models.TextField()),
+                ('choice_1', models.CharField(max_length=255)),
+                ('choice_2', models.CharField(max_length=255)),
+                ('choice_3', models.CharField(max_length=255)),
+                ('choice_4', models.CharField(max_length=255)),
+                ('correct_answer', models.CharField(max_length=1)),
+                ('times_served', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fingerprint', 'experience_level', 'text_hash'), name='unique_bank_question')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0013_bankquestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('questions', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('analysis', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='interview_draft', to='cv_analysis.cvanalysisresult')),
+            ],
+        ),
+    ]
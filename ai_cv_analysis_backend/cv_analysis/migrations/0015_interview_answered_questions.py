@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:53
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_answered(apps, schema_editor):
+    Interview = apps.get_model('cv_analysis', 'Interview')
+    InterviewQuestion = apps.get_model('cv_analysis', 'InterviewQuestion')
+    answered = InterviewQuestion.objects.filter(
+        interview=OuterRef('pk'), user_answer__isnull=False,
+    ).order_by().values('interview').annotate(n=Count('pk')).values('n')
+    Interview.objects.update(
+        answered_questions=Coalesce(Subquery(answered, output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0014_interviewdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='answered_questions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_answered, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    apps.get_model('cv_analysis', 'CV').objects.update(updated_at=F('uploaded_at'))
+    apps.get_model('cv_analysis', 'Interview').objects.update(updated_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0015_interview_answered_questions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
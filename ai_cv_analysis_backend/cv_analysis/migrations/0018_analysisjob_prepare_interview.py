@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0017_cvupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='prepare_interview',
+            field=models.BooleanField(default=True),
+        ),
+    ]
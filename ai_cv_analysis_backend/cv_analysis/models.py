@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 
@@ -6,11 +8,48 @@ class CV(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cvs')
     file = models.FileField(upload_to='cv_files/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.email} - {self.file.name}"
 
 
+class CVUpload(models.Model):
+    """A resumable CV upload in progress (see cv_analysis/chunked_upload.py).
+
+    Chunks are written straight into `file_name` in the default storage;
+    `received` is the offset of the next byte expected.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cv_uploads')
+    file_name = models.CharField(max_length=100)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    # optional SHA-256 announced by the client, checked on finalize
+    expected_sha256 = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size} bytes)"
+
+
+class CVText(models.Model):
+    """Text extracted from a CV file once at upload time."""
+
+    cv = models.OneToOneField(CV, on_delete=models.CASCADE, related_name='extracted_text')
+    text = models.TextField(blank=True, default='')
+    page_count = models.IntegerField(default=0)
+    byte_size = models.BigIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    extractor_version = models.CharField(max_length=20)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Text for CV {self.cv_id} ({self.page_count} pages)"
+
+
 class CVAnalysisResult(models.Model):
     cv = models.OneToOneField(CV, on_delete=models.CASCADE, related_name='analysis')
     summary = models.TextField(blank=True, null=True)
@@ -19,19 +58,144 @@ class CVAnalysisResult(models.Model):
     ai_score = models.FloatField(default=0.0)
     suggestions = models.TextField(blank=True, null=True)
     analyzed_at = models.DateTimeField(auto_now_add=True)
+    # What produced the analysis, so results of an older prompt can be redone
+    model = models.CharField(max_length=100, blank=True, default='')
+    prompt_version = models.CharField(max_length=32, blank=True, default='', db_index=True)
 
     def __str__(self):
         return f"Analysis for {self.cv.user.email}"
 
+
+class AnalysisCacheEntry(models.Model):
+    """A stored analysis keyed by CV text, model and prompt version.
+
+    Shared across uploads and users so identical CVs skip the AI call.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    text_hash = models.CharField(max_length=64, db_index=True)
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=32, db_index=True)
+    result = models.JSONField(default=dict)
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Cached analysis {self.text_hash[:12]} ({self.model})"
+
+
+class AnalysisJob(models.Model):
+    """A queued request to run the AI analysis for a CV in the background."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='analysis_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    force = models.BooleanField(default=False)
+    # bulk analyses skip the interview draft of each new result
+    prepare_interview = models.BooleanField(default=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    worker_id = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Analysis job {self.pk} for CV {self.cv_id} ({self.status})"
+
+
+class AnalysisBatch(models.Model):
+    """A bulk analysis request covering several CVs of one user.
+
+    `items` holds one entry per requested CV id: the AnalysisJob it was
+    queued as, or why it was not (already analyzed, not found). Progress is
+    read from the referenced jobs.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='analysis_batches')
+    force = models.BooleanField(default=False)
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Analysis batch {self.pk} ({len(self.items)} CVs)"
+
+class BankQuestion(models.Model):
+    """A generated interview question kept for reuse.
+
+    Questions are bucketed by a fingerprint of the candidate's main skills
+    and their normalized experience level (see `interview_service.bank_key`),
+    so later candidates with a similar profile can be served from the bank.
+    """
+
+    fingerprint = models.CharField(max_length=64)
+    experience_level = models.CharField(max_length=20)
+    text_hash = models.CharField(max_length=64)
+    question_text = models.TextField()
+    choice_1 = models.CharField(max_length=255)
+    choice_2 = models.CharField(max_length=255)
+    choice_3 = models.CharField(max_length=255)
+    choice_4 = models.CharField(max_length=255)
+    correct_answer = models.CharField(max_length=1)
+    times_served = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint', 'experience_level', 'text_hash'], name='unique_bank_question'),
+        ]
+
+    def __str__(self):
+        return self.question_text
+
+
+class InterviewDraft(models.Model):
+    """Interview questions generated ahead of time for an analysed CV.
+
+    Created in the background once the analysis is stored, and turned into
+    an Interview (then deleted) by the next `start` for that CV.
+    """
+
+    analysis = models.OneToOneField(CVAnalysisResult, on_delete=models.CASCADE, related_name='interview_draft')
+    questions = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Interview draft for analysis {self.analysis_id}"
+
+
 class Interview(models.Model):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='interviews')
     started_at = models.DateTimeField(auto_now_add=True)
     ai_feedback = models.TextField(blank=True, null=True)
     total_questions = models.IntegerField(default=0)
     correct_answers = models.IntegerField(default=0)
+    answered_questions = models.IntegerField(default=0)
     score = models.FloatField(default=0.0)
     completed = models.BooleanField(default=False)
     current_question_index = models.IntegerField(default=0)  # Track progress for resume
+    # Also set by queryset updates (see interview_service.record_answers);
+    # used as the HTTP validator of the interview
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Interview for {self.cv.user.email}"
@@ -1,188 +1,568 @@
+import ast
+import hashlib
 import json
+import asyncio
 import logging
 import re
-import os
-from typing import Any, Dict, Optional
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import requests
-import fitz  # PyMuPDF
-from django.conf import settings
+from asgiref.sync import sync_to_async
+
+from . import analysis_cache, llm_client
+from .conf import setting
+from .text_extraction import get_cv_text, stored_cv_text
+from .token_budget import count_message_tokens, count_tokens, split_text
 
 logger = logging.getLogger(__name__)
 
 
+ANALYSIS_SYSTEM_PROMPT = 'You are a helpful assistant that analyzes resumes and returns a strict JSON object.'
+ANALYSIS_USER_PROMPT = (
+    "You are an expert resume reviewer. Your task is to help the user improve their CV by providing a structured analysis. "
+    "Return ONLY a JSON object with the following keys:\n"
+    "- skills (array of strings): A list of key skills mentioned in the CV.\n"
+    "- summary (short paragraph): A brief summary of the candidate's professional profile based on the CV.\n"
+    "- experience_level (string): The experience level of the candidate (e.g., Entry-Level, Mid-Level, Senior, etc.).\n"
+    "- ai_score (number 0-100): A score from 0 to 100 representing the overall quality of the CV as analyzed by the AI.\n"
+    "- suggestions (string): Detailed, actionable suggestions to improve the CV. Include advice on:\n"
+    " 1. Structure and formatting: Suggest improvements for making the CV visually appealing and easier to read.\n"
+    " 2. Content quality: Recommend adding or improving sections, such as work achievements, skills, and professional summary.\n"
+    " 3. Clarity and conciseness: Provide tips on making the CV more concise while keeping relevant information.\n"
+    " 4. Industry-specific tips: Tailor the suggestions based on the assumed industry or job role the user is applying for.\n"
+    " 5. Use of keywords: Advise on adding relevant keywords that are likely to be picked up by applicant tracking systems (ATS).\n"
+)
+ANALYSIS_MAX_TOKENS = 800
+
+# Shape of an analysis, sent as the structured-output schema and used to
+# check results before they are stored (see analysis_jobs.validate_analysis_data).
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'skills': {'type': 'array', 'items': {'type': 'string'}},
+        'summary': {'type': 'string'},
+        'experience_level': {'type': 'string'},
+        'ai_score': {'type': 'number', 'minimum': 0, 'maximum': 100},
+        'suggestions': {'type': 'string'},
+    },
+    'required': ['skills', 'summary', 'experience_level', 'ai_score', 'suggestions'],
+}
+
+# Long CVs are condensed in parts first (see `analysis_messages`)
+CHUNK_SYSTEM_PROMPT = 'You extract facts from part of a resume and return a strict JSON object.'
+CHUNK_USER_PROMPT = (
+    "Below is part {index} of {total} of a long CV. Return ONLY a JSON object with the following keys:\n"
+    "- skills (array of strings): Skills mentioned in this part.\n"
+    "- experience (array of strings): Roles, employers, dates, education and notable achievements, one short line each.\n"
+    "- notes (string): Anything else that matters when judging the CV, including problems with its structure, "
+    "clarity or formatting.\n\n"
+    "CV part:\n\n"
+)
+CHUNK_MAX_TOKENS = 500
+CHUNK_NOTES_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'skills': {'type': 'array', 'items': {'type': 'string'}},
+        'experience': {'type': 'array', 'items': {'type': 'string'}},
+        'notes': {'type': 'string'},
+    },
+    'required': ['skills', 'experience', 'notes'],
+}
+# Follows ANALYSIS_USER_PROMPT when the analysis is asked for from the notes
+CHUNK_MERGE_PROMPT = (
+    "The CV was too long to send in one request, so each of its {total} parts was condensed "
+    "into notes. Base the analysis on these notes:\n\n"
+)
+
+# Changes whenever the analysis prompts (including the map-reduce ones for long
+# CVs), output schemas or request parameters (including the configured
+# response_format mode) change, so cached results produced by an older prompt
+# are never served.
+ANALYSIS_PROMPT_VERSION = hashlib.sha256('\n'.join([
+    ANALYSIS_SYSTEM_PROMPT,
+    ANALYSIS_USER_PROMPT,
+    str(ANALYSIS_MAX_TOKENS),
+    json.dumps(ANALYSIS_SCHEMA, sort_keys=True),
+    CHUNK_SYSTEM_PROMPT,
+    CHUNK_USER_PROMPT,
+    str(CHUNK_MAX_TOKENS),
+    json.dumps(CHUNK_NOTES_SCHEMA, sort_keys=True),
+    CHUNK_MERGE_PROMPT,
+    llm_client.response_format_mode(),
+]).encode('utf-8')).hexdigest()[:16]
+
+# Characters that matter when looking for a balanced {...} block
+_JSON_STRUCTURE = re.compile(r'[{}"\\]')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _object_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each balanced top-level {...} block in `text`, in order.
+
+    One left-to-right pass; braces inside JSON strings are ignored and plain
+    text between the structural characters is skipped by the regex engine.
+    """
+    depth, start, in_string, skip_to = 0, 0, False, -1
+    for m in _JSON_STRUCTURE.finditer(text):
+        i, ch = m.start(), m.group()
+        if i < skip_to:
+            continue
+        if in_string:
+            if ch == '\\':
+                skip_to = i + 2
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0
+        elif ch == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, i + 1
+
+
 def _extract_json(text: str) -> Optional[Dict[str, Any]]:
-    """Try to extract a JSON object from text and parse it.
+    """Extract the JSON object from a model response.
 
-    This is deliberately robust: it first attempts a direct json.loads,
-    then searches for the first {...} block. It returns None if parsing
-    fails.
+    Tries the whole text, then an object starting at the first `{` (which
+    covers prose or markdown fences around it), then each balanced {...}
+    block in turn, and returns the first one that parses to an object. A block written as a Python literal
+    (single quotes) is read with `ast.literal_eval`. Runs in linear time;
+    returns None if there is no object.
     """
     if not text:
         return None
     text = text.strip()
     try:
-        return json.loads(text)
-    except Exception:
+        parsed = json.loads(text)
+        if isinstance(parsed, dict):
+            return parsed
+    except ValueError:
         pass
 
-    m = re.search(r"\{.*\}", text, re.S)
-    if not m:
+    first = text.find('{')
+    if first < 0:
         return None
-    candidate = m.group(0)
     try:
-        return json.loads(candidate)
-    except Exception:
-        # best-effort attempt to fix common issues (single quotes)
-        try:
-            return json.loads(candidate.replace("'", '"'))
-        except Exception:
-            logger.exception('Failed to parse JSON from model response')
-            return None
-
+        parsed, _ = _JSON_DECODER.raw_decode(text, first)
+        if isinstance(parsed, dict):
+            return parsed
+    except ValueError:
+        pass
 
-def _read_cv_text(cv) -> Optional[str]:
-    """Extract text from uploaded CV file (supports PDF and plain text).
-    
-    For PDF files, uses PyMuPDF (fitz) to extract text from all pages.
-    For text files, attempts UTF-8 decoding.
-    Returns None if extraction fails.
-    """
-    try:
-        f = cv.file
-        # Read file bytes
+    for start, end in _object_spans(text):
+        candidate = text[start:end]
         try:
-            raw = f.read()
-        except Exception:
+            parsed = json.loads(candidate)
+        except ValueError:
+            if "'" not in candidate:
+                continue
             try:
-                with f.open('rb') as fh:
-                    raw = fh.read()
-            except Exception:
-                return None
+                parsed = ast.literal_eval(candidate)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
 
-        if not raw:
-            return None
 
-        # Check if it's a PDF by magic bytes or filename
-        is_pdf = raw.startswith(b'%PDF') or (hasattr(cv.file, 'name') and cv.file.name.endswith('.pdf'))
+def _analysis_params(model: str) -> Dict[str, Any]:
+    """Request parameters of an analysis call (deterministic, JSON output)."""
+    params = {'temperature': 0.0, 'max_tokens': ANALYSIS_MAX_TOKENS}
+    response_format = llm_client.response_format('cv_analysis', ANALYSIS_SCHEMA, model=model)
+    if response_format:
+        params['response_format'] = response_format
+    return params
 
-        if is_pdf:
-            try:
-                # Open PDF from BytesIO
-                pdf_doc = fitz.open(stream=BytesIO(raw), filetype='pdf')
-                text_parts = []
-                for page_num in range(len(pdf_doc)):
-                    page = pdf_doc[page_num]
-                    text_parts.append(page.get_text())
-                pdf_doc.close()
-                return '\n'.join(text_parts) if text_parts else None
-            except Exception as e:
-                logger.warning('Failed to extract PDF text: %s', e)
-                return None
-
-        # Try UTF-8 decoding for text files
-        if isinstance(raw, bytes):
-            try:
-                return raw.decode('utf-8')
-            except Exception:
-                return raw.decode('utf-8', errors='ignore')
 
-        return str(raw)
+def _with_provenance(result: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Tag an analysis with the model and prompt version that produced it."""
+    return dict(result, model=model, prompt_version=ANALYSIS_PROMPT_VERSION)
+
+
+def _read_cv_text(cv) -> Optional[str]:
+    """Return the text of the uploaded CV (PDF or plain text).
+
+    The text is extracted once and stored as a CVText row (see
+    `text_extraction`); later calls, including forced re-analysis, read the
+    stored copy. Returns None if extraction fails.
+    """
+    try:
+        return get_cv_text(cv)
     except Exception as e:
         logger.exception('Error reading CV file: %s', e)
         return None
 
 
-def analyze_cv(cv, model: Optional[str] = None, timeout: Optional[int] = None) -> Dict[str, Any]:
+def analyze_cv(cv, model: Optional[str] = None, timeout: Optional[int] = None,
+               force: bool = False) -> Dict[str, Any]:
     """Call the configured OpenAI-compatible API to analyze a CV.
 
-    Configuration is read from Django `settings` first, falling back to
-    environment variables. Required settings/env:
+    Requests go through the shared `llm_client` (pooled connections,
+    retries). Configuration is read from Django `settings` first, falling
+    back to environment variables. Required settings/env:
       - OPENAI_API_KEY
       - OPENAI_MODEL (optional, defaults to gpt-3.5-turbo)
       - OPENAI_API_URL (optional, defaults to OpenAI chat completions endpoint)
       - OPENAI_TIMEOUT (optional seconds)
 
-    Returns a dict with keys: skills, summary, experience_level, ai_score, suggestions.
-    Raises RuntimeError on configuration or API failures.
+    Results are cached by CV text, model and prompt version (see
+    `analysis_cache`), so re-uploads of the same CV skip the API call.
+    `force` skips the lookup (the model is always asked) but still stores
+    the fresh result.
+    CVs too long for the model's context (LLM_CONTEXT_TOKENS) are condensed
+    in parts first, see `analysis_messages`.
+
+    Returns a dict with keys: skills, summary, experience_level, ai_score,
+    suggestions, plus the `model` and `prompt_version` that produced it.
+    Raises RuntimeError on configuration or API failures (llm_client.LLMError,
+    or LLMUnavailable when the call was refused by the circuit breaker).
     """
-    # config: prefer Django settings, then environment
-    api_key = getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise RuntimeError('OPENAI_API_KEY not configured')
+    config = llm_client.get_config()
+    model = model or config['model']
 
-    default_model = getattr(settings, 'OPENAI_MODEL', None) or os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
-    default_url = getattr(settings, 'OPENAI_API_URL', None) or os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions')
-    default_timeout = int(getattr(settings, 'OPENAI_TIMEOUT', None) or os.getenv('OPENAI_TIMEOUT', '30'))
+    cv_text = _read_cv_text(cv)
 
-    model = model or default_model
-    timeout = timeout or default_timeout
+    # Identical CV text analysed with the same model and prompt gives the same
+    # result (temperature 0), so serve it from the cache when we can.
+    cached = None if force else analysis_cache.get_cached_analysis(cv_text, model, ANALYSIS_PROMPT_VERSION)
+    if cached is not None:
+        return _with_provenance(cached, model)
 
-    cv_text = _read_cv_text(cv)
+    data = llm_client.chat_completion(
+        analysis_messages(cv, cv_text, model, timeout),
+        model=model,
+        timeout=timeout,
+        **_analysis_params(model),
+    )
 
-    system_msg = 'You are a helpful assistant that analyzes resumes and returns a strict JSON object.'
-    user_msg = (
-    "You are an expert resume reviewer. Your task is to help the user improve their CV by providing a structured analysis. "
-    "Return ONLY a JSON object with the following keys:\n"
-    "- skills (array of strings): A list of key skills mentioned in the CV.\n"
-    "- summary (short paragraph): A brief summary of the candidate's professional profile based on the CV.\n"
-    "- experience_level (string): The experience level of the candidate (e.g., Entry-Level, Mid-Level, Senior, etc.).\n"
-    "- ai_score (number 0-100): A score from 0 to 100 representing the overall quality of the CV as analyzed by the AI.\n"
-    "- suggestions (string): Detailed, actionable suggestions to improve the CV. Include advice on:\n"
-    " 1. Structure and formatting: Suggest improvements for making the CV visually appealing and easier to read.\n"
-    " 2. Content quality: Recommend adding or improving sections, such as work achievements, skills, and professional summary.\n"
-    " 3. Clarity and conciseness: Provide tips on making the CV more concise while keeping relevant information.\n"
-    " 4. Industry-specific tips: Tailor the suggestions based on the assumed industry or job role the user is applying for.\n"
-    " 5. Use of keywords: Advise on adding relevant keywords that are likely to be picked up by applicant tracking systems (ATS).\n"
-)
+    result = parse_analysis_response(llm_client.message_content(data))
+    analysis_cache.store_analysis(cv_text, model, ANALYSIS_PROMPT_VERSION, result)
+    return _with_provenance(result, model)
+
+
+def cached_analysis(cv, model: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The result `analyze_cv` would serve from the cache for `cv`, or None.
+
+    Only the stored CV text is looked at, so a CV whose text was not
+    extracted yet is a miss rather than an extraction.
+    """
+    cv_text = stored_cv_text(cv)
+    if not cv_text:
+        return None
+    model = model or llm_client.default_model()
+    cached = analysis_cache.get_cached_analysis(cv_text, model, ANALYSIS_PROMPT_VERSION)
+    return None if cached is None else _with_provenance(cached, model)
+
+
+async def analyze_cv_async(cv, model: Optional[str] = None, timeout: Optional[int] = None,
+                           force: bool = False) -> Dict[str, Any]:
+    """Coroutine version of `analyze_cv` for async views.
+
+    The HTTP call goes through the shared httpx AsyncClient; only the
+    database work (stored text, cache) runs in a worker thread.
+    """
+    config = llm_client.get_config()
+    model = model or config['model']
+
+    cv_text = await sync_to_async(_read_cv_text)(cv)
+
+    cached = None
+    if not force:
+        cached = await sync_to_async(analysis_cache.get_cached_analysis)(cv_text, model, ANALYSIS_PROMPT_VERSION)
+    if cached is not None:
+        return _with_provenance(cached, model)
+
+    data = await llm_client.async_chat_completion(
+        await analysis_messages_async(cv, cv_text, model, timeout),
+        model=model,
+        timeout=timeout,
+        **_analysis_params(model),
+    )
+
+    result = parse_analysis_response(llm_client.message_content(data))
+    await sync_to_async(analysis_cache.store_analysis)(cv_text, model, ANALYSIS_PROMPT_VERSION, result)
+    return _with_provenance(result, model)
+
+
+# Text fields forwarded to the client while the analysis is generated.
+STREAMED_FIELDS = ('summary', 'suggestions')
+
+_JSON_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+
+
+class PartialFieldDecoder:
+    """Pulls string fields out of a JSON object while it is still being written.
+
+    `feed` takes the next chunk of model output and returns the newly decoded
+    characters of each field in `fields`. Work is incremental: every output
+    character is decoded once however often `feed` is called.
+    """
+
+    def __init__(self, fields=STREAMED_FIELDS):
+        self.text = ''
+        self._openers = {name: re.compile(r'"%s"\s*:\s*"' % re.escape(name)) for name in fields}
+        # where to look for the opener of a field that has not started yet
+        self._scan = {name: 0 for name in fields}
+        self._pos: Dict[str, int] = {}
+        self._done = set()
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        self.text += chunk
+        deltas = {}
+        for name, opener in self._openers.items():
+            if name in self._done:
+                continue
+            if name not in self._pos:
+                m = opener.search(self.text, self._scan[name])
+                if not m:
+                    self._scan[name] = self._resume_scan(name)
+                    continue
+                self._pos[name] = m.end()
+            decoded = self._decode(name)
+            if decoded:
+                deltas[name] = decoded
+        return deltas
+
+    def _resume_scan(self, name: str) -> int:
+        """Earliest offset at which the opener of `name` can still match:
+        its last `"name"` key, or the tail that may hold the start of one."""
+        key = '"%s"' % name
+        found = self.text.rfind(key, self._scan[name])
+        if found >= 0:
+            return found
+        return max(self._scan[name], len(self.text) - len(key) + 1)
+
+    def _decode(self, name: str) -> str:
+        text, i, out = self.text, self._pos[name], []
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                self._done.add(name)
+                break
+            if ch == '\\':
+                # stop before an escape sequence that is not complete yet
+                if i + 1 >= len(text):
+                    break
+                esc = text[i + 1]
+                if esc == 'u':
+                    if i + 6 > len(text):
+                        break
+                    # a high surrogate is decoded together with its low half
+                    width = 12 if 'd800' <= text[i + 2:i + 6].lower() < 'dc00' else 6
+                    if i + width > len(text):
+                        break
+                    try:
+                        out.append(json.loads('"%s"' % text[i:i + width]))
+                    except ValueError:
+                        pass
+                    i += width
+                    continue
+                out.append(_JSON_ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self._pos[name] = i
+        return ''.join(out)
+
+
+def stream_analysis(cv, model: Optional[str] = None, timeout: Optional[int] = None,
+                    force: bool = False) -> Iterator[Tuple[str, Any]]:
+    """Streaming version of `analyze_cv`.
+
+    Yields `(field, text)` pairs with the next part of each field in
+    STREAMED_FIELDS as the model writes it, then `('result', analysis_data)`
+    once the full response has been parsed. A cached analysis is replayed as
+    a single chunk per field unless `force` is set. Raises the same errors as `analyze_cv`; the
+    API request is only sent when the first item is requested.
+    """
+    config = llm_client.get_config()
+    model = model or config['model']
+
+    cv_text = _read_cv_text(cv)
+    cached = None if force else analysis_cache.get_cached_analysis(cv_text, model, ANALYSIS_PROMPT_VERSION)
+    if cached is not None:
+        for name in STREAMED_FIELDS:
+            if cached.get(name):
+                yield name, cached[name]
+        yield 'result', _with_provenance(cached, model)
+        return
+
+    messages = analysis_messages(cv, cv_text, model, timeout)
+    decoder = PartialFieldDecoder()
+    for chunk in llm_client.stream_chat_completion(
+        messages,
+        model=model,
+        timeout=timeout,
+        **_analysis_params(model),
+    ):
+        for name, text in decoder.feed(chunk).items():
+            yield name, text
+
+    result = parse_analysis_response(decoder.text)
+    analysis_cache.store_analysis(cv_text, model, ANALYSIS_PROMPT_VERSION, result)
+    yield 'result', _with_provenance(result, model)
+
+
+def build_analysis_messages(cv, cv_text: Optional[str]) -> List[Dict[str, str]]:
+    """Chat messages asking the model to analyze `cv_text` (or just the filename)."""
+    user_msg = ANALYSIS_USER_PROMPT
     if cv_text:
         user_msg += "Here is the CV text:\n\n" + cv_text
     else:
         user_msg += f"CV filename: {getattr(cv.file, 'name', 'unknown')}"
+    return [
+        {'role': 'system', 'content': ANALYSIS_SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_msg},
+    ]
 
-    payload = {
-        'model': model,
-        'messages': [
-            {'role': 'system', 'content': system_msg},
-            {'role': 'user', 'content': user_msg},
-        ],
-        'temperature': 0.0,
-        'max_tokens': 800,
-    }
 
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json',
-    }
+# Prompt tokens left unused for the tokenizer estimate to be off by
+CONTEXT_MARGIN_TOKENS = 256
 
-    try:
-        resp = requests.post(default_url, headers=headers, json=payload, timeout=timeout)
-    except requests.RequestException as exc:
-        logger.exception('OpenAI request failed: %s', exc)
-        raise RuntimeError('OpenAI request failed') from exc
 
-    if resp.status_code != 200:
-        logger.error('OpenAI API error %s: %s', resp.status_code, resp.text)
-        raise RuntimeError(f'OpenAI API error: {resp.status_code}')
+def context_tokens() -> int:
+    return int(setting('LLM_CONTEXT_TOKENS', '16385'))
 
-    try:
-        data = resp.json()
-    except Exception:
-        logger.exception('Failed to decode JSON response from OpenAI')
-        raise RuntimeError('Invalid JSON from OpenAI')
 
-    # extract assistant content robustly
-    assistant_text = None
-    try:
-        assistant_text = data['choices'][0]['message']['content']
-    except Exception:
-        try:
-            # fall back to older shape
-            assistant_text = data['choices'][0]['text']
-        except Exception:
-            assistant_text = str(data)
+def chunk_tokens() -> int:
+    return int(setting('ANALYSIS_CHUNK_TOKENS', '6000'))
+
+
+def chunk_concurrency() -> int:
+    return max(1, int(setting('ANALYSIS_CHUNK_CONCURRENCY', '4')))
+
+
+def plan_chunks(cv_text: Optional[str], model: str) -> Optional[List[str]]:
+    """None if `cv_text` fits in one analysis request, else the parts to condense first.
+
+    The budget is LLM_CONTEXT_TOKENS minus the prompt, the reply
+    (ANALYSIS_MAX_TOKENS) and a safety margin. Parts are at most
+    ANALYSIS_CHUNK_TOKENS so long CVs are condensed by several calls in
+    parallel.
+    """
+    if not cv_text:
+        return None
+    prompt_tokens = count_message_tokens([
+        {'role': 'system', 'content': ANALYSIS_SYSTEM_PROMPT},
+        {'role': 'user', 'content': ANALYSIS_USER_PROMPT + "Here is the CV text:\n\n"},
+    ], model)
+    budget = context_tokens() - prompt_tokens - ANALYSIS_MAX_TOKENS - CONTEXT_MARGIN_TOKENS
+    if count_tokens(cv_text, model) <= budget:
+        return None
+    return split_text(cv_text, max(1, min(budget, chunk_tokens())), model)
+
+
+def build_chunk_messages(chunk: str, index: int, total: int) -> List[Dict[str, str]]:
+    return [
+        {'role': 'system', 'content': CHUNK_SYSTEM_PROMPT},
+        {'role': 'user', 'content': CHUNK_USER_PROMPT.format(index=index, total=total) + chunk},
+    ]
+
+
+def _chunk_params(model: str) -> Dict[str, Any]:
+    params = {'temperature': 0.0, 'max_tokens': CHUNK_MAX_TOKENS}
+    response_format = llm_client.response_format('cv_chunk_notes', CHUNK_NOTES_SCHEMA, model=model)
+    if response_format:
+        params['response_format'] = response_format
+    return params
 
+
+def _chunk_notes(assistant_text: str) -> Dict[str, Any]:
+    """Notes of one part; unparseable replies are kept as free text."""
+    parsed = _extract_json(assistant_text)
+    if parsed is None:
+        return {'skills': [], 'experience': [], 'notes': (assistant_text or '').strip()[:2000]}
+    skills = parsed.get('skills') or []
+    experience = parsed.get('experience') or []
+    return {
+        'skills': [str(s) for s in skills] if isinstance(skills, list) else [str(skills)],
+        'experience': [str(e) for e in experience] if isinstance(experience, list) else [str(experience)],
+        'notes': str(parsed.get('notes') or ''),
+    }
+
+
+def build_merge_messages(notes: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Chat messages asking for the analysis of a CV from the notes on its parts."""
+    skills, seen = [], set()
+    for part in notes:
+        for skill in part['skills']:
+            if skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    condensed = {
+        'skills': skills,
+        'parts': [{'experience': part['experience'], 'notes': part['notes']} for part in notes],
+    }
+    user_msg = (ANALYSIS_USER_PROMPT + CHUNK_MERGE_PROMPT.format(total=len(notes))
+                + json.dumps(condensed, ensure_ascii=False))
+    return [
+        {'role': 'system', 'content': ANALYSIS_SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_msg},
+    ]
+
+
+def analysis_messages(cv, cv_text: Optional[str], model: str, timeout: Optional[int] = None) -> List[Dict[str, str]]:
+    """Messages of the analysis request for `cv`.
+
+    A CV that fits the context window is sent whole. A longer one is split
+    by `plan_chunks`, the parts are condensed concurrently (up to
+    ANALYSIS_CHUNK_CONCURRENCY calls at once) and the analysis is asked for
+    from their notes, so the wall time is about one short call plus one
+    regular one.
+    """
+    chunks = plan_chunks(cv_text, model)
+    if chunks is None:
+        return build_analysis_messages(cv, cv_text)
+
+    def condense(index: int) -> Dict[str, Any]:
+        data = llm_client.chat_completion(
+            build_chunk_messages(chunks[index], index + 1, len(chunks)),
+            model=model,
+            timeout=timeout,
+            **_chunk_params(model),
+        )
+        return _chunk_notes(llm_client.message_content(data))
+
+    logger.info('CV %s is too long for one request; condensing %d parts', getattr(cv, 'pk', None), len(chunks))
+    with ThreadPoolExecutor(max_workers=min(len(chunks), chunk_concurrency())) as pool:
+        notes = list(pool.map(condense, range(len(chunks))))
+    return build_merge_messages(notes)
+
+
+async def analysis_messages_async(cv, cv_text: Optional[str], model: str,
+                                  timeout: Optional[int] = None) -> List[Dict[str, str]]:
+    """Coroutine version of `analysis_messages`."""
+    chunks = plan_chunks(cv_text, model)
+    if chunks is None:
+        return build_analysis_messages(cv, cv_text)
+
+    semaphore = asyncio.Semaphore(chunk_concurrency())
+
+    async def condense(index: int) -> Dict[str, Any]:
+        async with semaphore:
+            data = await llm_client.async_chat_completion(
+                build_chunk_messages(chunks[index], index + 1, len(chunks)),
+                model=model,
+                timeout=timeout,
+                **_chunk_params(model),
+            )
+        return _chunk_notes(llm_client.message_content(data))
+
+    logger.info('CV %s is too long for one request; condensing %d parts', getattr(cv, 'pk', None), len(chunks))
+    notes = await asyncio.gather(*(condense(i) for i in range(len(chunks))))
+    return build_merge_messages(list(notes))
+
+
+def parse_analysis_response(assistant_text: str) -> Dict[str, Any]:
+    """Parse and normalize the model's analysis JSON.
+
+    Raises RuntimeError if no JSON object can be extracted.
+    """
     parsed = _extract_json(assistant_text)
     if not parsed:
         logger.error('Could not parse JSON from model response')
@@ -196,18 +576,14 @@ def analyze_cv(cv, model: Optional[str] = None, timeout: Optional[int] = None) -
         skills = []
 
     try:
-        ai_score = float(parsed.get('ai_score') or 0.0)
+        ai_score = min(100.0, max(0.0, float(parsed.get('ai_score') or 0.0)))
     except Exception:
         ai_score = 0.0
 
-    result = {
+    return {
         'skills': skills,
         'summary': parsed.get('summary') or '',
         'experience_level': parsed.get('experience_level') or '',
         'ai_score': ai_score,
         'suggestions': parsed.get('suggestions') or '',
     }
-
-    return result
-
-
@@ -0,0 +1,159 @@
+"""Django-free text extraction helpers.
+
+Everything here works on bytes or file paths only, so the functions can be
+run in extraction pool processes that never set up Django.
+"""
+import codecs
+import hashlib
+import logging
+import time
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# Plain text extraction without ligature/whitespace preservation or image
+# blocks, clipped to the page's mediabox; noticeably cheaper than the defaults.
+FAST_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def extract_text_from_bytes(raw: bytes, name: str = '') -> Optional[Dict[str, Any]]:
+    """Extract text from the raw bytes of a CV file (PDF or plain text).
+
+    Returns a dict with keys: text, page_count, byte_size, content_hash,
+    or None if nothing could be extracted.
+    """
+    if not raw:
+        return None
+
+    info = {
+        'text': None,
+        'page_count': 1,
+        'byte_size': len(raw),
+        'content_hash': hashlib.sha256(raw).hexdigest(),
+    }
+
+    # Check if it's a PDF by magic bytes or filename
+    is_pdf = raw.startswith(b'%PDF') or (name or '').endswith('.pdf')
+
+    if is_pdf:
+        try:
+            pdf_doc = fitz.open(stream=BytesIO(raw), filetype='pdf')
+            text_parts = []
+            for page_num in range(len(pdf_doc)):
+                page = pdf_doc[page_num]
+                text_parts.append(page.get_text())
+            info['page_count'] = len(pdf_doc)
+            pdf_doc.close()
+        except Exception as e:
+            logger.warning('Failed to extract PDF text: %s', e)
+            return None
+        if not text_parts:
+            return None
+        info['text'] = '\n'.join(text_parts)
+        return info
+
+    # Try UTF-8 decoding for text files
+    try:
+        info['text'] = raw.decode('utf-8')
+    except Exception:
+        info['text'] = raw.decode('utf-8', errors='ignore')
+    return info
+
+
+def iter_pdf_pages(pdf_doc, page_cap: Optional[int] = None, char_cap: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page of an open PDF, one page at a time.
+
+    Stops after `page_cap` pages or once `char_cap` characters were yielded;
+    the last page is truncated to fit the character cap.
+    """
+    remaining = char_cap
+    for page_num in range(len(pdf_doc)):
+        if page_cap is not None and page_num >= page_cap:
+            return
+        text = pdf_doc[page_num].get_text('text', flags=FAST_TEXT_FLAGS)
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        yield text
+        if remaining is not None and remaining <= 0:
+            return
+
+
+def iter_text_file(fh: BinaryIO, char_cap: Optional[int]) -> Iterator[str]:
+    """Decode a UTF-8 text file chunk by chunk, up to `char_cap` characters."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    remaining = char_cap
+    while remaining is None or remaining > 0:
+        chunk = fh.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        yield text
+
+
+def file_digest(fh: BinaryIO) -> Dict[str, Any]:
+    """SHA-256 and size of a file, read in chunks; rewinds the file."""
+    digest = hashlib.sha256()
+    size = 0
+    fh.seek(0)
+    for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    fh.seek(0)
+    return {'content_hash': digest.hexdigest(), 'byte_size': size}
+
+
+def extract_text_from_file(fh: BinaryIO, name: str, page_cap: Optional[int], char_cap: Optional[int],
+                           pdf_source: Any = None, digest: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Stream text out of an open binary file without loading it into memory.
+
+    `pdf_source` is what PyMuPDF opens for PDFs: a path (pages are read
+    lazily) or a buffer such as an mmap. `digest` is the `file_digest` of
+    the file if the caller already knows it, which saves reading it once
+    more. Returns the keys of `extract_text_from_bytes` plus `elapsed_ms`.
+    """
+    started = time.perf_counter()
+    info = dict(digest) if digest else file_digest(fh)
+    if not info['byte_size']:
+        return None
+    is_pdf = fh.read(4) == b'%PDF' or (name or '').endswith('.pdf')
+    fh.seek(0)
+
+    try:
+        if is_pdf:
+            if isinstance(pdf_source, str):
+                pdf_doc = fitz.open(pdf_source, filetype='pdf')
+            else:
+                pdf_doc = fitz.open(stream=pdf_source, filetype='pdf')
+            try:
+                info['page_count'] = len(pdf_doc)
+                text = '\n'.join(iter_pdf_pages(pdf_doc, page_cap, char_cap))
+            finally:
+                pdf_doc.close()
+        else:
+            info['page_count'] = 1
+            text = ''.join(iter_text_file(fh, char_cap))
+    except Exception as e:
+        logger.warning('Failed to extract CV text from %s: %s', name, e)
+        return None
+
+    if not text:
+        return None
+    info['text'] = text
+    info['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return info
+
+
+def extract_text_from_path(path: str, name: str, page_cap: Optional[int], char_cap: Optional[int],
+                           digest: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """`extract_text_from_file` for a file on local disk."""
+    with open(path, 'rb') as fh:
+        return extract_text_from_file(fh, name, page_cap, char_cap, pdf_source=path, digest=digest)
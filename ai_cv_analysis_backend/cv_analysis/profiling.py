@@ -0,0 +1,298 @@
+"""Opt-in per-request profiling.
+
+A request is profiled when it carries a valid signed `X-Profile` header
+(see `make_header_token`) or is picked by PROFILING_SAMPLE_RATE. For those
+requests the middleware records every SQL query with its duration and call
+site, a cProfile summary, and how the wall time splits between the
+database, LLM calls, serialization and everything else. Results are
+written as JSON files to PROFILING_DIR, keeping the newest
+PROFILING_MAX_ENTRIES, and can be browsed by staff under
+/api/cv/ops/profiles/. Requests that are not profiled only pay for one
+random number and a header lookup.
+"""
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer
+
+from .conf import setting
+
+HEADER = 'X-Profile'
+_SIGNING_SALT = 'cv_analysis.profiling'
+MAX_QUERIES = 500
+MAX_STATS_LINES = 60
+
+# Code objects whose frames mean "serializing the response"
+_SERIALIZATION_CODE = {BaseSerializer.data.fget.__code__, JSONRenderer.render.__code__}
+_PROJECT_ROOT = str(settings.BASE_DIR)
+# execute wrappers of this module and of the metrics middleware are never the call site
+_SKIP_FILES = {__file__, os.path.join(os.path.dirname(__file__), 'metrics.py')}
+
+_current: contextvars.ContextVar[Optional['RequestProfile']] = contextvars.ContextVar('cv_profile', default=None)
+_write_lock = threading.Lock()
+
+
+def sample_rate() -> float:
+    return float(setting('PROFILING_SAMPLE_RATE', '0'))
+
+
+def store_dir() -> str:
+    return str(setting('PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+def max_entries() -> int:
+    return int(setting('PROFILING_MAX_ENTRIES', '200'))
+
+
+def header_max_age() -> int:
+    return int(setting('PROFILING_HEADER_MAX_AGE', '3600'))
+
+
+def make_header_token() -> str:
+    """A value for the X-Profile header, valid for PROFILING_HEADER_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=_SIGNING_SALT).sign('profile')
+
+
+def _valid_header(value: Optional[str]) -> bool:
+    if not value:
+        return False
+    try:
+        signing.TimestampSigner(salt=_SIGNING_SALT).unsign(value, max_age=header_max_age())
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def add_time(category: str, seconds: float) -> None:
+    """Attribute `seconds` to `category` (e.g. 'llm') in the active profile, if any."""
+    profile = _current.get()
+    if profile is not None:
+        profile.timings[category] = profile.timings.get(category, 0.0) + seconds
+
+
+def _call_site() -> Dict[str, Any]:
+    """Innermost project frame (outside Django/DRF and the middlewares) and
+    whether the query runs while a response is being serialized."""
+    frame = sys._getframe(2)
+    site = None
+    in_serialization = False
+    while frame is not None:
+        code = frame.f_code
+        if code in _SERIALIZATION_CODE:
+            in_serialization = True
+        if site is None and code.co_filename.startswith(_PROJECT_ROOT) and code.co_filename not in _SKIP_FILES \
+                and 'site-packages' not in code.co_filename:
+            site = f"{os.path.relpath(code.co_filename, _PROJECT_ROOT)}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return {'site': site, 'in_serialization': in_serialization}
+
+
+class RequestProfile:
+    def __init__(self, request, trigger: str):
+        self.id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.request = request
+        self.trigger = trigger
+        self.queries: List[Dict[str, Any]] = []
+        self.timings: Dict[str, float] = {}
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile()
+
+    def record_query(self, execute, sql, params, many, context):
+        where = _call_site()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': repr(params)[:500],
+                'ms': (time.perf_counter() - started) * 1000,
+                'many': many,
+                **where,
+            })
+
+    def start(self):
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # another profiler is active in this interpreter
+            self.profiler = None
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def report(self, response, wall: float) -> Dict[str, Any]:
+        db_ms = sum(q['ms'] for q in self.queries)
+        db_in_serialization_ms = sum(q['ms'] for q in self.queries if q['in_serialization'])
+        llm_ms = self.timings.get('llm', 0.0) * 1000
+
+        stats_text, serialization_ms = '', 0.0
+        if self.profiler is not None:
+            stats = pstats.Stats(self.profiler, stream=io.StringIO())
+            for (filename, lineno, name), (_cc, _nc, _tt, ct, _callers) in stats.stats.items():
+                if any(code.co_filename == filename and code.co_firstlineno == lineno and code.co_name == name
+                       for code in _SERIALIZATION_CODE):
+                    serialization_ms += ct * 1000
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(MAX_STATS_LINES)
+            stats_text = out.getvalue()
+        # queries run while serializing are reported as DB time only
+        serialization_ms = max(0.0, serialization_ms - db_in_serialization_ms)
+
+        wall_ms = wall * 1000
+        by_sql = Counter(q['sql'] for q in self.queries)
+        by_call = Counter((q['sql'], q['params']) for q in self.queries)
+        duplicates = [
+            {
+                'sql': sql,
+                'count': count,
+                'total_ms': round(sum(q['ms'] for q in self.queries if q['sql'] == sql), 3),
+                'sites': sorted({q['site'] for q in self.queries if q['sql'] == sql and q['site']}),
+            }
+            for sql, count in by_sql.most_common() if count > 1
+        ]
+
+        return {
+            'id': self.id,
+            'created_at': timezone.now().isoformat(),
+            'trigger': self.trigger,
+            'method': self.request.method,
+            'path': self.request.get_full_path()[:500],
+            'view': '.'.join(filter(None, getattr(self.request, '_profile_view', ()))) or None,
+            'user_id': getattr(getattr(self.request, 'user', None), 'pk', None),
+            'status': response.status_code,
+            'wall_ms': round(wall_ms, 3),
+            'split_ms': {
+                'db': round(db_ms, 3),
+                'llm': round(llm_ms, 3),
+                'serialization': round(serialization_ms, 3),
+                'other': round(max(0.0, wall_ms - db_ms - llm_ms - serialization_ms), 3),
+            },
+            'query_count': len(self.queries),
+            'similar_queries': duplicates,
+            'exact_duplicate_queries': sum(count - 1 for count in by_call.values() if count > 1),
+            'queries': [dict(q, ms=round(q['ms'], 3)) for q in self.queries[:MAX_QUERIES]],
+            'cprofile': stats_text,
+        }
+
+
+def save(report: Dict[str, Any]) -> None:
+    """Write a report and drop the oldest ones beyond PROFILING_MAX_ENTRIES."""
+    directory = store_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{report['id']}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f)
+    os.replace(path + '.tmp', path)
+
+    with _write_lock:
+        names = sorted(n for n in os.listdir(directory) if n.endswith('.json'))
+        for name in names[:max(0, len(names) - max_entries())]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def list_reports() -> List[Dict[str, Any]]:
+    """Summaries of the stored reports, newest first."""
+    directory = store_dir()
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted((n for n in os.listdir(directory) if n.endswith('.json')), reverse=True):
+        try:
+            with open(os.path.join(directory, name)) as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summaries.append({key: report.get(key) for key in (
+            'id', 'created_at', 'trigger', 'method', 'path', 'view', 'status',
+            'wall_ms', 'split_ms', 'query_count', 'exact_duplicate_queries',
+        )})
+    return summaries
+
+
+def load_report(report_id: str) -> Optional[Dict[str, Any]]:
+    if not report_id or os.path.basename(report_id) != report_id:
+        return None
+    try:
+        with open(os.path.join(store_dir(), f'{report_id}.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ProfilingMiddleware:
+    """Profiles sampled requests and ones with a signed X-Profile header.
+
+    Profiled responses carry an `X-Profile-Id` header naming the stored
+    report. Async requests are passed through unprofiled.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+
+        trigger = None
+        if _valid_header(request.headers.get(HEADER)):
+            trigger = 'header'
+        else:
+            rate = sample_rate()
+            if rate > 0 and random.random() < rate:
+                trigger = 'sample'
+        if trigger is None:
+            return self.get_response(request)
+
+        profile = RequestProfile(request, trigger)
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile.record_query):
+                profile.start()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profile.stop()
+        finally:
+            _current.reset(token)
+        wall = time.perf_counter() - started
+
+        save(profile.report(response, wall))
+        response[f'{HEADER}-Id'] = profile.id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        cls = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None) or {}
+        request._profile_view = (
+            cls.__name__ if cls is not None else getattr(view_func, '__name__', ''),
+            actions.get(request.method.lower(), ''),
+        )
+        return None
@@ -0,0 +1,212 @@
+"""Per-user cache of the serialized payloads of read endpoints.
+
+`cached(kind)` wraps a list or detail action below `conditional`. Detail
+payloads are stored under the user, kind and pk. List payloads also carry
+the query string and a per-user list generation, so one counter bump drops
+every page and filter of every list of that user.
+
+Each entry records the ETag `conditional` computed from the live
+validators before the view rendered it, and is only served to requests
+whose validators give the same ETag. A response rendered from rows that
+changed meanwhile is therefore never served for the new state, and a
+client never gets an old body under a new ETag. This holds even if an
+invalidation is missed, e.g. a write in another process with a
+per-process cache; READ_CACHE_ENABLED is off by default unless a shared
+CACHE_URL is configured.
+
+The signal handlers at the bottom of this module drop entries when a CV,
+analysis, interview or question is saved or deleted, which keeps outdated
+entries from taking up the cache until their TTL. Code that changes rows
+without signals (`QuerySet.update()`, `bulk_update()`, `bulk_create()`)
+should call `invalidate` itself, as `interview_service.record_answers`
+does. Any Django cache backend works; a failing backend only turns lookups
+into misses.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Any, Dict, Iterable, Optional
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from .conf import setting
+from .models import CV, CVAnalysisResult, Interview, InterviewQuestion
+
+logger = logging.getLogger(__name__)
+
+# Kinds of cached payloads
+CV_LIST = 'cvs'
+CV_DETAIL = 'cv'
+CV_ANALYSIS = 'cv-analysis'  # the analysis of a CV, by CV id
+ANALYSIS_LIST = 'analyses'
+ANALYSIS_DETAIL = 'analysis'
+INTERVIEW_LIST = 'interviews'
+INTERVIEW_DETAIL = 'interview'
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'errors': 0}
+_stats_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    default = 'true' if setting('CACHE_URL', '') else 'false'
+    return str(setting('READ_CACHE_ENABLED', default)).lower() in ['1', 'true', 'yes']
+
+
+def ttl() -> int:
+    return int(setting('READ_CACHE_TTL_SECONDS', '300'))
+
+
+def _cache():
+    return caches[setting('READ_CACHE_ALIAS', 'default')]
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _detail_key(user_id: Any, kind: str, pk: Any) -> str:
+    return f'read:{user_id}:{kind}:{pk}'
+
+
+def _generation_key(user_id: Any) -> str:
+    return f'read:{user_id}:lists'
+
+
+def _list_key(cache, user_id: Any, kind: str, path: str) -> str:
+    generation = cache.get(_generation_key(user_id), 0)
+    return f'read:{user_id}:{kind}:g{generation}:{path}'
+
+
+def cached(kind: str):
+    """Serve a read action of a viewset from the cache when possible.
+
+    Must be applied below `conditional`, whose ETag every entry is checked
+    against; requests without one (the resource was not found) are not
+    cached. Actions called with a `pk` are cached as details of `kind`,
+    others as lists. Only 200 responses are stored.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = getattr(request, 'conditional_etag', None)
+            if not is_enabled() or request.method != 'GET' or etag is None:
+                return view_method(self, request, *args, **kwargs)
+            user_id = request.user.pk
+            pk = kwargs.get('pk')
+            try:
+                cache = _cache()
+                if pk is not None:
+                    key = _detail_key(user_id, kind, pk)
+                else:
+                    key = _list_key(cache, user_id, kind, request.get_full_path())
+                entry = cache.get(key)
+            except Exception as exc:
+                logger.warning('Read cache lookup failed: %s', exc)
+                _count('errors')
+                return view_method(self, request, *args, **kwargs)
+
+            if entry is not None and entry.get('etag') == etag:
+                _count('hits')
+                return Response(entry['data'])
+            _count('misses')
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                try:
+                    cache.set(key, {'etag': etag, 'data': response.data}, ttl())
+                    _count('stores')
+                except Exception as exc:
+                    logger.warning('Read cache store failed: %s', exc)
+                    _count('errors')
+            return response
+        return wrapper
+    return decorator
+
+
+def _drop(user_id: Any, details: Iterable[tuple], lists: bool) -> None:
+    try:
+        cache = _cache()
+        cache.delete_many([_detail_key(user_id, kind, pk) for kind, pk in details])
+        if lists:
+            try:
+                cache.incr(_generation_key(user_id))
+            except ValueError:
+                # none stored yet, or evicted: start from a value no earlier
+                # generation can have had
+                cache.set(_generation_key(user_id), time.time_ns(), None)
+    except Exception as exc:
+        logger.warning('Read cache invalidation failed: %s', exc)
+        _count('errors')
+
+
+def invalidate(user_id: Optional[int], details: Iterable[tuple] = (), lists: bool = True) -> None:
+    """Drop the cached `details` ((kind, pk) pairs) of a user and, unless
+    `lists` is False, all of their cached lists."""
+    if user_id is None or not is_enabled():
+        return
+    details = list(details)
+    _count('invalidations')
+    _drop(user_id, details, lists)
+    transaction.on_commit(lambda: _drop(user_id, details, lists))
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters of this process."""
+    with _stats_lock:
+        data = dict(_stats)
+    lookups = data['hits'] + data['misses']
+    data['hit_ratio'] = round(data['hits'] / lookups, 4) if lookups else 0.0
+    data['enabled'] = is_enabled()
+    return data
+
+
+def _cv_owner(instance) -> Optional[int]:
+    """User id of the CV `instance` belongs to, without a query if its CV is loaded."""
+    if type(instance).cv.is_cached(instance):
+        return instance.cv.user_id
+    return CV.objects.filter(pk=instance.cv_id).values_list('user_id', flat=True).first()
+
+
+# Deletions are handled in pre_delete: in a cascade the CV owning the row
+# may already be gone by post_delete.
+
+@receiver(post_save, sender=CV)
+@receiver(pre_delete, sender=CV)
+def _cv_changed(sender, instance, **kwargs):
+    invalidate(instance.user_id, [(CV_DETAIL, instance.pk), (CV_ANALYSIS, instance.pk)])
+
+
+@receiver(post_save, sender=CVAnalysisResult)
+@receiver(pre_delete, sender=CVAnalysisResult)
+def _analysis_changed(sender, instance, **kwargs):
+    invalidate(_cv_owner(instance), [
+        (ANALYSIS_DETAIL, instance.pk),
+        (CV_ANALYSIS, instance.cv_id),
+        (CV_DETAIL, instance.cv_id),
+    ])
+
+
+@receiver(post_save, sender=Interview)
+@receiver(pre_delete, sender=Interview)
+def _interview_changed(sender, instance, **kwargs):
+    invalidate(_cv_owner(instance), [(INTERVIEW_DETAIL, instance.pk)])
+
+
+@receiver(post_save, sender=InterviewQuestion)
+@receiver(pre_delete, sender=InterviewQuestion)
+def _question_changed(sender, instance, origin=None, **kwargs):
+    if instance.interview_id is None:
+        return
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not InterviewQuestion:
+        # deleted along with its interview, whose handler drops the detail
+        return
+    owner = Interview.objects.filter(pk=instance.interview_id).values_list('cv__user_id', flat=True).first()
+    # questions only appear in the interview detail
+    invalidate(owner, [(INTERVIEW_DETAIL, instance.interview_id)], lists=False)
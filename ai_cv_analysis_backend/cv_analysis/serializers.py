@@ -1,6 +1,11 @@
 from rest_framework import serializers
-from .models import CV, CVAnalysisResult
+from collections import Counter
+
+from .models import CV, CVAnalysisResult, CVUpload, AnalysisJob, AnalysisBatch
 from .models import Interview, InterviewQuestion
+from .analysis_jobs import ACTIVE_STATUSES, BATCH_NOT_FOUND, BATCH_SKIPPED, bulk_max_cvs
+from .chunked_upload import chunk_bytes, max_chunk_bytes
+from .interview_service import CHOICE_KEYS
 
 class CVCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,10 +15,16 @@ class CVCreateSerializer(serializers.ModelSerializer):
 
 
 class CVListSerializer(serializers.ModelSerializer):
+    """A CV with the annotations added by `CVViewSet.get_queryset` for lists."""
+    has_analysis = serializers.BooleanField(read_only=True)
+    ai_score = serializers.FloatField(read_only=True, allow_null=True)
+    interview_count = serializers.IntegerField(read_only=True)
+    latest_interview_score = serializers.FloatField(read_only=True, allow_null=True)
+
     class Meta:
         model = CV
-        fields = ['id', 'file', 'uploaded_at']
-        read_only_fields = ['id', 'file', 'uploaded_at']
+        fields = ['id', 'file', 'uploaded_at', 'has_analysis', 'ai_score', 'interview_count', 'latest_interview_score']
+        read_only_fields = fields
 
 
 class CVDetailSerializer(serializers.ModelSerializer):
@@ -39,6 +50,26 @@ class CVUpdateSerializer(serializers.ModelSerializer):
         fields = ['file']
 
 
+class CVUploadStartSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+
+class CVUploadSerializer(serializers.ModelSerializer):
+    """State of a resumable upload; `offset` is where the next chunk starts."""
+    offset = serializers.IntegerField(source='received', read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CVUpload
+        fields = ['id', 'size', 'offset', 'chunk_size', 'expires_at']
+        read_only_fields = fields
+
+    def get_chunk_size(self, obj):
+        return min(chunk_bytes(), max_chunk_bytes())
+
+
 class CVAnalysisResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = CVAnalysisResult
@@ -46,15 +77,112 @@ class CVAnalysisResultSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'cv', 'analyzed_at']
 
 
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisJob
+        fields = ['id', 'cv', 'status', 'attempts', 'error', 'created_at', 'claimed_at', 'finished_at']
+        read_only_fields = fields
+
+
+class BulkAnalyzeSerializer(serializers.Serializer):
+    cv_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    force = serializers.BooleanField(default=False)
+
+    def validate_cv_ids(self, value):
+        if len(value) > bulk_max_cvs():
+            raise serializers.ValidationError(f'At most {bulk_max_cvs()} CVs can be analyzed at once.')
+        return value
+
+
+class AnalysisBatchSerializer(serializers.ModelSerializer):
+    """A bulk analysis with the current state of each CV.
+
+    Each entry of `results` has the CV id, its job id (if one was queued),
+    `status` (a job status, `skipped` or `not_found`), the job error and,
+    once available, the stored analysis. Reads the jobs and analyses in two
+    queries however many CVs the batch has.
+    """
+
+    class Meta:
+        model = AnalysisBatch
+        fields = ['id', 'force', 'created_at']
+        read_only_fields = fields
+
+    def to_representation(self, batch):
+        data = super().to_representation(batch)
+        jobs = AnalysisJob.objects.in_bulk([item['job_id'] for item in batch.items if item.get('job_id')])
+        analyses = {
+            analysis.cv_id: analysis
+            for analysis in CVAnalysisResult.objects.filter(
+                cv_id__in=[item['cv_id'] for item in batch.items], cv__user_id=batch.user_id
+            )
+        }
+
+        results = []
+        for item in batch.items:
+            entry = {'cv_id': item['cv_id'], 'job_id': item.get('job_id'), 'status': item.get('status'), 'error': None}
+            if entry['job_id'] is not None:
+                job = jobs.get(entry['job_id'])
+                if job is None:
+                    # the CV (and with it the job) was deleted since
+                    entry['status'] = BATCH_NOT_FOUND
+                else:
+                    entry['status'], entry['error'] = job.status, job.error
+            if entry['status'] == BATCH_NOT_FOUND:
+                entry['error'] = 'CV not found'
+
+            analysis = analyses.get(item['cv_id'])
+            if entry['status'] in (AnalysisJob.STATUS_SUCCEEDED, BATCH_SKIPPED) and analysis is not None:
+                entry['analysis'] = CVAnalysisResultSerializer(analysis).data
+            else:
+                entry['analysis'] = None
+            results.append(entry)
+
+        counts = Counter(entry['status'] for entry in results)
+        data.update({
+            'total': len(results),
+            'counts': dict(counts),
+            'done': not any(counts[s] for s in ACTIVE_STATUSES),
+            'results': results,
+        })
+        return data
+
+
 class InterviewQuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = InterviewQuestion
         fields = '__all__'
 
 
+class InterviewSummarySerializer(serializers.ModelSerializer):
+    """An interview without its questions, for listings."""
+
+    class Meta:
+        model = Interview
+        fields = '__all__'
+
+
 class InterviewSerializer(serializers.ModelSerializer):
     questions = InterviewQuestionSerializer(many=True, read_only=True)
 
     class Meta:
         model = Interview
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class SubmitAnswerSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField(min_value=1)
+    user_answer = serializers.ChoiceField(choices=CHOICE_KEYS)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict) and isinstance(data.get('user_answer'), str):
+            data = {**data, 'user_answer': data['user_answer'].strip().upper()}
+        return super().to_internal_value(data)
+
+
+class SubmitAnswersSerializer(serializers.Serializer):
+    answers = serializers.ListField(child=SubmitAnswerSerializer(), allow_empty=False, max_length=100)
+
+    def answer_map(self):
+        """Question id -> answer; for a question listed twice the last answer wins."""
+        return {a['question_id']: a['user_answer'] for a in self.validated_data['answers']}
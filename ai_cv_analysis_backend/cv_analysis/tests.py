@@ -1,3 +1,541 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from .analysis_jobs import create_batch, process_job
+from . import analysis_cache, llm_client
+from .conf import setting
+from .llm_guard import CircuitBreaker, ConcurrencyLimiter
+from .interview_service import create_interview, record_answers
+from .models import (
+    CV, AnalysisCacheEntry, AnalysisJob, CVAnalysisResult, CVText, CVUpload, Interview, InterviewQuestion,
+)
+from .openai_service import ANALYSIS_PROMPT_VERSION, PartialFieldDecoder, _extract_json, _object_spans
+from .text_extraction import EXTRACTOR_VERSION
+
+
+def make_questions(count):
+    return [
+        {
+            'question': f'Question {i}?',
+            'choices': {'A': 'one', 'B': 'two', 'C': 'three', 'D': 'four'},
+            'correct': 'ABCD'[i % 4],
+        }
+        for i in range(count)
+    ]
+
+
+ANALYSIS = {
+    'skills': ['Python'], 'summary': 'Engineer', 'experience_level': 'Senior', 'ai_score': 80, 'suggestions': 'More',
+}
+
+
+class CreateInterviewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.cv = CV.objects.create(user=user, file='cv_files/cv.txt')
+
+    def test_query_count_does_not_depend_on_question_count(self):
+        for count in (1, 10, 50):
+            # savepoint, interview INSERT, one multi-row question INSERT, release
+            with self.assertNumQueries(4):
+                interview = create_interview(self.cv, make_questions(count))
+            self.assertEqual(interview.total_questions, count)
+            self.assertEqual(interview.questions.count(), count)
+
+    def test_invalid_questions_are_dropped_and_counted_out(self):
+        questions = make_questions(3) + [
+            {'question': '', 'choices': {'A': 'a', 'B': 'b', 'C': 'c', 'D': 'd'}, 'correct': 'A'},
+            {'question': 'No choices?', 'correct': 'A'},
+            {'question': 'Missing D?', 'choices': {'A': 'a', 'B': 'b', 'C': 'c'}, 'correct': 'A'},
+            {'question': 'Bad answer?', 'choices': {'A': 'a', 'B': 'b', 'C': 'c', 'D': 'd'}, 'correct': 'E'},
+            'not a question',
+        ]
+        interview = create_interview(self.cv, questions)
+        self.assertEqual(interview.total_questions, 3)
+        self.assertEqual(interview.questions.count(), 3)
+
+    def test_choices_are_cut_to_the_column_length(self):
+        question = make_questions(1)[0]
+        question['choices']['B'] = 'x' * 1000
+        question['correct'] = ' b '
+        interview = create_interview(self.cv, [question])
+        stored = interview.questions.get()
+        self.assertEqual(len(stored.choice_2), 255)
+        self.assertEqual(stored.correct_answer, 'B')
+
+    def test_nothing_is_stored_without_usable_questions(self):
+        self.assertIsNone(create_interview(self.cv, [{'question': 'Incomplete?'}]))
+        self.assertIsNone(create_interview(self.cv, None))
+        self.assertFalse(Interview.objects.exists())
+        self.assertFalse(InterviewQuestion.objects.exists())
+
+
+class RecordAnswersTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        cv = CV.objects.create(user=user, file='cv_files/cv.txt')
+        self.interview = create_interview(cv, make_questions(2))
+        # the correct answers are A and B
+        self.first, self.second = self.interview.questions.order_by('id')
+
+    def assertCounters(self, counters, correct, answered, score, completed):
+        self.assertEqual(counters, {
+            'correct_answers': correct, 'answered_questions': answered, 'score': score, 'completed': completed,
+        })
+        self.interview.refresh_from_db()
+        self.assertEqual(self.interview.correct_answers, correct)
+        self.assertEqual(self.interview.answered_questions, answered)
+
+    def test_changing_an_answer_moves_the_score_both_ways(self):
+        self.assertCounters(record_answers(self.interview, {self.first.pk: 'A'}), 1, 1, 50.0, False)
+        self.assertCounters(record_answers(self.interview, {self.first.pk: 'C'}), 0, 1, 0.0, False)
+        self.assertCounters(record_answers(self.interview, {self.first.pk: 'A'}), 1, 1, 50.0, False)
+
+    def test_answering_the_last_question_completes_the_interview(self):
+        self.assertCounters(record_answers(self.interview, {self.first.pk: 'D'}), 0, 1, 0.0, False)
+        self.assertCounters(record_answers(self.interview, {self.second.pk: 'B'}), 1, 2, 50.0, True)
+        # changing an answer afterwards keeps it completed
+        self.assertCounters(record_answers(self.interview, {self.first.pk: 'A'}), 2, 2, 100.0, True)
+
+    def test_identical_answer_writes_nothing(self):
+        record_answers(self.interview, {self.first.pk: 'A', self.second.pk: 'C'})
+        self.interview.refresh_from_db()
+        updated_at = self.interview.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            counters = record_answers(self.interview, {self.first.pk: 'A', self.second.pk: 'C'})
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+        self.assertCounters(counters, 1, 2, 50.0, True)
+        self.assertEqual(self.interview.updated_at, updated_at)
+
+    def test_unknown_question_raises_and_stores_nothing(self):
+        other = create_interview(self.interview.cv, make_questions(1)).questions.get()
+        for unknown in (0, other.pk):
+            with self.assertRaises(InterviewQuestion.DoesNotExist):
+                record_answers(self.interview, {self.first.pk: 'A', unknown: 'A'})
+        self.first.refresh_from_db()
+        self.assertIsNone(self.first.user_answer)
+        self.interview.refresh_from_db()
+        self.assertEqual(self.interview.answered_questions, 0)
+
+
+class InterviewListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.cv = CV.objects.create(user=self.user, file='cv_files/cv.txt')
+        self.other_cv = CV.objects.create(user=self.user, file='cv_files/other.txt')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_query_count_per_page_does_not_depend_on_size(self):
+        for _ in range(25):
+            create_interview(self.cv, make_questions(10))
+        url = '/api/cv/interviews/?page_size=10'
+        pages = 0
+        while url:
+            # the ETag validator and one SELECT for the page; questions are not loaded
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all('questions' not in item for item in response.data['results']))
+            # revalidating an unchanged page only runs the validator
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+            url = response.data['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+
+    def test_filter_by_cv(self):
+        mine = create_interview(self.cv, make_questions(1))
+        create_interview(self.other_cv, make_questions(1))
+        response = self.client.get(f'/api/cv/interviews/?cv={self.cv.pk}')
+        self.assertEqual([item['id'] for item in response.data['results']], [mine.pk])
+        self.assertEqual(self.client.get('/api/cv/interviews/?cv=abc').status_code, 400)
+
+    def test_detail_query_count(self):
+        interview = create_interview(self.cv, make_questions(10))
+        # validator, interview, then its questions in one prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/cv/interviews/{interview.pk}/')
+        self.assertEqual(len(response.data['questions']), 10)
+
+
+@override_settings(READ_CACHE_ENABLED=True)
+class ReadCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.cv = CV.objects.create(user=self.user, file='cv_files/cv.txt')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_entry_is_only_served_for_its_etag(self):
+        url = f'/api/cv/cvs/{self.cv.pk}/'
+        first = self.client.get(url)
+        # a change no signal reports, like a write in another process
+        CV.objects.filter(pk=self.cv.pk).update(file='cv_files/new.txt', updated_at=timezone.now())
+        second = self.client.get(url)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertTrue(second.data['file'].endswith('cv_files/new.txt'))
+        # the fresh body is cached under the fresh ETag
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data, second.data)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media, CV_UPLOAD_MAX_CHUNK_BYTES=8, CV_EXTRACTION_POOL_SIZE=0, INTERVIEW_DRAFTS_ENABLED=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.content = b'Jane Doe, engineer'
+
+    def start(self, sha256=''):
+        data = {'filename': 'cv.txt', 'size': len(self.content)}
+        if sha256:
+            data['sha256'] = sha256
+        response = self.client.post('/api/cv/uploads/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f"/api/cv/uploads/{response.data['id']}/"
+
+    def put(self, url, start, end, body):
+        return self.client.put(url, body, content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}')
+
+    def send_all(self, url, start=0):
+        while start < len(self.content):
+            end = min(start + 8, len(self.content)) - 1
+            response = self.put(url, start, end, self.content[start:end + 1])
+            self.assertEqual(response.status_code, 200)
+            start = response.data['offset']
+
+    def test_resume_after_partial_chunk(self):
+        url = self.start()
+        # the connection dropped after 5 of the announced 8 bytes
+        response = self.put(url, 0, 7, self.content[:5])
+        self.assertEqual(response.data['offset'], 5)
+        self.assertEqual(self.client.get(url).data['offset'], 5)
+        self.send_all(url, start=5)
+        response = self.client.post(url + 'finalize/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['content_hash'], hashlib.sha256(self.content).hexdigest())
+        with CV.objects.get(pk=response.data['id']).file.open('rb') as fh:
+            self.assertEqual(fh.read(), self.content)
+
+    def test_mismatched_offset_is_refused(self):
+        url = self.start()
+        self.put(url, 0, 7, self.content[:8])
+        response = self.put(url, 4, 11, self.content[4:12])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 8)
+
+    def test_sha256_mismatch_discards_the_upload(self):
+        url = self.start(sha256='0' * 64)
+        self.send_all(url)
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 422)
+        self.assertFalse(CVUpload.objects.exists())
+        self.assertFalse(CV.objects.exists())
+
+    def test_oversize_chunk_is_refused(self):
+        url = self.start()
+        response = self.put(url, 0, 8, self.content[:9])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def test_expired_upload_is_gone(self):
+        url = self.start()
+        self.put(url, 0, 7, self.content[:8])
+        CVUpload.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.put(url, 8, 15, self.content[8:16]).status_code, 410)
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 410)
+        self.assertEqual(self.client.get(url).status_code, 410)
+        self.assertFalse(CV.objects.exists())
+
+
+@override_settings(INTERVIEW_DRAFTS_ENABLED=False)
+class AnalysisJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.cv = CV.objects.create(user=self.user, file='cv_files/cv.txt')
+
+    def test_result_created_concurrently_finishes_the_job(self):
+        job = AnalysisJob.objects.create(cv=self.cv)
+
+        def analyze(cv, **kwargs):
+            # another request stores a result while the model is answering
+            CVAnalysisResult.objects.create(cv=cv, summary='theirs')
+            return ANALYSIS
+
+        with mock.patch('cv_analysis.analysis_jobs.openai_analyze_cv', side_effect=analyze):
+            process_job(job.pk, 'worker')
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_SUCCEEDED)
+        self.assertEqual(CVAnalysisResult.objects.get(cv=self.cv).summary, 'theirs')
+
+    def test_batch_jobs_schedule_no_interview_draft(self):
+        single = CV.objects.create(user=self.user, file='cv_files/single.txt')
+        batch = create_batch(self.user, [self.cv.pk], dispatch=False)
+        single_job = AnalysisJob.objects.create(cv=single)
+
+        with mock.patch('cv_analysis.analysis_jobs.openai_analyze_cv', return_value=ANALYSIS), \
+                mock.patch('cv_analysis.analysis_jobs.schedule_draft') as schedule_draft:
+            process_job(batch.items[0]['job_id'], 'worker')
+            self.assertTrue(CVAnalysisResult.objects.filter(cv=self.cv).exists())
+            schedule_draft.assert_not_called()
+
+            process_job(single_job.pk, 'worker')
+            schedule_draft.assert_called_once_with(CVAnalysisResult.objects.get(cv=single))
+
+
+class SettingTests(TestCase):
+    @override_settings(LLM_GLOBAL_MAX_CONCURRENCY=0)
+    def test_falsy_setting_is_not_replaced_by_the_environment(self):
+        with mock.patch.dict('os.environ', {'LLM_GLOBAL_MAX_CONCURRENCY': '4'}):
+            self.assertEqual(setting('LLM_GLOBAL_MAX_CONCURRENCY', '0'), 0)
+
+    @override_settings(LLM_GLOBAL_MAX_CONCURRENCY=None)
+    def test_missing_setting_falls_back_to_the_environment(self):
+        with mock.patch.dict('os.environ', {'LLM_GLOBAL_MAX_CONCURRENCY': '4'}):
+            self.assertEqual(setting('LLM_GLOBAL_MAX_CONCURRENCY', '0'), '4')
+
+
+@override_settings(LLM_MAX_RETRIES=2, LLM_BACKOFF_BASE=0)
+class LLMRequestErrorTests(SimpleTestCase):
+    config = {'api_key': 'key', 'url': 'https://llm.example.com/v1', 'timeout': 5}
+
+    def post(self, error):
+        session = mock.Mock()
+        session.post.side_effect = error
+        with mock.patch('cv_analysis.llm_client.get_session', return_value=session), \
+                mock.patch('cv_analysis.llm_client.metrics.observe_llm_request') as observe, \
+                self.assertLogs('cv_analysis.llm_client'), self.assertRaises(llm_client.LLMError):
+            llm_client._post_with_retries(self.config, {}, None)
+        return session.post.call_count, [c.args[0] for c in observe.call_args_list]
+
+    def apost(self, error):
+        client = mock.Mock()
+        client.post = mock.AsyncMock(side_effect=error)
+        with mock.patch('cv_analysis.llm_client.get_async_client', return_value=client), \
+                mock.patch('cv_analysis.llm_client.metrics.observe_llm_request') as observe, \
+                self.assertLogs('cv_analysis.llm_client'), self.assertRaises(llm_client.LLMError):
+            asyncio.run(llm_client._apost_with_retries(self.config, {}, None))
+        return client.post.call_count, [c.args[0] for c in observe.call_args_list]
+
+    def test_invalid_request_is_an_error_and_not_retried(self):
+        self.assertEqual(self.post(requests.exceptions.InvalidURL('bad url')), (1, ['error']))
+        self.assertEqual(self.post(requests.exceptions.InvalidSchema('no adapter')), (1, ['error']))
+        self.assertEqual(self.apost(httpx.UnsupportedProtocol('no scheme')), (1, ['error']))
+
+    def test_timeout_is_not_retried(self):
+        self.assertEqual(self.post(requests.ReadTimeout('slow')), (1, ['timeout']))
+        self.assertEqual(self.apost(httpx.ReadTimeout('slow')), (1, ['timeout']))
+
+    def test_connection_error_is_retried(self):
+        self.assertEqual(self.post(requests.ConnectionError('reset')), (3, ['error'] * 3))
+        self.assertEqual(self.apost(httpx.ConnectError('reset')), (3, ['error'] * 3))
+
+    @override_settings(OPENAI_API_KEY='key')
+    def test_slot_is_given_back_during_backoff(self):
+        limiter = ConcurrencyLimiter(local_limit=1, acquire_timeout=0)
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'choices': [{'message': {'content': 'ok'}}]}
+        client = mock.Mock()
+        client.post = mock.AsyncMock(side_effect=[httpx.ConnectError('reset'), response])
+        in_flight = []
+
+        async def sleep(delay):
+            in_flight.append(limiter.stats()['in_flight'])
+
+        with mock.patch('cv_analysis.llm_client.get_limiter', return_value=limiter), \
+                mock.patch('cv_analysis.llm_client.get_breaker', return_value=CircuitBreaker()), \
+                mock.patch('cv_analysis.llm_client.get_async_client', return_value=client), \
+                mock.patch('cv_analysis.llm_client.asyncio.sleep', side_effect=sleep), \
+                self.assertLogs('cv_analysis.llm_client'):
+            data = asyncio.run(llm_client.async_chat_completion([]))
+        self.assertEqual(llm_client.message_content(data), 'ok')
+        self.assertEqual(in_flight, [0])
+        self.assertEqual(limiter.stats()['in_flight'], 0)
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_acquire_times_out_when_local_limit_is_reached(self):
+        limiter = ConcurrencyLimiter(local_limit=1, acquire_timeout=0.05)
+        token = limiter.acquire()
+        self.assertIsNone(limiter.acquire())
+        self.assertEqual(limiter.stats()['rejected'], 1)
+
+        limiter.release(token)
+        self.assertIsNotNone(limiter.acquire())
+        self.assertEqual(limiter.stats()['in_flight'], 1)
+
+    def test_global_slots_are_shared_through_the_cache(self):
+        first = ConcurrencyLimiter(local_limit=0, global_limit=1, acquire_timeout=0)
+        second = ConcurrencyLimiter(local_limit=0, global_limit=1, acquire_timeout=0)
+        token = first.acquire()
+        self.assertIsNone(second.acquire())
+        self.assertEqual(second.stats()['rejected'], 1)
+
+        first.release(token)
+        self.assertIsNotNone(second.acquire())
+
+    def test_expired_slot_taken_by_another_owner_is_not_released(self):
+        limiter = ConcurrencyLimiter(local_limit=0, global_limit=1, acquire_timeout=0)
+        token = limiter.acquire()
+        key = token.rpartition(':')[0]
+        # the slot expired and another process took it
+        cache.set(key, 42)
+        limiter.release(token)
+        self.assertEqual(cache.get(key), 42)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('cv_analysis.llm_guard.logger')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.stats()['state'], CircuitBreaker.OPEN)
+        self.assertGreater(breaker.retry_after(), 1)
+
+    def test_half_open_probe_closes_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.stats()['state'], CircuitBreaker.HALF_OPEN)
+        # only one probe at a time
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.stats(), {'state': CircuitBreaker.CLOSED, 'consecutive_failures': 0})
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_opens_the_circuit_again(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            breaker.record_failure()
+        with mock.patch('cv_analysis.llm_guard.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertEqual(breaker.stats()['state'], CircuitBreaker.OPEN)
+            self.assertFalse(breaker.allow())
+
+
+class ResponseParsingTests(SimpleTestCase):
+    def test_object_spans_skip_braces_in_strings(self):
+        text = 'a {"x": {"y": "}"}, "z": "\\"{"} b {"w": 1}'
+        self.assertEqual([text[i:j] for i, j in _object_spans(text)],
+                         ['{"x": {"y": "}"}, "z": "\\"{"}', '{"w": 1}'])
+
+    def test_extracts_object_from_fenced_output(self):
+        text = 'Here you go:\n```json\n{"summary": "a {b}", "skills": ["C"]}\n```'
+        self.assertEqual(_extract_json(text), {'summary': 'a {b}', 'skills': ['C']})
+
+    def test_skips_blocks_that_are_not_json(self):
+        text = 'Use {placeholders} like {this}. {"summary": "say \\"hi\\"", "n": {"m": 1}}'
+        self.assertEqual(_extract_json(text), {'summary': 'say "hi"', 'n': {'m': 1}})
+
+    def test_python_literal_fallback(self):
+        self.assertEqual(_extract_json("Result: {'summary': 'ok', 'ai_score': 7}"), {'summary': 'ok', 'ai_score': 7})
+
+    def test_no_object(self):
+        self.assertIsNone(_extract_json('no json here [1, 2]'))
+        self.assertIsNone(_extract_json(''))
+
+    def test_partial_field_decoder_handles_any_chunking(self):
+        output = '{"skills": ["summary"], "summary" : "He said \\"hi\\" \\u00e9\\n", "suggestions": "More"}'
+        for size in (1, 2, 3, 7, len(output)):
+            decoder, fields = PartialFieldDecoder(), {}
+            for i in range(0, len(output), size):
+                for name, text in decoder.feed(output[i:i + size]).items():
+                    fields[name] = fields.get(name, '') + text
+            self.assertEqual(fields, {'summary': 'He said "hi" \u00e9\n', 'suggestions': 'More'})
+            self.assertEqual(decoder.text, output)
+
+
+@override_settings(ANALYSIS_CACHE_ENABLED=True, ANALYSIS_CACHE_EVICT_EVERY=3, ANALYSIS_CACHE_EVICT_SECONDS=3600,
+                   INTERVIEW_DRAFTS_ENABLED=False)
+class AnalysisCacheTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(analysis_cache._evict_state, {'stores': 0, 'at': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(analysis_cache.get_cached_analysis('cv text', 'model', 'v1'))
+        analysis_cache.store_analysis('cv text', 'model', 'v1', ANALYSIS)
+        self.assertEqual(analysis_cache.get_cached_analysis('cv text', 'model', 'v1'), ANALYSIS)
+        self.assertIsNone(analysis_cache.get_cached_analysis('cv text', 'other-model', 'v1'))
+        self.assertIsNone(analysis_cache.get_cached_analysis('other text', 'model', 'v1'))
+
+    def test_new_prompt_version_invalidates_old_entries(self):
+        analysis_cache.store_analysis('cv text', 'model', 'v1', ANALYSIS)
+        self.assertIsNone(analysis_cache.get_cached_analysis('cv text', 'model', 'v2'))
+
+        # the first store of a process sweeps
+        analysis_cache._evict_state['at'] = None
+        analysis_cache.store_analysis('other text', 'model', 'v2', ANALYSIS)
+        self.assertEqual(list(AnalysisCacheEntry.objects.values_list('prompt_version', flat=True)), ['v2'])
+
+    @override_settings(ANALYSIS_CACHE_MAX_ENTRIES=2)
+    def test_eviction_runs_every_few_stores_and_keeps_recently_used(self):
+        for i in range(3):
+            analysis_cache.store_analysis(f'cv {i}', 'model', 'v1', ANALYSIS)
+        # only the first store swept; the bound is enforced on the next sweep
+        self.assertEqual(AnalysisCacheEntry.objects.count(), 3)
+
+        analysis_cache.get_cached_analysis('cv 0', 'model', 'v1')
+        analysis_cache.store_analysis('cv 3', 'model', 'v1', ANALYSIS)
+        self.assertEqual(AnalysisCacheEntry.objects.count(), 2)
+        self.assertIsNotNone(analysis_cache.get_cached_analysis('cv 0', 'model', 'v1'))
+        self.assertIsNotNone(analysis_cache.get_cached_analysis('cv 3', 'model', 'v1'))
+
+    def test_analyze_returns_cached_result_without_a_job(self):
+        user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        client = APIClient()
+        client.force_authenticate(user)
+        cached_cv = CV.objects.create(user=user, file='cv_files/cached.txt')
+        new_cv = CV.objects.create(user=user, file='cv_files/new.txt')
+        for cv, text in ((cached_cv, 'known text'), (new_cv, 'new text')):
+            CVText.objects.create(cv=cv, text=text, content_hash=text, extractor_version=EXTRACTOR_VERSION)
+        analysis_cache.store_analysis('known text', llm_client.default_model(), ANALYSIS_PROMPT_VERSION, ANALYSIS)
+
+        with self.captureOnCommitCallbacks():
+            response = client.post(f'/api/cv/cvs/{cached_cv.pk}/analyze/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], 'Engineer')
+        self.assertFalse(AnalysisJob.objects.filter(cv=cached_cv).exists())
+
+        with mock.patch('cv_analysis.analysis_jobs.submit'), self.captureOnCommitCallbacks():
+            response = client.post(f'/api/cv/cvs/{new_cv.pk}/analyze/')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(AnalysisJob.objects.filter(cv=new_cv).exists())
@@ -0,0 +1,180 @@
+import logging
+import mmap
+import time
+from typing import Any, Dict, Optional
+
+
+from . import extraction_pool, metrics
+from .conf import setting
+from .models import CVText
+from .pdf_text import (
+    extract_text_from_bytes,
+    extract_text_from_file,
+    extract_text_from_path,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the extraction logic changes so stored text gets re-extracted.
+EXTRACTOR_VERSION = '2'
+
+
+def max_pages() -> int:
+    return int(setting('CV_TEXT_MAX_PAGES', '50'))
+
+
+def max_chars() -> int:
+    return int(setting('CV_TEXT_MAX_CHARS', '100000'))
+
+
+def _local_path(cv) -> Optional[str]:
+    try:
+        return cv.file.path
+    except (NotImplementedError, AttributeError, ValueError):
+        # remote storages (S3 etc.) have no local path
+        return None
+
+
+def extract_text_streaming(cv, page_cap: Optional[int] = None, char_cap: Optional[int] = None,
+                           digest: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Memory-bounded variant of `extract_cv_text`.
+
+    The stored file is opened by path (PyMuPDF reads pages lazily) or, if the
+    storage hands out a real file, memory-mapped; the file is never loaded
+    into a bytes object. Text is collected page by page up to the page and
+    character caps (CV_TEXT_MAX_PAGES / CV_TEXT_MAX_CHARS by default).
+    Files on local disk are parsed in the extraction process pool. A known
+    `digest` (content_hash and byte_size) skips hashing the file.
+
+    Returns the same keys as `extract_text_from_bytes` plus `elapsed_ms`,
+    or None if nothing could be extracted.
+    """
+    page_cap = max_pages() if page_cap is None else page_cap
+    char_cap = max_chars() if char_cap is None else char_cap
+    name = getattr(cv.file, 'name', '') or ''
+
+    path = _local_path(cv)
+    if path:
+        try:
+            info = extraction_pool.run(extract_text_from_path, path, name, page_cap, char_cap, digest)
+        except (OSError, extraction_pool.ExtractionError) as e:
+            logger.warning('Could not extract CV file %s: %s', name, e)
+            return None
+    else:
+        info = _extract_from_storage_file(cv, name, page_cap, char_cap, digest)
+
+    if info:
+        logger.debug('Extracted %s chars from %s in %.1fms', len(info['text']), name, info['elapsed_ms'])
+    return info
+
+
+def _extract_from_storage_file(cv, name: str, page_cap: int, char_cap: int,
+                               digest: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    try:
+        fh = cv.file.open('rb')
+    except Exception as e:
+        logger.warning('Could not open CV file %s: %s', name, e)
+        return None
+
+    mapped = None
+    try:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            # storage without a real file descriptor: buffered fallback
+            return extract_cv_text_buffered(cv)
+        return extract_text_from_file(fh, name, page_cap, char_cap, pdf_source=mapped, digest=digest)
+    finally:
+        if mapped is not None:
+            mapped.close()
+        fh.close()
+
+
+def read_cv_bytes(cv) -> Optional[bytes]:
+    """Read the raw bytes of the uploaded CV file, or None if unavailable."""
+    f = cv.file
+    try:
+        f.seek(0)
+        return f.read()
+    except Exception:
+        try:
+            with f.open('rb') as fh:
+                return fh.read()
+        except Exception:
+            return None
+
+
+def extract_cv_text_buffered(cv) -> Optional[Dict[str, Any]]:
+    """Read the whole file into memory and extract it (the original path)."""
+    started = time.perf_counter()
+    try:
+        raw = read_cv_bytes(cv)
+        if not raw:
+            return None
+        info = extraction_pool.run(extract_text_from_bytes, raw, getattr(cv.file, 'name', '') or '')
+    except Exception as e:
+        logger.exception('Error reading CV file: %s', e)
+        return None
+    if info:
+        info['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return info
+
+
+def extract_cv_text(cv, digest: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Extract text and file metadata from the CV's stored file.
+
+    Uses the streaming extractor unless CV_TEXT_STREAMING is disabled.
+    """
+    started = time.perf_counter()
+    if str(setting('CV_TEXT_STREAMING', 'true')).lower() in ['1', 'true', 'yes']:
+        mode, info = 'streaming', extract_text_streaming(cv, digest=digest)
+    else:
+        mode, info = 'buffered', extract_cv_text_buffered(cv)
+    metrics.observe_extraction(mode, bool(info), time.perf_counter() - started)
+    return info
+
+
+def save_cv_text(cv, extracted: Dict[str, Any]) -> CVText:
+    """Store the output of an extraction as the CV's CVText row."""
+    cv_text, _ = CVText.objects.update_or_create(
+        cv=cv,
+        defaults={
+            'text': extracted['text'] or '',
+            'page_count': extracted['page_count'],
+            'byte_size': extracted['byte_size'],
+            'content_hash': extracted['content_hash'],
+            'extractor_version': EXTRACTOR_VERSION,
+        },
+    )
+    return cv_text
+
+
+def store_cv_text(cv, digest: Optional[Dict[str, Any]] = None) -> Optional[CVText]:
+    """Extract the CV's text and persist it. Returns None if extraction failed.
+
+    `digest` is the file's content_hash and byte_size if already known
+    (see `chunked_upload`).
+    """
+    extracted = extract_cv_text(cv, digest)
+    if not extracted:
+        return None
+    return save_cv_text(cv, extracted)
+
+
+def stored_cv_text(cv) -> Optional[str]:
+    """Return the CV's stored text if it is current, without extracting it."""
+    text = CVText.objects.filter(cv=cv, extractor_version=EXTRACTOR_VERSION).values_list('text', flat=True).first()
+    return text or None
+
+
+def get_cv_text(cv) -> Optional[str]:
+    """Return the CV's text, extracting and storing it only when needed.
+
+    Text stored by an older EXTRACTOR_VERSION is refreshed.
+    """
+    stored = CVText.objects.filter(cv=cv).only('text', 'extractor_version').first()
+    if stored is None or stored.extractor_version != EXTRACTOR_VERSION:
+        stored = store_cv_text(cv)
+    if stored is None or not stored.text:
+        return None
+    return stored.text
@@ -0,0 +1,96 @@
+"""Token counting and splitting for fitting CV text into a model's context.
+
+Counts come from tiktoken's encoding for the model. When the encoding is
+not available (it is downloaded on first use, which fails offline) they
+fall back to an estimate of CHARS_PER_TOKEN characters per token, which is
+close for English prose and errs large for CV-style text.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Any, List, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 3.5
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_PARAGRAPH = re.compile(r'(?<=\n\n)')
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Optional[Any]:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as exc:
+        logger.warning('No tokenizer for %s (%s); estimating token counts', model, exc)
+        return None
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as exc:
+        logger.warning('No tokenizer for %s (%s); estimating token counts', model, exc)
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return int(len(text) / CHARS_PER_TOKEN) + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[dict], model: str) -> int:
+    """Prompt tokens of a chat request with `messages`."""
+    return sum(count_tokens(str(m.get('content', '')), model) + MESSAGE_OVERHEAD_TOKENS for m in messages) + 3
+
+
+def _hard_split(text: str, max_tokens: int, model: str) -> List[str]:
+    encoding = _encoding(model)
+    if encoding is None:
+        size = max(1, int(max_tokens * CHARS_PER_TOKEN))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def _pieces(text: str, max_tokens: int, model: str):
+    """(piece, tokens) in order: paragraphs, or lines / hard splits of oversized ones."""
+    for paragraph in _PARAGRAPH.split(text):
+        tokens = count_tokens(paragraph, model)
+        if tokens <= max_tokens:
+            yield paragraph, tokens
+            continue
+        for line in paragraph.splitlines(keepends=True):
+            tokens = count_tokens(line, model)
+            if tokens <= max_tokens:
+                yield line, tokens
+                continue
+            for part in _hard_split(line, max_tokens, model):
+                yield part, count_tokens(part, model)
+
+
+def split_text(text: str, max_tokens: int, model: str) -> List[str]:
+    """Split `text` into chunks of at most about `max_tokens` tokens each.
+
+    Cuts fall between paragraphs where possible, then between lines, and
+    only inside a line that is longer than a whole chunk. Every piece is
+    counted once.
+    """
+    max_tokens = max(1, max_tokens)
+    chunks, current, used = [], [], 0
+    for piece, tokens in _pieces(text, max_tokens, model):
+        if current and used + tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += tokens
+    if current:
+        chunks.append(''.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
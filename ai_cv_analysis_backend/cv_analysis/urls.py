@@ -1,12 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CVViewSet, CVAnalysisResultViewSet, InterviewViewSet
+from .views import CVViewSet, CVAnalysisResultViewSet, CVUploadViewSet, InterviewViewSet, OpsStatsView, ProfileDetailView, ProfileListView
+from . import async_views
 router = DefaultRouter()
 router.register(r'cvs', CVViewSet, basename='cv')
+router.register(r'uploads', CVUploadViewSet, basename='cv-upload')
 router.register(r'analysis-results', CVAnalysisResultViewSet, basename='cv-analysis-result')
 router.register(r'interviews', InterviewViewSet, basename='interview')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('ops/stats/', OpsStatsView.as_view(), name='ops-stats'),
+    path('ops/profiles/', ProfileListView.as_view(), name='ops-profiles'),
+    path('ops/profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='ops-profile-detail'),
+    path('async/cvs/<int:pk>/analyze/', async_views.analyze_cv_view, name='async-cv-analyze'),
+    path('async/interviews/start/', async_views.start_interview_view, name='async-interview-start'),
     
 ]
@@ -1,33 +1,77 @@
-from django.shortcuts import render
-import openai
-import requests
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework import status
-from .models import CV, CVAnalysisResult, Interview, InterviewQuestion
-from .serializers import InterviewSerializer, InterviewQuestionSerializer
-from django.shortcuts import get_object_or_404
-from django.conf import settings
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
-
-
-# Create your views here.
+import io
+import itertools
+import json
 import logging
-from rest_framework import status, permissions, viewsets
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
-from .models import CV, CVAnalysisResult
+from rest_framework.views import APIView
+
+from . import analysis_cache, llm_client, profiling, read_cache
+from . import conditional as validators
+from .analysis_jobs import create_batch, enqueue_analysis, run_batch, save_analysis_result, validate_analysis_data
+from .chunked_upload import UploadError, abort_upload, check_live, finish_upload, start_upload, write_chunk
+from .conditional import conditional
+from .interview_drafts import claim_draft
+from .interview_service import (
+    INTERVIEW_MAX_TOKENS,
+    INTERVIEW_TEMPERATURE,
+    add_to_bank,
+    build_interview_messages,
+    create_interview,
+    draw_from_bank,
+    parse_questions,
+    record_answers,
+)
+from .models import CV, AnalysisBatch, AnalysisJob, CVAnalysisResult, CVUpload, Interview, InterviewQuestion
+from .openai_service import analyze_cv as openai_analyze_cv, cached_analysis, stream_analysis
+from .read_cache import cached
 from .serializers import (
+    AnalysisBatchSerializer,
+    AnalysisJobSerializer,
+    BulkAnalyzeSerializer,
+    CVAnalysisResultSerializer,
     CVCreateSerializer,
-    CVListSerializer,
     CVDetailSerializer,
+    CVListSerializer,
     CVUpdateSerializer,
-    CVAnalysisResultSerializer,
+    CVUploadSerializer,
+    CVUploadStartSerializer,
+    InterviewSerializer,
+    InterviewSummarySerializer,
+    SubmitAnswerSerializer,
+    SubmitAnswersSerializer,
 )
-from .openai_service import analyze_cv as openai_analyze_cv
-from django.db import IntegrityError
+from .text_extraction import store_cv_text
+
+logger = logging.getLogger(__name__)
+
+def _retry_after_headers(exc):
+    """Retry-After header for 503s caused by the LLM circuit breaker/limiter."""
+    if isinstance(exc, llm_client.LLMUnavailable):
+        return {'Retry-After': str(exc.retry_after)}
+    return None
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _sse_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # keep nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class CVViewSet(viewsets.ModelViewSet):
@@ -35,7 +79,9 @@ class CVViewSet(viewsets.ModelViewSet):
 
     - List and create are scoped to the authenticated user.
     - `create` will set `user` automatically via perform_create.
-    - POST to the `analyze` action will create a CVAnalysisResult for the CV.
+    - POST to the `analyze` action queues an analysis job (202) or, with
+      `?sync=true`, creates the CVAnalysisResult within the request.
+    - GET to the `analysis-status` action reports the progress of the latest job.
     - GET to the `analysis` action will return the analysis for the CV.
     """
 
@@ -57,10 +103,54 @@ class CVViewSet(viewsets.ModelViewSet):
             return CV.objects.none()
 
         # ensure users only see their own CVs
-        return CV.objects.filter(user=user)
+        queryset = CV.objects.filter(user=user)
+        if self.action == 'list':
+            queryset = self._annotate_list(queryset)
+        return queryset
+
+    @conditional(validators.cv_list)
+    @cached(read_cache.CV_LIST)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(validators.cv_detail)
+    @cached(read_cache.CV_DETAIL)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @staticmethod
+    def _annotate_list(queryset):
+        # Correlated subqueries instead of joins, so the list stays one
+        # query without GROUP BY however many interviews a CV has.
+        analysis = CVAnalysisResult.objects.filter(cv=OuterRef('pk'))
+        interviews = Interview.objects.filter(cv=OuterRef('pk')).order_by()
+        return queryset.annotate(
+            has_analysis=Exists(analysis),
+            ai_score=Subquery(analysis.values('ai_score')[:1]),
+            interview_count=Coalesce(
+                Subquery(interviews.values('cv').annotate(n=Count('pk')).values('n'), output_field=IntegerField()),
+                0,
+            ),
+            latest_interview_score=Subquery(interviews.order_by('-id').values('score')[:1]),
+        )
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        cv = serializer.save(user=self.request.user)
+        self._store_text(cv)
+
+    def perform_update(self, serializer):
+        cv = serializer.save()
+        if 'file' in serializer.validated_data:
+            self._store_text(cv)
+
+    @staticmethod
+    def _store_text(cv, digest=None):
+        # Extract the text once per upload so analysis never re-parses the
+        # file. A failure here must not fail the upload; analyze retries it.
+        try:
+            store_cv_text(cv, digest)
+        except Exception as exc:
+            logger.exception('Failed to extract text for CV %s: %s', cv.pk, exc)
 
     def create(self, request, *args, **kwargs):
         """Override create to return file URL and ID of the created CV."""
@@ -93,9 +183,13 @@ class CVViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], url_path='analyze')
     def analyze(self, request, pk=None):
-        """Run (mock) AI analysis against the CV and create a CVAnalysisResult.
+        """Run the AI analysis for the CV.
 
-        Replace mock logic with a real AI integration later.
+        By default the analysis is queued as an AnalysisJob and the response is
+        202 with the job id; poll `analysis-status/` for the outcome. An
+        analysis of the same CV text found in the analysis cache is stored
+        and returned right away (200) instead. Pass `?sync=true` to wait for
+        the AI call and get the CVAnalysisResult (201) directly, as before.
         """
         try:
             cv = CV.objects.get(pk=pk, user=request.user)
@@ -106,77 +200,172 @@ class CVViewSet(viewsets.ModelViewSet):
         # re-run by passing ?force=true. This prevents UNIQUE constraint errors
         # when someone calls analyze repeatedly for the same CV.
         force = request.query_params.get('force') in ['1', 'true', 'True']
+        sync = request.query_params.get('sync') in ['1', 'true', 'True']
 
         existing = CVAnalysisResult.objects.filter(cv=cv).first()
         if existing and not force:
             serializer = CVAnalysisResultSerializer(existing)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+        if not sync:
+            cached = None if force else cached_analysis(cv)
+            if cached is not None and not validate_analysis_data(cached):
+                analysis, _ = save_analysis_result(cv, cached)
+                return Response(CVAnalysisResultSerializer(analysis).data, status=status.HTTP_200_OK)
+            job = enqueue_analysis(cv, force=force)
+            data = AnalysisJobSerializer(job).data
+            data['cv_id'] = cv.id
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+
         # Use OpenAI to analyze the CV. If OpenAI is not configured or fails,
-        # fall back to the original mock analysis.
+        # report the error without creating any DB records.
         try:
-            analysis_data = openai_analyze_cv(cv)
+            analysis_data = openai_analyze_cv(cv, force=force)
         except Exception as exc:
-            # Print to console and log. Do NOT use hardcoded fallback or create any DB records.
+            # Log and report; do NOT use a hardcoded fallback or create any DB records.
             error_message = str(exc)
-            print('OpenAI analysis failed:', error_message)
-            logger = logging.getLogger(__name__)
             logger.exception('OpenAI analysis failed: %s', exc)
             return Response({
                 'error': 'Failed to analyze CV',
                 'detail': f'AI service error: {error_message}',
                 'cv_id': cv.id
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=_retry_after_headers(exc))
 
         # Validate the analysis_data shape before creating a DB record. If the
-        # AI returned invalid data, print/log and return an error without
+        # AI returned invalid data, log and return an error without
         # creating any CVAnalysisResult.
-        if not isinstance(analysis_data, dict):
-            print('OpenAI returned invalid analysis_data:', analysis_data)
-            logging.getLogger(__name__).error('OpenAI returned non-dict analysis_data: %r', analysis_data)
-            return Response({'error': 'Invalid analysis response from AI'}, status=status.HTTP_502_BAD_GATEWAY)
-
-        required_keys = {'skills', 'summary', 'experience_level', 'ai_score', 'suggestions'}
-        if not required_keys.issubset(set(analysis_data.keys())):
-            print('OpenAI returned incomplete analysis_data:', analysis_data)
-            logging.getLogger(__name__).error('OpenAI returned incomplete analysis_data: %r', analysis_data)
-            return Response({'error': 'Incomplete analysis response from AI'}, status=status.HTTP_502_BAD_GATEWAY)
-
-        # If forcing a re-run, remove the existing result first. Note this
-        # does not prevent a race where another process re-creates a result
-        # between our delete and create; we handle that with IntegrityError
-        # below by returning the existing row.
-        if existing and force:
-            try:
-                existing.delete()
-            except Exception:
-                # deletion failed for some reason; continue and attempt create
-                pass
+        error = validate_analysis_data(analysis_data)
+        if error:
+            logger.error('OpenAI returned invalid analysis_data: %r', analysis_data)
+            return Response({'error': error}, status=status.HTTP_502_BAD_GATEWAY)
+
+        # If forcing a re-run the existing result is replaced. A concurrent
+        # request that created the row first wins and its result is returned.
+        analysis, created = save_analysis_result(cv, analysis_data, replace=bool(existing and force))
+        serializer = CVAnalysisResultSerializer(analysis)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-analyze')
+    def bulk_analyze(self, request):
+        """Analyze several CVs in one request.
+
+        Body: `{"cv_ids": [1, 2, ...], "force": false}`. CVs that already have
+        an analysis are skipped unless `force` is set. The CVs are queued as
+        AnalysisJobs and the response is 202 with the batch; poll
+        `bulk-analyze/{batch_id}/` for per-CV progress and results. With
+        `?sync=true` the jobs run within the request, ANALYSIS_BULK_CONCURRENCY
+        at a time, and the final per-CV results are returned with 200.
+        """
+        serializer = BulkAnalyzeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sync = request.query_params.get('sync') in ['1', 'true', 'True']
+
+        batch = create_batch(
+            request.user,
+            serializer.validated_data['cv_ids'],
+            force=serializer.validated_data['force'],
+            dispatch=not sync,
+        )
+        if sync:
+            run_batch(batch)
+            return Response(AnalysisBatchSerializer(batch).data, status=status.HTTP_200_OK)
+        return Response(AnalysisBatchSerializer(batch).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'bulk-analyze/(?P<batch_id>[0-9]+)')
+    def bulk_analyze_status(self, request, batch_id=None):
+        """Return the progress of a bulk analysis started by this user."""
+        batch = AnalysisBatch.objects.filter(pk=batch_id, user=request.user).first()
+        if batch is None:
+            return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(AnalysisBatchSerializer(batch).data)
+
+    @action(detail=True, methods=['post'], url_path='analyze-stream')
+    def analyze_stream(self, request, pk=None):
+        """Run the AI analysis and stream it as server-sent events.
+
+        `summary` and `suggestions` events carry `{"delta": "..."}` with the
+        text the model has written since the previous event. Once the full
+        response validated, the stored CVAnalysisResult is sent as a `result`
+        event; otherwise the stream ends with an `error` event. An existing
+        analysis is sent as `result` right away unless `?force=true`.
+        Failures before the first token are plain 503 responses, as in
+        `analyze`.
+        """
+        try:
+            cv = CV.objects.get(pk=pk, user=request.user)
+        except CV.DoesNotExist:
+            return Response({'error': 'CV not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        force = request.query_params.get('force') in ['1', 'true', 'True']
+        existing = CVAnalysisResult.objects.filter(cv=cv).first()
+        if existing and not force:
+            return _sse_response(iter([_sse_event('result', CVAnalysisResultSerializer(existing).data)]))
+
+        # Wait for the first token here so that refused or failed calls still
+        # get a proper status code instead of an error event.
+        events = stream_analysis(cv, force=force)
         try:
-            analysis = CVAnalysisResult.objects.create(
-                cv=cv,
-                summary=analysis_data.get('summary'),
-                skills_extracted=analysis_data.get('skills', []),
-                experience_level=analysis_data.get('experience_level'),
-                ai_score=analysis_data.get('ai_score'),
-                suggestions=analysis_data.get('suggestions')
-            )
+            first = next(events)
+        except Exception as exc:
+            logger.exception('OpenAI analysis failed: %s', exc)
+            return Response({
+                'error': 'Failed to analyze CV',
+                'detail': f'AI service error: {exc}',
+                'cv_id': cv.id
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=_retry_after_headers(exc))
 
-            serializer = CVAnalysisResultSerializer(analysis)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        except IntegrityError:
-            # Another request created the analysis concurrently. Return the
-            # existing analysis instead of failing with a 500.
+        def body():
             try:
-                analysis = CVAnalysisResult.objects.get(cv=cv)
-                serializer = CVAnalysisResultSerializer(analysis)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            except CVAnalysisResult.DoesNotExist:
-                # Extremely unlikely: the insert failed and no row exists.
-                return Response({'error': 'Could not create analysis'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                for name, value in itertools.chain([first], events):
+                    if name != 'result':
+                        yield _sse_event(name, {'delta': value})
+                        continue
+                    error = validate_analysis_data(value)
+                    if error:
+                        logger.error('OpenAI returned invalid analysis_data: %r', value)
+                        yield _sse_event('error', {'error': error})
+                        return
+                    analysis, _ = save_analysis_result(cv, value, replace=bool(existing and force))
+                    yield _sse_event('result', CVAnalysisResultSerializer(analysis).data)
+            except Exception as exc:
+                logger.exception('Streaming analysis failed: %s', exc)
+                yield _sse_event('error', {'error': 'Failed to analyze CV', 'detail': f'AI service error: {exc}'})
+            finally:
+                # releases the LLM limiter slot if the client went away early
+                events.close()
+
+        return _sse_response(body())
+
+    @action(detail=True, methods=['get'], url_path='analysis-status')
+    def analysis_status(self, request, pk=None):
+        """Return the state of the latest analysis job for this CV.
+
+        Once the job succeeded the stored analysis is included under `analysis`.
+        """
+        try:
+            cv = CV.objects.get(pk=pk, user=request.user)
+        except CV.DoesNotExist:
+            return Response({'error': 'CV not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        job = AnalysisJob.objects.filter(cv=cv).first()
+        analysis = CVAnalysisResult.objects.filter(cv=cv).first()
+        if job is None and analysis is None:
+            return Response({'error': 'No analysis has been requested for this CV'}, status=status.HTTP_404_NOT_FOUND)
+
+        if job is not None:
+            data = AnalysisJobSerializer(job).data
+        else:
+            # analysed synchronously (or before jobs existed)
+            data = {'id': None, 'cv': cv.id, 'status': AnalysisJob.STATUS_SUCCEEDED}
+
+        data['analysis'] = None
+        if analysis is not None and data['status'] == AnalysisJob.STATUS_SUCCEEDED:
+            data['analysis'] = CVAnalysisResultSerializer(analysis).data
+        return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'], url_path='analysis')
+    @conditional(validators.cv_analysis)
+    @cached(read_cache.CV_ANALYSIS)
     def analysis(self, request, pk=None):
         """Return the analysis for this CV (if any)."""
         try:
@@ -187,6 +376,151 @@ class CVViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Analysis not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class CVUploadViewSet(viewsets.ViewSet):
+    """Resumable CV uploads for large files and unreliable connections.
+
+    1. `POST uploads/` with `{"filename", "size", "sha256"?}` reserves the
+       upload and returns its `id`, `offset` and a suggested `chunk_size`.
+    2. `PUT uploads/{id}/` with the raw bytes of a chunk and
+       `Content-Range: bytes <start>-<end>/<size>`, where start is the
+       current offset. Returns the new offset; after a dropped connection
+       `GET uploads/{id}/` tells where to resume.
+    3. `POST uploads/{id}/finalize/` creates the CV and returns it like
+       `POST cvs/` does.
+
+    `DELETE uploads/{id}/` abandons an upload; unfinished uploads also
+    expire after CV_UPLOAD_TTL_SECONDS and then answer 410.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _get_upload(self, request, pk):
+        try:
+            return CVUpload.objects.get(pk=pk, user=request.user)
+        except (CVUpload.DoesNotExist, ValidationError):
+            return None
+
+    @staticmethod
+    def _error(exc):
+        data = {'error': str(exc)}
+        if exc.offset is not None:
+            data['offset'] = exc.offset
+        return Response(data, status=exc.status_code)
+
+    def create(self, request):
+        serializer = CVUploadStartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            upload = start_upload(request.user, data['filename'], data['size'], data.get('sha256', ''))
+        except UploadError as exc:
+            return self._error(exc)
+        return Response(CVUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        upload = self._get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            check_live(upload)
+        except UploadError as exc:
+            return self._error(exc)
+        return Response(CVUploadSerializer(upload).data)
+
+    def update(self, request, pk=None):
+        """Write one chunk; the body is streamed to storage, never parsed."""
+        upload = self._get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        match = _CONTENT_RANGE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if match is None:
+            return Response(
+                {'error': 'Content-Range: bytes <start>-<end>/<size> is required', 'offset': upload.received},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end = int(match.group(1)), int(match.group(2))
+        if end < start or match.group(3) not in ('*', str(upload.size)):
+            return Response({'error': 'Invalid Content-Range', 'offset': upload.received},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # request.stream is None for an empty body
+            write_chunk(upload, start, end - start + 1, request.stream or io.BytesIO())
+        except UploadError as exc:
+            return self._error(exc)
+        return Response(CVUploadSerializer(upload).data, status=status.HTTP_200_OK)
+
+    def destroy(self, request, pk=None):
+        upload = self._get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        upload = self._get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            cv, digest = finish_upload(upload)
+        except UploadError as exc:
+            return self._error(exc)
+        CVViewSet._store_text(cv, digest)
+        return Response({
+            'id': cv.id,
+            'file_url': cv.file.url,
+            'content_hash': digest['content_hash'],
+        }, status=status.HTTP_201_CREATED)
+
+
+class OpsStatsView(APIView):
+    """Runtime counters of this process for operators (staff only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'analysis_cache': analysis_cache.stats(),
+            'llm_pool': llm_client.pool_stats(),
+            'llm_guard': llm_client.guard_stats(),
+            'read_cache': read_cache.stats(),
+        }, status=status.HTTP_200_OK)
+
+
+class ProfileListView(APIView):
+    """Stored request profiles, newest first (staff only).
+
+    Also hands out a fresh value for the `X-Profile` request header, which
+    makes the profiling middleware record that request.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'header': profiling.HEADER,
+            'token': profiling.make_header_token(),
+            'token_max_age': profiling.header_max_age(),
+            'sample_rate': profiling.sample_rate(),
+            'results': profiling.list_reports(),
+        }, status=status.HTTP_200_OK)
+
+
+class ProfileDetailView(APIView):
+    """One stored request profile with its queries and cProfile output (staff only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        report = profiling.load_report(profile_id)
+        if report is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class CVAnalysisResultViewSet(viewsets.ReadOnlyModelViewSet):
     """Read-only access to CVAnalysisResult objects for the authenticated user."""
 
@@ -207,37 +541,69 @@ class CVAnalysisResultViewSet(viewsets.ReadOnlyModelViewSet):
         # restrict to analysis for CVs owned by the requesting user
         return CVAnalysisResult.objects.filter(cv__user=user)
 
+    @conditional(validators.analysis_list)
+    @cached(read_cache.ANALYSIS_LIST)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-import os
-import json
-from .openai_service import analyze_cv as openai_analyze_cv
+    @conditional(validators.analysis_detail)
+    @cached(read_cache.ANALYSIS_DETAIL)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-logger = logging.getLogger(__name__)
+
+class InterviewCursorPagination(CursorPagination):
+    """Newest interviews first. The id is unique and follows creation order,
+    so pages stay stable while new interviews are started."""
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class InterviewViewSet(viewsets.ViewSet):
     """ViewSet for Interview management.
     
     - `start` action: Creates a new interview with AI-generated questions based on CV analysis
-    - `list` action: Returns all interviews for the authenticated user
+    - `list` action: Returns the interviews of the authenticated user, paginated, optionally for one CV
     - `retrieve` action: Returns a specific interview with its questions
     - `destroy` action: Deletes a specific interview (DELETE method)
     - `submit_answer` action: Submits an answer to a question and updates scoring
+    - `submit_answers` action: Submits several answers in one request
     - `save_progress` action: Saves current question index for resume functionality
     """
     
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional(validators.interview_list)
+    @cached(read_cache.INTERVIEW_LIST)
     def list(self, request):
-        """Return all interviews for the authenticated user."""
-        interviews = Interview.objects.filter(cv__user=request.user)
-        serializer = InterviewSerializer(interviews, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """Return the interviews of the authenticated user, newest first.
 
+        Interviews are listed without their questions and paginated by
+        cursor (`?cursor=`, `?page_size=`). `?cv=<id>` limits the list to
+        one CV.
+        """
+        interviews = Interview.objects.filter(cv__user=request.user)
+        cv_id = request.query_params.get('cv')
+        if cv_id is not None:
+            if not cv_id.isdigit():
+                return Response({'error': 'cv must be a CV id'}, status=status.HTTP_400_BAD_REQUEST)
+            interviews = interviews.filter(cv_id=int(cv_id))
+
+        paginator = InterviewCursorPagination()
+        page = paginator.paginate_queryset(interviews, request, view=self)
+        serializer = InterviewSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @conditional(validators.interview_detail)
+    @cached(read_cache.INTERVIEW_DETAIL)
     def retrieve(self, request, pk=None):
         """Return a specific interview with its questions."""
         try:
-            interview = Interview.objects.get(pk=pk, cv__user=request.user)
+            interview = Interview.objects.prefetch_related(
+                Prefetch('questions', queryset=InterviewQuestion.objects.order_by('id')),
+            ).get(pk=pk, cv__user=request.user)
             serializer = InterviewSerializer(interview)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Interview.DoesNotExist:
@@ -281,167 +647,85 @@ class InterviewViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create interview object
-        interview = Interview.objects.create(cv=cv)
-
-        # Prepare prompt for OpenAI
-        prompt = f"""
-You are a professional interviewer preparing a candidate for a real technical or professional job interview.
-
-The candidate’s background and skillset are summarized below. Use this information only to understand their **role, domain, and expertise level** — do NOT ask questions about their CV, summary, or skills list directly.
-
-Candidate Profile:
-Summary: {analysis.summary}
-Skills: {', '.join(analysis.skills_extracted)}
-Experience Level: {analysis.experience_level}
-Suggestions: {analysis.suggestions}
-
-Your task:
-Generate **10 realistic multiple-choice interview questions** that the candidate might face in an actual interview for a position that matches their background.
-
-Guidelines:
-- Questions must evaluate **real job-relevant knowledge** or **problem-solving ability**, not what’s written in the CV.
-- Use **scenario-based, conceptual, and practical** questions related to their field.
-- Adapt question difficulty to their experience level (junior/mid/senior).
-- Each question should sound like it could come from a **real interviewer**.
-- Avoid any reference to the CV, résumé, skills list, or candidate summary in the question text.
-- Keep questions short, professional, and natural.
-
-Formatting:
-Return ONLY valid JSON in this exact structure (no markdown, no commentary):
-
-[
-  {{
-    "question": "Question text here",
-    "choices": {{
-      "A": "Option A",
-      "B": "Option B",
-      "C": "Option C",
-      "D": "Option D"
-    }},
-    "correct": "A"
-  }},
-  ...
-]
-"""
-        try:
-            # Use requests to call OpenAI API
-            api_key = getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY')
-            if not api_key:
-                raise RuntimeError('OPENAI_API_KEY not configured')
-
-            model = getattr(settings, 'OPENAI_MODEL', None) or os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
-            api_url = getattr(settings, 'OPENAI_API_URL', None) or os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions')
-            timeout = int(getattr(settings, 'OPENAI_TIMEOUT', None) or os.getenv('OPENAI_TIMEOUT', '30'))
-
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-            }
-
-            payload = {
-                'model': model,
-                'messages': [
-                    {'role': 'system', 'content': 'You are a professional technical interviewer. Always respond with valid JSON only.'},
-                    {'role': 'user', 'content': prompt},
-                ],
-                'temperature': 0.7,
-                'max_tokens': 2000,
-            }
-
-            resp = requests.post(api_url, headers=headers, json=payload, timeout=timeout)
-
-            if resp.status_code != 200:
-                logger.error('OpenAI API error %s: %s', resp.status_code, resp.text)
-                return Response({'error': 'Failed to generate interview questions'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-            data = resp.json()
-            response_text = data['choices'][0]['message']['content']
+        # Questions prepared in the background after the analysis are used
+        # first. Otherwise candidates with a similar profile get a fresh random
+        # set from the question bank; the LLM is only asked when the bucket is
+        # still thin.
+        questions_data = claim_draft(analysis)
+        if questions_data is None:
+            questions_data = draw_from_bank(analysis)
 
-            # Extract and parse JSON
+        if questions_data is None:
             try:
-                questions_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                logger.error('Failed to parse JSON from OpenAI response: %s', response_text)
+                data = llm_client.chat_completion(
+                    build_interview_messages(analysis),
+                    temperature=INTERVIEW_TEMPERATURE,
+                    max_tokens=INTERVIEW_MAX_TOKENS,
+                )
+            except llm_client.LLMError as exc:
+                return Response(
+                    {'error': 'Failed to generate interview questions'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers=_retry_after_headers(exc),
+                )
+            except Exception as exc:
+                logger.exception('Failed to generate interview questions: %s', exc)
+                return Response(
+                    {'error': 'Failed to generate interview questions'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+            # Extract and parse JSON
+            questions_data = parse_questions(llm_client.message_content(data))
+            if questions_data is None:
                 return Response({'error': 'Invalid AI response format'}, status=status.HTTP_502_BAD_GATEWAY)
+            # Keep them for similar candidates
+            add_to_bank(analysis, questions_data)
 
-            if not isinstance(questions_data, list) or len(questions_data) == 0:
-                return Response({'error': 'AI did not generate any questions'}, status=status.HTTP_502_BAD_GATEWAY)
-
-            # Save questions to DB
-            for q in questions_data:
-                try:
-                    InterviewQuestion.objects.create(
-                        interview=interview,
-                        question_text=q.get('question', ''),
-                        choice_1=q.get('choices', {}).get('A', ''),
-                        choice_2=q.get('choices', {}).get('B', ''),
-                        choice_3=q.get('choices', {}).get('C', ''),
-                        choice_4=q.get('choices', {}).get('D', ''),
-                        correct_answer=q.get('correct', ''),
-                    )
-                except Exception as e:
-                    logger.warning('Failed to save interview question: %s', e)
-
-            interview.total_questions = len(questions_data)
-            interview.save()
+        # The interview is only created once usable questions exist, so a
+        # failed generation leaves nothing behind.
+        interview = create_interview(cv, questions_data)
+        if interview is None:
+            return Response({'error': 'AI did not generate any questions'}, status=status.HTTP_502_BAD_GATEWAY)
 
-            serializer = InterviewSerializer(interview)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        except Exception as exc:
-            logger.exception('Failed to generate interview questions: %s', exc)
-            interview.delete()
-            return Response(
-                {'error': 'Failed to generate interview questions'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
+        serializer = InterviewSerializer(interview)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'], url_path='submit-answer')
     def submit_answer(self, request, pk=None):
         """Submit an answer to an interview question.
         
         Expects: { "question_id": <int>, "user_answer": "A" }
-        Updates the question with the user's answer and recalculates the interview score.
+        Stores the answer and returns the updated score of the interview.
         """
-        try:
-            interview = Interview.objects.get(pk=pk, cv__user=request.user)
-        except Interview.DoesNotExist:
-            return Response({'error': 'Interview not found'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = SubmitAnswerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        answer = serializer.validated_data
+        return self._record_answers(request, pk, {answer['question_id']: answer['user_answer']})
 
-        question_id = request.data.get('question_id')
-        user_answer = request.data.get('user_answer')
+    @action(detail=True, methods=['post'], url_path='submit-answers')
+    def submit_answers(self, request, pk=None):
+        """Submit several answers at once.
 
-        if not question_id or not user_answer:
-            return Response(
-                {'error': 'question_id and user_answer are required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        Expects: { "answers": [{ "question_id": <int>, "user_answer": "A" }, ...] }
+        """
+        serializer = SubmitAnswersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._record_answers(request, pk, serializer.answer_map())
 
+    def _record_answers(self, request, pk, answers):
+        interview = Interview.objects.filter(pk=pk, cv__user=request.user).only('id').first()
+        if interview is None:
+            return Response({'error': 'Interview not found'}, status=status.HTTP_404_NOT_FOUND)
         try:
-            question = InterviewQuestion.objects.get(pk=question_id, interview=interview)
+            counters = record_answers(interview, answers)
         except InterviewQuestion.DoesNotExist:
             return Response({'error': 'Question not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Save the user's answer
-        question.user_answer = user_answer
-        question.save()
-
-        # Recalculate interview score
-        all_questions = interview.questions.all()
-        correct_count = sum(1 for q in all_questions if q.user_answer and q.user_answer == q.correct_answer)
-        
-        interview.correct_answers = correct_count
-        interview.score = (correct_count / interview.total_questions * 100) if interview.total_questions > 0 else 0.0
-        
-        # Mark as completed if all questions answered
-        if all_questions.filter(user_answer__isnull=True).count() == 0:
-            interview.completed = True
-        
-        interview.save()
-
-        serializer = InterviewSerializer(interview)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response({
+            'interview_id': interview.id,
+            'answers': [{'question_id': qid, 'user_answer': answer} for qid, answer in answers.items()],
+            **counters,
+        }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='save-progress')
     def save_progress(self, request, pk=None):
@@ -472,15 +756,17 @@ Return ONLY valid JSON in this exact structure (no markdown, no commentary):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # only this column: a full save() would write back the answer
+        # counters as loaded, undoing a concurrent record_answers
+        Interview.objects.filter(pk=interview.pk).update(
+            current_question_index=current_index, updated_at=timezone.now(),
+        )
         interview.current_question_index = current_index
-        interview.save()
+        # update() sends no signals
+        read_cache.invalidate(request.user.pk, [(read_cache.INTERVIEW_DETAIL, interview.pk)])
 
         return Response({
             'message': 'Progress saved',
             'interview_id': interview.id,
             'current_question_index': interview.current_question_index
         }, status=status.HTTP_200_OK)
-
-
-
-# views.py
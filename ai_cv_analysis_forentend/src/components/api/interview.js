@@ -31,54 +31,40 @@ export const startInterview = async (cvId) => {
   return api.post(`${API_BASE}/api/cv/interviews/start/`, { cv_id: cvId });
 };
 
+// The interview list is paginated by cursor, newest first. Follows the
+// `next` links and returns the interviews of every page.
+const listInterviews = async (params = {}) => {
+  const interviews = [];
+  let cursor = null;
+  do {
+    const response = await api.get(`${API_BASE}/api/cv/interviews/`, {
+      params: cursor ? { ...params, cursor } : params,
+    });
+    interviews.push(...response.data.results);
+    cursor = response.data.next
+      ? new URL(response.data.next).searchParams.get("cursor")
+      : null;
+  } while (cursor);
+  return interviews;
+};
+
 // Get all interviews for the user
 export const getInterviews = async () => {
-  return api.get(`${API_BASE}/api/cv/interviews/`);
+  return { data: await listInterviews() };
 };
 
-// Get interview status for a specific CV
+// Get the most recent interview for a specific CV
 export const getInterviewByCV = async (cvId) => {
-  const response = await api.get(`${API_BASE}/api/cv/interviews/`);
-  // Filter interviews for this CV and get the most recent one
-  const interviews = Array.isArray(response.data)
-    ? response.data
-    : response.data.results || [];
-  const cvInterviews = interviews.filter((interview) => interview.cv === cvId);
-  return cvInterviews.length > 0 ? cvInterviews[cvInterviews.length - 1] : null;
+  const response = await api.get(`${API_BASE}/api/cv/interviews/`, {
+    params: { cv: cvId, page_size: 1 },
+  });
+  return response.data.results[0] || null;
 };
 
 // Get all interviews for a specific CV
 export const getInterviewsForCV = async (cvId) => {
   try {
-    const response = await api.get(`${API_BASE}/api/cv/interviews/`);
-    console.log("API Response for interviews:", response.data);
-
-    let interviews = [];
-    if (Array.isArray(response.data)) {
-      interviews = response.data;
-    } else if (response.data?.results && Array.isArray(response.data.results)) {
-      interviews = response.data.results;
-    } else if (response.data?.data && Array.isArray(response.data.data)) {
-      interviews = response.data.data;
-    }
-
-    console.log("All interviews:", interviews);
-    console.log("CV ID to filter:", cvId, "Type:", typeof cvId);
-
-    const filtered = interviews.filter((interview) => {
-      console.log(
-        "Comparing interview.cv:",
-        interview.cv,
-        "with cvId:",
-        cvId,
-        "Equal:",
-        interview.cv == cvId
-      );
-      return parseInt(interview.cv) === parseInt(cvId);
-    });
-
-    console.log("Filtered interviews:", filtered);
-    return filtered;
+    return await listInterviews({ cv: cvId });
   } catch (error) {
     console.error("Error in getInterviewsForCV:", error);
     return [];
@@ -101,6 +87,14 @@ export const submitAnswer = async (interviewId, questionId, userAnswer) => {
   );
 };
 
+// Submit several answers at once: [{ question_id, user_answer }, ...]
+export const submitAnswers = async (interviewId, answers) => {
+  return api.post(
+    `${API_BASE}/api/cv/interviews/${interviewId}/submit-answers/`,
+    { answers }
+  );
+};
+
 // Save interview progress (current question index)
 export const saveProgress = async (interviewId, currentQuestionIndex) => {
   return api.post(
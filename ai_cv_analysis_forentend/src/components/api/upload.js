@@ -0,0 +1,92 @@
+// src/components/api/upload.js
+import axios from "axios";
+
+const API_BASE = import.meta.env.VITE_API_BASE_URL || "http://127.0.0.1:8000";
+const UPLOADS_URL = `${API_BASE}/api/cv/uploads/`;
+const CHUNK_ATTEMPTS = 5;
+
+const authHeaders = () => {
+  const token = localStorage.getItem("accessToken");
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
+// The upload id of a file is kept so a reload or retry resumes it
+const resumeKey = (file) =>
+  `cvUpload:${file.name}:${file.size}:${file.lastModified}`;
+
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Returns the state of the stored upload of `file`, or starts a new one
+const openUpload = async (file) => {
+  const storedId = localStorage.getItem(resumeKey(file));
+  if (storedId) {
+    try {
+      const response = await axios.get(`${UPLOADS_URL}${storedId}/`, {
+        headers: authHeaders(),
+      });
+      return response.data;
+    } catch (error) {
+      // unknown or expired: start over
+      if (![404, 410].includes(error.response?.status)) throw error;
+    }
+  }
+  const response = await axios.post(
+    UPLOADS_URL,
+    { filename: file.name, size: file.size },
+    { headers: authHeaders() }
+  );
+  localStorage.setItem(resumeKey(file), response.data.id);
+  return response.data;
+};
+
+// Sends one chunk, retrying network errors; returns the new offset
+const sendChunk = async (upload, file, offset) => {
+  const end = Math.min(offset + upload.chunk_size, file.size) - 1;
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const response = await axios.put(
+        `${UPLOADS_URL}${upload.id}/`,
+        file.slice(offset, end + 1),
+        {
+          headers: {
+            ...authHeaders(),
+            "Content-Type": "application/octet-stream",
+            "Content-Range": `bytes ${offset}-${end}/${file.size}`,
+          },
+        }
+      );
+      return response.data.offset;
+    } catch (error) {
+      // the server is elsewhere (e.g. an earlier attempt did arrive)
+      if (error.response?.status === 409) return error.response.data.offset;
+      if (error.response || attempt >= CHUNK_ATTEMPTS) throw error;
+      await wait(500 * 2 ** attempt);
+    }
+  }
+};
+
+// Upload a CV in resumable chunks. Resolves to the response of the
+// finalize call, which carries the new CV's `id` like POST /cvs/ does.
+export const uploadCVResumable = async (file, onProgress) => {
+  const upload = await openUpload(file);
+  let offset = upload.offset;
+  try {
+    while (offset < file.size) {
+      offset = await sendChunk(upload, file, offset);
+      if (onProgress) onProgress(Math.round((offset * 100) / file.size));
+    }
+    const response = await axios.post(
+      `${UPLOADS_URL}${upload.id}/finalize/`,
+      {},
+      { headers: authHeaders() }
+    );
+    localStorage.removeItem(resumeKey(file));
+    return response;
+  } catch (error) {
+    // the upload expired or was discarded; the next attempt starts a new one
+    if ([404, 410, 422].includes(error.response?.status)) {
+      localStorage.removeItem(resumeKey(file));
+    }
+    throw error;
+  }
+};
@@ -16,11 +16,13 @@ export default function CVAnalysis() {
   const [analysis, setAnalysis] = useState(location.state?.analysis || null);
   const [loading, setLoading] = useState(!analysis);
   const [alert, setAlert] = useState(null);
+  // Partial summary/suggestions while a streamed analysis is running
+  const [streamed, setStreamed] = useState(null);
 
   const [interviews, setInterviews] = useState([]);
   const [loadingInterviews, setLoadingInterviews] = useState(false);
 
-  // Fetch CV analysis (polling)
+  // Poll the analysis job until it succeeded or failed
   useEffect(() => {
     if (analysis) {
       setLoading(false);
@@ -39,40 +41,54 @@ export default function CVAnalysis() {
     }
 
     let pollingInterval = null;
-    let initialFetchDone = false;
+    let stopped = false;
 
-    const fetchAnalysis = async () => {
+    const stopPolling = () => {
+      stopped = true;
+      if (pollingInterval) {
+        clearInterval(pollingInterval);
+      }
+    };
+
+    const fetchStatus = async () => {
       try {
         const response = await axios.get(
-          `${baseURL}/api/cv/cvs/${cvId}/analysis/`,
+          `${baseURL}/api/cv/cvs/${cvId}/analysis-status/`,
           { headers: { Authorization: `Bearer ${token}` } }
         );
+        if (stopped) return;
 
-        if (response.data && response.data.summary) {
-          setAnalysis(response.data);
+        const job = response.data;
+        if (job.status === "succeeded") {
+          stopPolling();
+          if (job.analysis) setAnalysis(job.analysis);
+          setLoading(false);
+        } else if (job.status === "failed") {
+          stopPolling();
+          setAlert({
+            type: "error",
+            title: "Analysis Failed",
+            message: `❌ ${job.error || "Failed to analyze CV. Please try again later."}`,
+          });
           setLoading(false);
-          if (pollingInterval) {
-            clearInterval(pollingInterval);
-          }
         }
+        // pending or running: keep polling
       } catch (error) {
-        // Only log non-404 errors (404 is expected while analysis is processing)
-        if (error.response?.status !== 404) {
-          console.error("Error fetching analysis:", error);
-        }
-        
-        // If first fetch and we get 404, analysis hasn't been created yet
-        if (!initialFetchDone) {
-          initialFetchDone = true;
+        if (stopped) return;
+        // 404: no analysis was requested for this CV
+        if (error.response?.status === 404) {
+          stopPolling();
           setLoading(false);
+        } else {
+          console.error("Error fetching analysis status:", error);
         }
       }
     };
 
     // Add initial delay to give the POST request time to complete
     const startPolling = () => {
-      fetchAnalysis();
-      pollingInterval = setInterval(fetchAnalysis, 5000); // Poll every 5 seconds
+      fetchStatus();
+      pollingInterval = setInterval(fetchStatus, 5000); // Poll every 5 seconds
     };
 
     // Wait 1 second before starting to poll
@@ -80,9 +96,7 @@ export default function CVAnalysis() {
 
     return () => {
       clearTimeout(initialTimeout);
-      if (pollingInterval) {
-        clearInterval(pollingInterval);
-      }
+      stopPolling();
     };
   }, [cvId, analysis]);
 
@@ -104,6 +118,33 @@ export default function CVAnalysis() {
     if (cvId) fetchInterviews();
   }, [cvId]);
 
+  if (loading && streamed)
+    return (
+      <div className="flex items-center justify-center min-h-screen bg-gradient-to-r from-indigo-50 to-pink-50">
+        <div className="bg-white p-8 rounded-2xl shadow-lg max-w-2xl w-full">
+          <p className="text-gray-600 mb-4">
+            🤖 AI is analyzing your CV...
+          </p>
+          {streamed.summary && (
+            <>
+              <h3 className="font-semibold text-gray-800 mb-2">Summary</h3>
+              <p className="text-gray-700 whitespace-pre-line mb-4">
+                {streamed.summary}
+              </p>
+            </>
+          )}
+          {streamed.suggestions && (
+            <>
+              <h3 className="font-semibold text-gray-800 mb-2">Suggestions</h3>
+              <p className="text-gray-700 whitespace-pre-line">
+                {streamed.suggestions}
+              </p>
+            </>
+          )}
+        </div>
+      </div>
+    );
+
   if (loading)
     return <p className="text-center mt-20">Loading CV analysis...</p>;
 
@@ -120,30 +161,56 @@ export default function CVAnalysis() {
 
     setLoading(true);
     setAlert(null);
+    setStreamed({ summary: "", suggestions: "" });
 
     try {
-      const response = await axios.post(
-        `${baseURL}/api/cv/cvs/${cvId}/analyze/`,
-        {},
-        { headers: { Authorization: `Bearer ${token}` } }
+      // The analysis is streamed as server-sent events: partial summary and
+      // suggestions first, then the stored analysis as a "result" event.
+      const response = await fetch(
+        `${baseURL}/api/cv/cvs/${cvId}/analyze-stream/`,
+        { method: "POST", headers: { Authorization: `Bearer ${token}` } }
       );
+      if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || data.error);
+      }
 
-      if (response.data) {
-        setAnalysis(response.data);
-        setAlert({
-          type: "success",
-          title: "Success",
-          message: "✅ CV analyzed successfully!",
-        });
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+          if (event === "summary" || event === "suggestions") {
+            setStreamed((prev) => ({ ...prev, [event]: prev[event] + data.delta }));
+          } else if (event === "result") {
+            setAnalysis(data);
+            setAlert({
+              type: "success",
+              title: "Success",
+              message: "✅ CV analyzed successfully!",
+            });
+          } else if (event === "error") {
+            throw new Error(data.detail || data.error);
+          }
+        }
       }
     } catch (error) {
       console.error("Retry analysis error:", error);
       setAlert({
         type: "error",
         title: "Analysis Failed",
-        message: `❌ ${error.response?.data?.detail || "Failed to analyze CV. Please try again later."}`,
+        message: `❌ ${error.message || "Failed to analyze CV. Please try again later."}`,
       });
     } finally {
+      setStreamed(null);
       setLoading(false);
     }
   };
@@ -23,21 +23,11 @@ export default function MyCVs() {
         headers: { Authorization: `Bearer ${token}` },
       });
 
-      // For each CV, check analysis via CV endpoint
-      const updatedCVs = await Promise.all(
-        response.data.map(async (cv) => {
-          let status = "pending";
-          try {
-            await axios.get(`${baseURL}/api/cv/cvs/${cv.id}/analysis/`, {
-              headers: { Authorization: `Bearer ${token}` },
-            });
-            status = "analyzed";
-          } catch (err) {
-            status = "pending";
-          }
-          return { ...cv, status };
-        })
-      );
+      // The list carries has_analysis, so no per-CV request is needed
+      const updatedCVs = response.data.map((cv) => ({
+        ...cv,
+        status: cv.has_analysis ? "analyzed" : "pending",
+      }));
 
       setCvs(updatedCVs);
     } catch (error) {
@@ -36,23 +36,7 @@ export default function StartInterview() {
       });
 
       // Filter only analyzed CVs
-      const analyzedCVs = await Promise.all(
-        response.data.map(async (cv) => {
-          try {
-            const analysisRes = await axios.get(
-              `${baseURL}/api/cv/cvs/${cv.id}/analysis/`,
-              {
-                headers: { Authorization: `Bearer ${token}` },
-              }
-            );
-            return { ...cv, analysis: analysisRes.data, isAnalyzed: true };
-          } catch {
-            return { ...cv, isAnalyzed: false };
-          }
-        })
-      );
-
-      const analyzed = analyzedCVs.filter((cv) => cv.isAnalyzed);
+      const analyzed = response.data.filter((cv) => cv.has_analysis);
       setCvs(analyzed);
 
       // If preSelectedCvId exists, auto-select it
@@ -90,6 +74,27 @@ export default function StartInterview() {
     setSelectedCV(cv.id);
     setCVDetails(cv);
     checkForExistingInterview(cv.id);
+    if (!cv.analysis) loadAnalysis(cv.id);
+  };
+
+  // The CV list only carries the score; load the full analysis of the
+  // selected CV for its preview
+  const loadAnalysis = async (cvId) => {
+    try {
+      const analysisRes = await axios.get(
+        `${baseURL}/api/cv/cvs/${cvId}/analysis/`,
+        {
+          headers: { Authorization: `Bearer ${token}` },
+        }
+      );
+      setCvs((current) =>
+        current.map((c) =>
+          c.id === cvId ? { ...c, analysis: analysisRes.data } : c
+        )
+      );
+    } catch (error) {
+      console.error("Error loading CV analysis:", error);
+    }
   };
 
   const checkForExistingInterview = async (cvId) => {
@@ -253,77 +258,89 @@ export default function StartInterview() {
                         </p>
 
                         {/* Analysis Preview */}
-                        {cv.analysis && (
-                          <div className="mt-4 space-y-2 text-sm">
-                            <div className="flex items-center gap-2">
-                              <span className="font-semibold text-gray-700">
-                                AI Score:
-                              </span>
-                              <span
-                                className={`px-3 py-1 rounded-full font-bold ${
-                                  cv.analysis.ai_score >= 70
-                                    ? "bg-green-100 text-green-700"
-                                    : cv.analysis.ai_score >= 50
-                                    ? "bg-yellow-100 text-yellow-700"
-                                    : "bg-red-100 text-red-700"
-                                }`}
-                              >
-                                {Math.round(cv.analysis.ai_score)}%
-                              </span>
-                            </div>
-
-                            <div>
-                              <span className="font-semibold text-gray-700">
-                                Experience Level:
-                              </span>
-                              <p className="text-gray-600 capitalize">
-                                {cv.analysis.experience_level ||
-                                  "Not specified"}
-                              </p>
-                            </div>
-
-                            <div>
-                              <span className="font-semibold text-gray-700">
-                                Skills:
-                              </span>
-                              <div className="flex flex-wrap gap-2 mt-2">
-                                {cv.analysis.skills_extracted &&
-                                cv.analysis.skills_extracted.length > 0 ? (
-                                  cv.analysis.skills_extracted
-                                    .slice(0, 5)
-                                    .map((skill, idx) => (
-                                      <span
-                                        key={idx}
-                                        className="px-3 py-1 bg-[#050E7F] text-white text-xs rounded-full"
-                                      >
-                                        {skill}
-                                      </span>
-                                    ))
-                                ) : (
-                                  <p className="text-gray-500">
-                                    No skills found
-                                  </p>
-                                )}
-                                {cv.analysis.skills_extracted &&
-                                  cv.analysis.skills_extracted.length > 5 && (
-                                    <span className="px-3 py-1 bg-gray-300 text-gray-700 text-xs rounded-full font-medium">
-                                      +{cv.analysis.skills_extracted.length - 5}{" "}
-                                      more
-                                    </span>
+                        <div className="mt-4 space-y-2 text-sm">
+                          <div className="flex items-center gap-2">
+                            <span className="font-semibold text-gray-700">
+                              AI Score:
+                            </span>
+                            <span
+                              className={`px-3 py-1 rounded-full font-bold ${
+                                cv.ai_score >= 70
+                                  ? "bg-green-100 text-green-700"
+                                  : cv.ai_score >= 50
+                                  ? "bg-yellow-100 text-yellow-700"
+                                  : "bg-red-100 text-red-700"
+                              }`}
+                            >
+                              {Math.round(cv.ai_score)}%
+                            </span>
+                          </div>
+
+                          {cv.interview_count > 0 && (
+                            <p className="text-gray-600">
+                              Interviews: {cv.interview_count}
+                              {cv.latest_interview_score != null &&
+                                ` (last score ${Math.round(
+                                  cv.latest_interview_score
+                                )}%)`}
+                            </p>
+                          )}
+
+                          {cv.analysis && (
+                            <>
+                              <div>
+                                <span className="font-semibold text-gray-700">
+                                  Experience Level:
+                                </span>
+                                <p className="text-gray-600 capitalize">
+                                  {cv.analysis.experience_level ||
+                                    "Not specified"}
+                                </p>
+                              </div>
+
+                              <div>
+                                <span className="font-semibold text-gray-700">
+                                  Skills:
+                                </span>
+                                <div className="flex flex-wrap gap-2 mt-2">
+                                  {cv.analysis.skills_extracted &&
+                                  cv.analysis.skills_extracted.length > 0 ? (
+                                    cv.analysis.skills_extracted
+                                      .slice(0, 5)
+                                      .map((skill, idx) => (
+                                        <span
+                                          key={idx}
+                                          className="px-3 py-1 bg-[#050E7F] text-white text-xs rounded-full"
+                                        >
+                                          {skill}
+                                        </span>
+                                      ))
+                                  ) : (
+                                    <p className="text-gray-500">
+                                      No skills found
+                                    </p>
                                   )}
+                                  {cv.analysis.skills_extracted &&
+                                    cv.analysis.skills_extracted.length > 5 && (
+                                      <span className="px-3 py-1 bg-gray-300 text-gray-700 text-xs rounded-full font-medium">
+                                        +{cv.analysis.skills_extracted.length - 5}{" "}
+                                        more
+                                      </span>
+                                    )}
+                                </div>
                               </div>
-                            </div>
-
-                            <div>
-                              <span className="font-semibold text-gray-700">
-                                Summary:
-                              </span>
-                              <p className="text-gray-600 line-clamp-2">
-                                {cv.analysis.summary || "No summary available"}
-                              </p>
-                            </div>
-                          </div>
-                        )}
+
+                              <div>
+                                <span className="font-semibold text-gray-700">
+                                  Summary:
+                                </span>
+                                <p className="text-gray-600 line-clamp-2">
+                                  {cv.analysis.summary || "No summary available"}
+                                </p>
+                              </div>
+                            </>
+                          )}
+                        </div>
                       </div>
 
                       {/* Selection Indicator */}
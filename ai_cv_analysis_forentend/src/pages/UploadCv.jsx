@@ -3,6 +3,7 @@ import { useNavigate } from "react-router-dom";
 import axios from "axios";
 import Alert from "../components/Alert";
 import BackButton from "../components/BackButton";
+import { uploadCVResumable } from "../components/api/upload";
 
 const baseURL = import.meta.env.VITE_API_BASE_URL;
 
@@ -28,9 +29,6 @@ export default function UploadCVPage() {
       return;
     }
 
-    const formData = new FormData();
-    formData.append("file", selectedFile);
-
     const token = localStorage.getItem("accessToken");
     if (!token) {
       setAlert({
@@ -49,20 +47,10 @@ export default function UploadCVPage() {
         message: "⏳ Uploading your CV, please wait...",
       });
 
-      // Upload CV
-      const uploadResponse = await axios.post(
-        `${baseURL}/api/cv/cvs/`,
-        formData,
-        {
-          headers: {
-            "Content-Type": "multipart/form-data",
-            Authorization: `Bearer ${token}`,
-          },
-          onUploadProgress: (event) => {
-            const percent = Math.round((event.loaded * 100) / event.total);
-            setUploadProgress(percent);
-          },
-        }
+      // Upload CV in resumable chunks
+      const uploadResponse = await uploadCVResumable(
+        selectedFile,
+        setUploadProgress
       );
 
       if (uploadResponse.status === 201) {
@@ -92,8 +80,8 @@ export default function UploadCVPage() {
             { headers: { Authorization: `Bearer ${token}` } }
           );
 
-          // Check if analysis was successful
-          if (analysisResponse.status === 201 && analysisResponse.data) {
+          // Analyzed now (201) or served from the analysis cache (200)
+          if ([200, 201].includes(analysisResponse.status) && analysisResponse.data) {
             setAlert({
               type: "success",
               title: "Analysis Complete",
@@ -107,6 +95,9 @@ export default function UploadCVPage() {
             navigate(`/cv-analysis/${newCvId}`, {
               state: { analysis: analysisResponse.data },
             });
+          } else if (analysisResponse.status === 202) {
+            // Analysis was queued; the analysis page polls until it is ready.
+            navigate(`/cv-analysis/${newCvId}`);
           }
         } catch (analyzeError) {
           console.error("Analysis error:", analyzeError);